@@ -7,10 +7,11 @@ import hashlib
 import hmac
 
 import boto3
-from requests import request
 from requests.auth import AuthBase
 from requests.compat import urlparse
 
+from ecommerce_integrations.utils import http_client
+
 __all__ = [
 	"SPAPIError",
 	"Finances",
@@ -243,7 +244,7 @@ class SPAPI(object):
 			"refresh_token": self.refresh_token,
 		}
 
-		response = request(method="POST", url=self.AUTH_URL, data=data)
+		response = http_client.request(method="POST", url=self.AUTH_URL, data=data)
 		result = response.json()
 		if response.status_code == 200:
 			return result.get("access_token")
@@ -291,7 +292,7 @@ class SPAPI(object):
 
 		url = self.endpoint + self.BASE_URI + append_to_base_uri
 
-		response = request(
+		response = http_client.request(
 			method=method,
 			url=url,
 			params=params,
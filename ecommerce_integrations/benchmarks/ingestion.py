@@ -0,0 +1,493 @@
+"""Offline end-to-end ingestion benchmarks.
+
+Measures throughput of order ingestion, invoicing and inventory push with all marketplace APIs
+mocked, using the same fixtures as unit tests scaled up by synthetic generators.
+
+Benchmarks create documents and commit them, only run them on a test site on which test records
+have been created, i.e. after `bench --site test_site run-tests --app ecommerce_integrations`.
+
+	bench --site test_site execute ecommerce_integrations.benchmarks.ingestion.run
+	bench --site test_site execute ecommerce_integrations.benchmarks.ingestion.run \\
+		--kwargs "{'stages': ['unicommerce_inventory'], 'catalog_sizes': [1000, 10000, 100000]}"
+
+Report is printed as JSON, one entry per stage containing wall time, throughput and DB queries.
+With `trace_memory` each stage also reports peak memory allocated by Python while it ran.
+Tracing slows down allocations, so don't compare its wall times with untraced runs.
+"""
+
+import base64
+import copy
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+from unittest.mock import patch
+
+import frappe
+import responses
+from frappe.test_runner import make_test_records
+from frappe.utils import add_days, now, nowdate
+
+from ecommerce_integrations.controllers.inventory import set_inventory_change_cursor
+from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_item.ecommerce_item import (
+	clear_item_code_cache,
+)
+from ecommerce_integrations.utils.instrumentation import count_queries
+
+UNICOMMERCE_URL = "https://demostaging.unicommerce.com"
+LABEL_URL = "https://example.com/benchmark-label"
+
+STAGES = (
+	"shopify_orders",
+	"unicommerce_orders",
+	"unicommerce_invoices",
+	"unicommerce_inventory",
+	"shopify_inventory",
+)
+DEFAULT_CATALOG_SIZES = (1000, 10000, 100000)
+DEFAULT_ORDER_COUNT = 100
+
+BENCHMARK_ITEM_PREFIX = "_BENCH-"
+
+
+def run(
+	stages: Optional[List[str]] = None,
+	catalog_sizes: Optional[List[int]] = None,
+	orders: int = DEFAULT_ORDER_COUNT,
+	trace_memory: bool = False,
+) -> List[Dict]:
+	"""Run benchmark stages and print machine readable report."""
+	stages = stages or STAGES
+	catalog_sizes = catalog_sizes or DEFAULT_CATALOG_SIZES
+	run_id = str(int(time.time()))
+
+	frappe.set_user("Administrator")
+	frappe.flags.benchmark_trace_memory = trace_memory
+	report = []
+
+	if {"unicommerce_orders", "unicommerce_invoices", "unicommerce_inventory"} & set(stages):
+		with _unicommerce_setup():
+			sales_orders = []
+			if "unicommerce_orders" in stages or "unicommerce_invoices" in stages:
+				result, sales_orders = bench_unicommerce_orders(orders, run_id)
+				report.append(result)
+			if "unicommerce_invoices" in stages:
+				report.append(bench_unicommerce_invoices(sales_orders, run_id))
+			if "unicommerce_inventory" in stages:
+				report.extend(bench_unicommerce_inventory(size, run_id) for size in catalog_sizes)
+
+	if {"shopify_orders", "shopify_inventory"} & set(stages):
+		_shopify_setup()
+		if "shopify_orders" in stages:
+			report.append(bench_shopify_orders(orders, run_id))
+		if "shopify_inventory" in stages:
+			report.extend(bench_shopify_inventory(size, run_id) for size in catalog_sizes)
+
+	print(json.dumps({"run_id": run_id, "site": frappe.local.site, "stages": report}, indent=1))
+	return report
+
+
+def bench_shopify_orders(count: int, run_id: str) -> Dict:
+	from ecommerce_integrations.shopify.order import sync_sales_order
+
+	product = _load_fixture("shopify", "single_product")
+	_sync_shopify_product(product)
+	payloads = [_make_shopify_order(product, run_id, i) for i in range(count)]
+
+	def stage():
+		for payload in payloads:
+			sync_sales_order(payload)
+		return 0
+
+	return measure("shopify_orders", stage, count=count)
+
+
+def bench_unicommerce_orders(count: int, run_id: str):
+	from ecommerce_integrations.unicommerce.order import create_order
+
+	client = _get_unicommerce_client()
+	order_data = _get_unicommerce_order_generator(run_id)
+	sales_orders = []
+
+	def stage():
+		with _mock_unicommerce(order_data) as mock:
+			for i in range(count):
+				sales_orders.append(create_order(order_data(i), client=client))
+		return len(mock.calls)
+
+	result = measure("unicommerce_orders", stage, count=count)
+	return result, [so.name for so in sales_orders if so]
+
+
+def bench_unicommerce_invoices(sales_orders: List[str], run_id: str) -> Dict:
+	from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+
+	from ecommerce_integrations.unicommerce.invoice import bulk_generate_invoices
+
+	client = _get_unicommerce_client()
+	order_data = _get_unicommerce_order_generator(run_id)
+
+	# every order in fixture consumes 11 units
+	make_stock_entry(
+		item_code="MC-100", qty=11 * len(sales_orders), to_warehouse="Stores - WP", rate=42
+	)
+
+	def stage():
+		with _mock_unicommerce(order_data) as mock:
+			bulk_generate_invoices(sales_orders=sales_orders, client=client)
+		return len(mock.calls)
+
+	return measure("unicommerce_invoices", stage, count=len(sales_orders))
+
+
+def bench_unicommerce_inventory(catalog_size: int, run_id: str) -> Dict:
+	from ecommerce_integrations.unicommerce.constants import MODULE_NAME, SETTINGS_DOCTYPE
+	from ecommerce_integrations.unicommerce.inventory import update_inventory_on_unicommerce
+
+	warehouses = frappe.get_cached_doc(SETTINGS_DOCTYPE).get_erpnext_warehouses()
+	make_catalog(MODULE_NAME, catalog_size, warehouses, run_id)
+	client = _get_unicommerce_client()
+	# catalog is inserted without journal entries, force full scan
+	set_inventory_change_cursor(MODULE_NAME, "2000-01-01")
+
+	def stage():
+		with _mock_unicommerce() as mock:
+			update_inventory_on_unicommerce(client=client, force=True)
+		return len(mock.calls)
+
+	try:
+		return measure("unicommerce_inventory", stage, count=catalog_size, catalog_size=catalog_size)
+	finally:
+		delete_catalog(run_id)
+
+
+def bench_shopify_inventory(catalog_size: int, run_id: str) -> Dict:
+	from ecommerce_integrations.controllers.inventory import get_inventory_levels
+	from ecommerce_integrations.shopify import inventory
+	from ecommerce_integrations.shopify.constants import MODULE_NAME, SETTING_DOCTYPE
+
+	warehouse_map = frappe.get_doc(SETTING_DOCTYPE).get_erpnext_to_integration_wh_mapping()
+	make_catalog(MODULE_NAME, catalog_size, list(warehouse_map), run_id)
+
+	def stage():
+		inventory_levels = get_inventory_levels(
+			tuple(warehouse_map), MODULE_NAME, item_codes=_get_catalog_items(run_id)
+		)
+		with patch.object(inventory.Variant, "find") as find, patch.object(
+			inventory.InventoryLevel, "set"
+		) as set_level:
+			inventory.upload_inventory_data_to_shopify(inventory_levels, warehouse_map)
+		return find.call_count + set_level.call_count
+
+	try:
+		return measure("shopify_inventory", stage, count=catalog_size, catalog_size=catalog_size)
+	finally:
+		delete_catalog(run_id)
+
+
+def measure(stage: str, fn: Callable, count: int, **tags) -> Dict:
+	"""Run `fn` and measure wall time, DB queries and peak memory (if traced)."""
+	frappe.db.commit()
+
+	start = time.perf_counter()
+	with _trace_memory() as memory, count_queries() as stats:
+		api_calls = fn()
+	wall_time = time.perf_counter() - start
+
+	frappe.db.commit()
+	summary = stats.get_summary()
+
+	return {
+		"stage": stage,
+		**tags,
+		"count": count,
+		"wall_time_s": round(wall_time, 3),
+		"per_second": round(count / wall_time, 2) if wall_time else None,
+		"api_calls": api_calls,
+		"db_queries": summary["query_count"],
+		"db_queries_per_unit": round(summary["query_count"] / count, 2) if count else None,
+		"db_time_ms": summary["db_time_ms"],
+		"peak_memory_mb": memory.get("peak_mb"),
+	}
+
+
+def make_catalog(integration: str, size: int, warehouses: List[str], run_id: str) -> None:
+	"""Insert synthetic Ecommerce Items with stock in all warehouses.
+
+	Rows are inserted directly, Items are not created as inventory push doesn't need them."""
+	timestamp = now()
+	last_synced = add_days(timestamp, -1)
+	user = frappe.session.user
+	item_codes = [f"{BENCHMARK_ITEM_PREFIX}{run_id}-{i}" for i in range(size)]
+
+	frappe.db.bulk_insert(
+		"Ecommerce Item",
+		fields=[
+			"name",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+			"integration",
+			"erpnext_item_code",
+			"integration_item_code",
+			"variant_id",
+			"sku",
+			"inventory_synced_on",
+		],
+		values=[
+			(
+				item_code,
+				timestamp,
+				timestamp,
+				user,
+				user,
+				integration,
+				item_code,
+				item_code,
+				str(i),
+				item_code,
+				last_synced,
+			)
+			for i, item_code in enumerate(item_codes)
+		],
+	)
+	frappe.db.bulk_insert(
+		"Bin",
+		fields=[
+			"name",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+			"item_code",
+			"warehouse",
+			"actual_qty",
+			"reserved_qty",
+			"projected_qty",
+		],
+		values=[
+			(f"{item_code}-{idx}", timestamp, timestamp, user, user, item_code, warehouse, i % 100, 0, 0)
+			for i, item_code in enumerate(item_codes)
+			for idx, warehouse in enumerate(warehouses)
+		],
+	)
+	frappe.db.commit()
+
+
+def delete_catalog(run_id: str) -> None:
+	pattern = f"{BENCHMARK_ITEM_PREFIX}{run_id}-%"
+	frappe.db.sql("delete from `tabEcommerce Item` where erpnext_item_code like %s", pattern)
+	frappe.db.sql("delete from tabBin where item_code like %s", pattern)
+	frappe.db.commit()
+	# rows are deleted without invalidating cached item codes
+	clear_item_code_cache()
+
+
+def _get_catalog_items(run_id: str) -> List[str]:
+	return frappe.get_all(
+		"Ecommerce Item",
+		filters={"erpnext_item_code": ("like", f"{BENCHMARK_ITEM_PREFIX}{run_id}-%")},
+		pluck="erpnext_item_code",
+	)
+
+
+@contextmanager
+def _unicommerce_setup():
+	"""Configure Unicommerce Settings same as unit tests and restore them afterwards."""
+	from ecommerce_integrations.unicommerce.tests.utils import TestCase
+
+	TestCase.setUpClass()
+	make_test_records("Unicommerce Channel")
+	frappe.db.commit()
+	try:
+		yield
+	finally:
+		TestCase.tearDownClass()
+		frappe.db.commit()
+
+
+def _shopify_setup():
+	from ecommerce_integrations.shopify.tests.utils import TestCase
+
+	TestCase.setUpClass()
+	frappe.db.commit()
+
+
+def _sync_shopify_product(product):
+	from ecommerce_integrations.shopify.product import ShopifyProduct
+
+	shopify_product = ShopifyProduct(product["id"], variant_id=product["variants"][0]["id"])
+	if not shopify_product.is_synced():
+		shopify_product._make_item(copy.deepcopy(product))
+		frappe.db.commit()
+
+
+def _make_shopify_order(product, run_id: str, idx: int) -> Dict:
+	variant = product["variants"][0]
+	customer_idx = idx % 10
+	address = {
+		"id": f"{run_id}{customer_idx}",
+		"first_name": "Benchmark",
+		"last_name": f"Customer {customer_idx}",
+		"address1": "Benchmark Street",
+		"city": "Mumbai",
+		"province": "Maharashtra",
+		"zip": "400001",
+		"country": "India",
+		"phone": "9999999999",
+	}
+
+	return {
+		"id": int(f"{run_id}{idx:06d}"),
+		"name": f"#B{run_id}{idx}",
+		"created_at": nowdate(),
+		"financial_status": "pending",
+		"taxes_included": False,
+		"customer": {
+			"id": int(f"{run_id}{customer_idx}"),
+			"first_name": address["first_name"],
+			"last_name": address["last_name"],
+			"email": f"benchmark-{run_id}-{customer_idx}@example.com",
+		},
+		"billing_address": address,
+		"shipping_address": address,
+		"line_items": [
+			{
+				"id": int(f"{run_id}{idx:06d}{line}"),
+				"product_id": product["id"],
+				"variant_id": variant["id"],
+				"sku": variant["sku"],
+				"title": product["title"],
+				"name": product["title"],
+				"quantity": 1 + line,
+				"price": variant["price"],
+				"product_exists": True,
+				"tax_lines": [],
+				"discount_allocations": [],
+			}
+			for line in range(1 + idx % 3)
+		],
+		"shipping_lines": [],
+	}
+
+
+def _get_unicommerce_client():
+	from ecommerce_integrations.unicommerce.api_client import UnicommerceAPIClient
+
+	return UnicommerceAPIClient(UNICOMMERCE_URL, "AUTH_TOKEN")
+
+
+def _get_unicommerce_order_generator(run_id: str) -> Callable[[int], Dict]:
+	template = _load_fixture("unicommerce", "order-SO5906")["saleOrderDTO"]
+
+	def order_data(idx) -> Dict:
+		order = copy.deepcopy(template)
+		order["code"] = f"B{run_id}-{idx}"
+		for package in order["shippingPackages"]:
+			package["code"] = f"P{run_id}-{idx}"
+		for item in order["saleOrderItems"]:
+			item["shippingPackageCode"] = f"P{run_id}-{idx}"
+		return order
+
+	return order_data
+
+
+def _mock_unicommerce(order_data: Optional[Callable[[int], Dict]] = None):
+	"""Mock Unicommerce API, every endpoint synthesizes response for requested code."""
+	mock = responses.RequestsMock(assert_all_requests_are_fired=False)
+	invoice_template = _load_fixture("unicommerce", "invoice-SDU0026")
+	label = base64.b64decode(_load_fixture("unicommerce", "invoice_label_response")["label"])
+	invoiced_packages = set()
+
+	def json_response(data):
+		return 200, {}, json.dumps(data)
+
+	def get_item(request):
+		sku = json.loads(request.body)["skuCode"]
+		fixture = "product-MC-100" if sku == "MC-100" else "simple_item"
+		return json_response(_load_fixture("unicommerce", fixture))
+
+	def get_sales_order(request):
+		code = json.loads(request.body)["code"]
+		order = order_data(int(code.rsplit("-", 1)[1]))
+		for package in order["shippingPackages"]:
+			package["status"] = "PACKED" if package["code"] in invoiced_packages else "CREATED"
+		return json_response({"successful": True, "saleOrderDTO": order})
+
+	def create_invoice(request):
+		package_code = json.loads(request.body)["shippingPackageCode"]
+		invoiced_packages.add(package_code)
+		response = _load_fixture("unicommerce", "create_invoice_and_assign_shipper")
+		response.update(
+			{
+				"shippingPackageCode": package_code,
+				"invoiceCode": f"I{package_code}",
+				"shippingLabelLink": LABEL_URL,
+			}
+		)
+		return json_response(response)
+
+	def get_invoice(request):
+		package_code = json.loads(request.body)["shippingPackageCode"]
+		response = copy.deepcopy(invoice_template)
+		response["invoice"].update({"code": f"I{package_code}", "shippingPackageCode": package_code})
+		return json_response(response)
+
+	def update_inventory(request):
+		adjustments = json.loads(request.body)["inventoryAdjustments"]
+		return json_response(
+			{
+				"successful": True,
+				"inventoryAdjustmentResponses": [
+					{"facilityInventoryAdjustment": adjustment, "successful": True, "errors": []}
+					for adjustment in adjustments
+				],
+			}
+		)
+
+	callbacks = {
+		"/services/rest/v1/catalog/itemType/get": get_item,
+		"/services/rest/v1/oms/saleorder/get": get_sales_order,
+		"/services/rest/v1/oms/shippingPackage/createInvoiceAndAllocateShippingProvider": create_invoice,
+		"/services/rest/v1/invoice/details/get": get_invoice,
+		"/services/rest/v1/inventory/adjust/bulk": update_inventory,
+	}
+	for endpoint, callback in callbacks.items():
+		mock.add_callback(
+			responses.POST, UNICOMMERCE_URL + endpoint, callback=callback, content_type="application/json"
+		)
+	mock.add(responses.GET, LABEL_URL, body=label, status=200)
+
+	return mock
+
+
+def _load_fixture(integration: str, name: str) -> Dict:
+	fixture_dir = "data" if integration == "shopify" else "fixtures"
+	path = os.path.join(
+		frappe.get_app_path("ecommerce_integrations", integration, "tests", fixture_dir), f"{name}.json"
+	)
+	with open(path, "rb") as f:
+		return json.loads(f.read())
+
+
+@contextmanager
+def _trace_memory():
+	"""Trace Python allocations in the block, yields dict with peak usage once the block exits.
+
+	Unlike max RSS of the process, the peak is of this stage only and isn't carried over from
+	earlier stages."""
+	result = {}
+	if not frappe.flags.benchmark_trace_memory:
+		yield result
+		return
+
+	tracemalloc.start()
+	try:
+		yield result
+	finally:
+		_current, peak = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+		result["peak_mb"] = round(peak / (1024 * 1024), 2)
@@ -0,0 +1,282 @@
+"""Micro-benchmarks of pure order transformation functions.
+
+Functions are run on large synthetic orders (500 line items, 50 tax lines) with all DB lookups
+stubbed. Time per call (ns/op) and peak memory allocated per call are reported, and the run fails
+if any function exceeds its budget.
+
+	bench --site test_site execute ecommerce_integrations.benchmarks.transformations.run
+	bench --site test_site execute ecommerce_integrations.benchmarks.transformations.run \\
+		--kwargs "{'budgets': {'unicommerce.get_taxes': 5000000}}"
+
+Budgets (ns/op) can also be overridden by `ecommerce_integrations_benchmark_budgets` in
+site_config.json.
+"""
+
+import json
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import ExitStack
+from typing import Dict, List, Optional
+from unittest.mock import patch
+
+import frappe
+from frappe import _dict
+
+LINE_ITEMS = 500
+TAX_LINES = 50
+DEFAULT_ITERATIONS = 20
+
+# ns/op, generous enough to only catch algorithmic regressions on slow CI machines.
+DEFAULT_BUDGETS = {
+	"shopify._get_item_price": 200_000,
+	"shopify._get_total_discount": 50_000,
+	"shopify.update_taxes_with_shipping_lines": 5_000_000,
+	"shopify.get_fulfillment_items": 500_000_000,
+	"unicommerce.get_taxes": 20_000_000,
+	"unicommerce._assign_wh_and_so_row": 10_000_000,
+	"unicommerce._handle_partial_returns": 50_000_000,
+}
+
+# `setup` returns (args, kwargs) of a single call, it's not timed.
+Benchmark = namedtuple("Benchmark", ["name", "fn", "setup", "stubs"])
+
+
+def run(
+	budgets: Optional[Dict[str, int]] = None,
+	iterations: int = DEFAULT_ITERATIONS,
+	benchmarks: Optional[List[str]] = None,
+) -> List[Dict]:
+	"""Run micro-benchmarks, print report and throw if any budget is exceeded."""
+	budgets = {
+		**DEFAULT_BUDGETS,
+		**(frappe.conf.get("ecommerce_integrations_benchmark_budgets") or {}),
+		**(budgets or {}),
+	}
+
+	report = []
+	for benchmark in get_benchmarks():
+		if benchmarks and benchmark.name not in benchmarks:
+			continue
+		result = measure(benchmark, iterations)
+		result["budget_ns_per_op"] = budgets.get(benchmark.name)
+		result["within_budget"] = (
+			not result["budget_ns_per_op"] or result["ns_per_op"] <= result["budget_ns_per_op"]
+		)
+		report.append(result)
+
+	print(json.dumps(report, indent=1))
+
+	over_budget = [r["name"] for r in report if not r["within_budget"]]
+	if over_budget:
+		frappe.throw(
+			f"Benchmarks over budget: {', '.join(over_budget)}", title="Benchmark budget exceeded"
+		)
+	return report
+
+
+def measure(benchmark: Benchmark, iterations: int) -> Dict:
+	with ExitStack() as stack:
+		for target, replacement in benchmark.stubs().items():
+			stack.enter_context(patch(target, replacement))
+
+		# warm up caches and imports
+		args, kwargs = benchmark.setup()
+		benchmark.fn(*args, **kwargs)
+
+		timings = []
+		for _ in range(iterations):
+			args, kwargs = benchmark.setup()
+			start = time.perf_counter_ns()
+			benchmark.fn(*args, **kwargs)
+			timings.append(time.perf_counter_ns() - start)
+
+		args, kwargs = benchmark.setup()
+		tracemalloc.start()
+		try:
+			benchmark.fn(*args, **kwargs)
+			_, peak_allocated = tracemalloc.get_traced_memory()
+		finally:
+			tracemalloc.stop()
+
+	timings.sort()
+	return {
+		"name": benchmark.name,
+		"iterations": iterations,
+		"ns_per_op": sum(timings) // len(timings),
+		"min_ns": timings[0],
+		"median_ns": timings[len(timings) // 2],
+		"peak_allocated_bytes": peak_allocated,
+	}
+
+
+def get_benchmarks() -> List[Benchmark]:
+	from ecommerce_integrations.shopify import fulfillment
+	from ecommerce_integrations.shopify import order as shopify_order
+	from ecommerce_integrations.unicommerce import cancellation_and_returns, invoice
+	from ecommerce_integrations.unicommerce import order as unicommerce_order
+
+	return [
+		Benchmark(
+			"shopify._get_item_price",
+			shopify_order._get_item_price,
+			lambda: ((make_shopify_line_item(0), True), {}),
+			dict,
+		),
+		Benchmark(
+			"shopify._get_total_discount",
+			shopify_order._get_total_discount,
+			lambda: ((make_shopify_line_item(0),), {}),
+			dict,
+		),
+		Benchmark(
+			"shopify.update_taxes_with_shipping_lines",
+			shopify_order.update_taxes_with_shipping_lines,
+			lambda: (([], make_shopify_shipping_lines(), _dict(cost_center="Main - _TC")), {}),
+			_shopify_tax_stubs,
+		),
+		Benchmark(
+			"shopify.get_fulfillment_items",
+			fulfillment.get_fulfillment_items,
+			lambda: ((make_delivery_note_items(), make_shopify_fulfillment_items(), "1"), {}),
+			_shopify_fulfillment_stubs,
+		),
+		Benchmark(
+			"unicommerce.get_taxes",
+			unicommerce_order.get_taxes,
+			lambda: ((make_unicommerce_line_items(), make_channel_config()), {}),
+			_unicommerce_item_code_stubs,
+		),
+		Benchmark(
+			"unicommerce._assign_wh_and_so_row",
+			invoice._assign_wh_and_so_row,
+			lambda: (
+				(make_unicommerce_invoice_items(), make_warehouse_allocation(), "SO-BENCH-00001"),
+				{},
+			),
+			_sales_order_stubs,
+		),
+		Benchmark(
+			"unicommerce._handle_partial_returns",
+			cancellation_and_returns._handle_partial_returns,
+			lambda: ((make_credit_note(), [f"SII-{i}" for i in range(0, LINE_ITEMS, 2)]), {}),
+			dict,
+		),
+	]
+
+
+def make_shopify_line_item(idx: int) -> Dict:
+	return {
+		"id": idx,
+		"product_id": 1000 + idx,
+		"variant_id": 2000 + idx,
+		"sku": f"SKU-{idx}",
+		"quantity": 3,
+		"price": "1299.00",
+		"tax_lines": [{"title": f"Tax {t}", "price": "12.50", "rate": 0.01} for t in range(TAX_LINES)],
+		"discount_allocations": [{"amount": "5.00"} for _ in range(10)],
+	}
+
+
+def make_shopify_shipping_lines() -> List[Dict]:
+	return [
+		{
+			"title": f"Shipping {s}",
+			"price": "50.00",
+			"discount_allocations": [{"amount": "2.00"}],
+			"tax_lines": [
+				{"title": f"Tax {t}", "price": "0.50", "rate": 0.01} for t in range(TAX_LINES)
+			],
+		}
+		for s in range(10)
+	]
+
+
+def make_shopify_fulfillment_items() -> List[Dict]:
+	return [
+		{"product_id": 1000 + i, "variant_id": 2000 + i, "sku": f"SKU-{i}", "quantity": 1}
+		for i in range(LINE_ITEMS)
+	]
+
+
+def make_delivery_note_items() -> List[_dict]:
+	return [_dict(item_code=f"SKU-{i}", qty=3, warehouse=None) for i in range(LINE_ITEMS)]
+
+
+def make_unicommerce_line_items() -> List[Dict]:
+	return [
+		{
+			"itemSku": f"SKU-{i}",
+			"integratedGst": 18.0,
+			"integratedGstPercentage": 18.0,
+			"shippingCharges": 10.0,
+			"cashOnDeliveryCharges": 5.0,
+		}
+		for i in range(LINE_ITEMS)
+	]
+
+
+def make_channel_config() -> _dict:
+	from ecommerce_integrations.unicommerce.constants import CHANNEL_TAX_ACCOUNT_FIELD_MAP
+
+	return _dict({field: f"{field} - _TC" for field in CHANNEL_TAX_ACCOUNT_FIELD_MAP.values()})
+
+
+def make_unicommerce_invoice_items() -> List[Dict]:
+	# reversed, so sorting actually has to move items
+	return [
+		{"item_code": f"SKU-{i % 50}", "qty": 1, "rate": float(i % 7)}
+		for i in reversed(range(LINE_ITEMS))
+	]
+
+
+def make_warehouse_allocation() -> List[Dict]:
+	return [
+		{"item_code": f"SKU-{i % 50}", "warehouse": "Stores - _TC", "sales_order_row": f"SOI-{i}"}
+		for i in range(LINE_ITEMS)
+	]
+
+
+def make_sales_order() -> _dict:
+	return _dict(items=[_dict(name=f"SOI-{i}", rate=float(i % 7)) for i in range(LINE_ITEMS)])
+
+
+def make_credit_note() -> _dict:
+	items = [
+		_dict(item_code=f"SKU-{i % 100}", qty=-1, sales_invoice_item=f"SII-{i}")
+		for i in range(LINE_ITEMS)
+	]
+	item_wise_tax_detail = json.dumps({f"SKU-{i}": [18.0, 9.0] for i in range(100)})
+	taxes = [
+		_dict(tax_amount=-900.0, item_wise_tax_detail=item_wise_tax_detail)
+		for _ in range(TAX_LINES)
+	]
+	return _dict(items=items, taxes=taxes)
+
+
+def _shopify_tax_stubs() -> Dict:
+	return {
+		"ecommerce_integrations.shopify.order.get_tax_account_head": lambda tax: "Tax - _TC",
+		"ecommerce_integrations.shopify.order.get_tax_account_description": lambda tax: None,
+	}
+
+
+def _shopify_fulfillment_stubs() -> Dict:
+	setting = _dict(warehouse="Stores - _TC", get_integration_to_erpnext_wh_mapping=lambda: {})
+	return {
+		"ecommerce_integrations.shopify.product.get_item_code": lambda item: item.get("sku"),
+		"ecommerce_integrations.shopify.fulfillment.get_cached_setting": lambda *args: setting,
+	}
+
+
+def _unicommerce_item_code_stubs() -> Dict:
+	return {
+		"ecommerce_integrations.unicommerce.order.ecommerce_item.get_erpnext_item_code": (
+			lambda integration, integration_item_code, **kwargs: integration_item_code
+		),
+	}
+
+
+def _sales_order_stubs() -> Dict:
+	sales_order = make_sales_order()
+	return {"frappe.get_doc": lambda *args: sales_order}
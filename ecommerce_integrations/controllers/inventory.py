@@ -1,12 +1,27 @@
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import frappe
 from frappe import _dict
-from frappe.utils import now
-from frappe.utils.nestedset import get_descendants_of
+from frappe.utils import add_days, add_to_date, create_batch, get_datetime, now, now_datetime
 
+INVENTORY_CHANGE_DOCTYPE = "Ecommerce Inventory Change"
 
-def get_inventory_levels(warehouses: Tuple[str], integration: str) -> List[_dict]:
+# journal entries older than this are deleted, integrations with older cursor do a full scan.
+INVENTORY_CHANGE_RETENTION_DAYS = 7
+
+# changes recorded in transactions that were still open when cursor was saved
+# are only visible later, so changes are read with this much overlap.
+INVENTORY_CHANGE_CURSOR_LAG_SECONDS = 300
+
+WAREHOUSE_BOUNDS_CACHE_KEY = "ecommerce_warehouse_bounds"
+
+# number of Ecommerce Items updated in single query
+INVENTORY_SYNC_STATUS_BATCH_SIZE = 1000
+
+
+def get_inventory_levels(
+	warehouses: Tuple[str], integration: str, item_codes: Optional[List[str]] = None
+) -> List[_dict]:
 	"""
 	Get list of dict containing items for which the inventory needs to be updated on Integeration.
 
@@ -14,64 +29,123 @@ def get_inventory_levels(warehouses: Tuple[str], integration: str) -> List[_dict
 	so ensure that if you sync the inventory with integration, you have also
 	updated `inventory_synced_on` field in related Ecommerce Item.
 
-	returns: list of _dict containing ecom_item, item_code, integration_item_code, variant_id, actual_qty, warehouse, reserved_qty
+	item_codes: only check specified items, see `get_inventory_changes`. None checks all items.
+
+	returns: list of _dict containing ecom_item, item_code, integration_item_code, variant_id, inventory_item_id, actual_qty, warehouse, reserved_qty
 	"""
+	if item_codes is not None and not item_codes:
+		return []
+
+	item_condition, item_values = _get_item_condition(item_codes)
+
 	data = frappe.db.sql(
 		f"""
-			SELECT ei.name as ecom_item, bin.item_code as item_code, integration_item_code, variant_id, actual_qty, warehouse, reserved_qty
+			SELECT ei.name as ecom_item, bin.item_code as item_code, integration_item_code, variant_id, inventory_item_id, actual_qty, warehouse, reserved_qty
 			FROM `tabEcommerce Item` ei
 				JOIN tabBin bin
 				ON ei.erpnext_item_code = bin.item_code
 			WHERE bin.warehouse in ({', '.join('%s' for _ in warehouses)})
 				AND bin.modified > ei.inventory_synced_on
 				AND integration = %s
+				{item_condition}
 		""",
-		values=warehouses + (integration,),
+		values=warehouses + (integration,) + item_values,
 		as_dict=1,
 	)
 
 	return data
 
 
-def get_inventory_levels_of_group_warehouse(warehouse: str, integration: str):
+def get_inventory_levels_of_group_warehouse(
+	warehouse: str, integration: str, item_codes: Optional[List[str]] = None
+):
 	"""Get updated inventory for a single group warehouse.
 
 	If warehouse mapping is done to a group warehouse then consolidation of all
 	leaf warehouses is required"""
+	return get_inventory_levels_of_group_warehouses([warehouse], integration, item_codes)
+
+
+def get_inventory_levels_of_group_warehouses(
+	warehouses: List[str], integration: str, item_codes: Optional[List[str]] = None
+) -> List[_dict]:
+	"""Get updated inventory for multiple group warehouses in a single query.
+
+	Quantities of all descendant warehouses are consolidated by joining on nested set range (lft, rgt)
+	of group warehouses, `warehouse` of returned rows is the group warehouse."""
+	if not warehouses or (item_codes is not None and not item_codes):
+		return []
 
-	child_warehouse = get_descendants_of("Warehouse", warehouse)
-	all_warehouses = tuple(child_warehouse) + (warehouse,)
+	bounds = list(get_warehouse_bounds(warehouses).values())
+	if not bounds:
+		return []
+
+	group_warehouses = " UNION ALL ".join(["SELECT %s as name, %s as lft, %s as rgt"] * len(bounds))
+	group_values = tuple(value for wh in bounds for value in (wh.name, wh.lft, wh.rgt))
+
+	item_condition, item_values = _get_item_condition(item_codes)
 
 	data = frappe.db.sql(
 		f"""
-			SELECT ei.name as ecom_item, bin.item_code as item_code,
-				integration_item_code,
-				variant_id,
-				sum(actual_qty) as actual_qty,
-				sum(reserved_qty) as reserved_qty,
+			SELECT group_wh.name as warehouse,
+				ei.name as ecom_item,
+				bin.item_code as item_code,
+				ei.integration_item_code,
+				ei.variant_id,
+				ei.inventory_item_id,
+				sum(bin.actual_qty) as actual_qty,
+				sum(bin.reserved_qty) as reserved_qty,
 				max(bin.modified) as last_updated,
-				max(ei.inventory_synced_on) as last_synced
-			FROM `tabEcommerce Item` ei
+				ei.inventory_synced_on as last_synced
+			FROM ({group_warehouses}) group_wh
+				JOIN tabWarehouse wh
+				ON wh.lft >= group_wh.lft AND wh.rgt <= group_wh.rgt
 				JOIN tabBin bin
+				ON bin.warehouse = wh.name
+				JOIN `tabEcommerce Item` ei
 				ON ei.erpnext_item_code = bin.item_code
-			WHERE bin.warehouse in ({', '.join(['%s'] * len(all_warehouses))})
-				AND integration = %s
+			WHERE ei.integration = %s
+				{item_condition}
 			GROUP BY
-				ei.erpnext_item_code
+				group_wh.name, ei.name
 			HAVING
 				last_updated > last_synced
 			""",
-		values=all_warehouses + (integration,),
+		values=group_values + (integration,) + item_values,
 		as_dict=1,
 	)
 
-	# add warehouse as group warehouse for sending to integrations
-	for item in data:
-		item.warehouse = warehouse
-
 	return data
 
 
+def get_warehouse_bounds(warehouses: List[str]) -> Dict[str, _dict]:
+	"""Get nested set bounds (lft, rgt) and is_group of warehouses.
+
+	Values are cached in redis until the warehouse tree is modified."""
+	cache = frappe.cache()
+
+	bounds = {}
+	for warehouse in warehouses:
+		cached_bounds = cache.hget(WAREHOUSE_BOUNDS_CACHE_KEY, warehouse)
+		if cached_bounds:
+			bounds[warehouse] = cached_bounds
+
+	missing = [wh for wh in warehouses if wh not in bounds]
+	if missing:
+		for wh in frappe.get_all(
+			"Warehouse", filters={"name": ("in", missing)}, fields=["name", "lft", "rgt", "is_group"]
+		):
+			cache.hset(WAREHOUSE_BOUNDS_CACHE_KEY, wh.name, wh)
+			bounds[wh.name] = wh
+
+	return bounds
+
+
+def clear_warehouse_bounds_cache(doc=None, method=None) -> None:
+	"""Called on any change in warehouse tree, adding a warehouse shifts bounds of other warehouses."""
+	frappe.cache().delete_key(WAREHOUSE_BOUNDS_CACHE_KEY)
+
+
 def update_inventory_sync_status(ecommerce_item, time=None):
 	"""Update `inventory_synced_on` timestamp to specified time or current time (if not specified).
 
@@ -81,3 +155,97 @@ def update_inventory_sync_status(ecommerce_item, time=None):
 		time = now()
 
 	frappe.db.set_value("Ecommerce Item", ecommerce_item, "inventory_synced_on", time)
+
+
+def update_inventory_sync_status_bulk(ecommerce_items: List[str], time=None) -> None:
+	"""Bulk version of `update_inventory_sync_status`, updates items in batches with one query each."""
+	if time is None:
+		time = now()
+
+	ecom_item = frappe.qb.DocType("Ecommerce Item")
+	for batch in create_batch(list(set(ecommerce_items)), INVENTORY_SYNC_STATUS_BATCH_SIZE):
+		(
+			frappe.qb.update(ecom_item)
+			.set(ecom_item.inventory_synced_on, time)
+			.set(ecom_item.modified, now())
+			.set(ecom_item.modified_by, frappe.session.user)
+			.where(ecom_item.name.isin(batch))
+		).run()
+
+
+def _get_item_condition(item_codes: Optional[List[str]]) -> Tuple[str, Tuple[str, ...]]:
+	if item_codes is None:
+		return "", ()
+	return f"AND bin.item_code in ({', '.join(['%s'] * len(item_codes))})", tuple(item_codes)
+
+
+def record_inventory_change(doc, method=None) -> None:
+	"""Add changed (item_code, warehouse) pairs to inventory change journal.
+
+	Called by hooks on stock ledger entries (actual qty) and sales orders (reserved qty)."""
+	if doc.doctype == "Stock Ledger Entry":
+		changes = [(doc.item_code, doc.warehouse)]
+	else:
+		changes = [(d.item_code, d.warehouse) for d in doc.get("items") if d.warehouse]
+
+	log_inventory_changes(changes)
+
+
+def log_inventory_changes(changes: Iterable[Tuple[str, str]]) -> None:
+	"""Append (item_code, warehouse) pairs to inventory change journal."""
+	changes = set(changes)
+	if not changes:
+		return
+
+	timestamp = now()
+	user = frappe.session.user
+	frappe.db.bulk_insert(
+		INVENTORY_CHANGE_DOCTYPE,
+		fields=["name", "creation", "modified", "owner", "modified_by", "item_code", "warehouse"],
+		values=[
+			(frappe.generate_hash(length=10), timestamp, timestamp, user, user, item_code, warehouse)
+			for item_code, warehouse in changes
+		],
+	)
+
+
+def get_inventory_changes(integration: str) -> Tuple[Optional[List[str]], str]:
+	"""Get items with inventory changes since last inventory sync of integration.
+
+	returns: (item codes, new cursor). Item codes are None if full scan is required, i.e. on first
+	sync or if the journal doesn't go back far enough. After syncing, the new cursor should be
+	saved using `set_inventory_change_cursor`.
+	"""
+	new_cursor = now()
+	cursor = frappe.db.get_global(_get_cursor_key(integration))
+
+	oldest_change = add_days(now_datetime(), -INVENTORY_CHANGE_RETENTION_DAYS)
+	if not cursor or get_datetime(cursor) < oldest_change:
+		return None, new_cursor
+
+	since = add_to_date(cursor, seconds=-INVENTORY_CHANGE_CURSOR_LAG_SECONDS)
+	item_codes = frappe.get_all(
+		INVENTORY_CHANGE_DOCTYPE,
+		filters={"creation": (">", since)},
+		fields=["item_code"],
+		distinct=True,
+		pluck="item_code",
+	)
+	return item_codes, new_cursor
+
+
+def set_inventory_change_cursor(integration: str, cursor: str) -> None:
+	frappe.db.set_global(_get_cursor_key(integration), cursor)
+
+
+def _get_cursor_key(integration: str) -> str:
+	return f"ecommerce_inventory_change_cursor_{integration}"
+
+
+def delete_old_inventory_changes() -> None:
+	"""Prune inventory change journal, runs daily."""
+	journal = frappe.qb.DocType(INVENTORY_CHANGE_DOCTYPE)
+	frappe.db.delete(
+		journal,
+		filters=journal.creation < add_days(now_datetime(), -INVENTORY_CHANGE_RETENTION_DAYS),
+	)
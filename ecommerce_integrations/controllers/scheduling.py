@@ -1,6 +1,30 @@
+from typing import Dict
+
 import frappe
 from frappe.utils import add_to_date, cint, get_datetime, now
 
+from ecommerce_integrations.utils.cache import get_counters
+
+# Redis hash with counts of skipped runs, see `get_lease_stats`
+LEASE_STATS_KEY = "ecommerce_job_lease_stats"
+
+# lease expires if the job dies without releasing it, running jobs extend it using `renew_lease`
+DEFAULT_LEASE_TTL = 10 * 60  # seconds
+
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+	return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_RENEW_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+	return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
 
 def need_to_run(setting, interval_field, timestamp_field) -> bool:
 	"""A utility function to make "configurable" scheduled events.
@@ -12,14 +36,120 @@ def need_to_run(setting, interval_field, timestamp_field) -> bool:
 	        - interval_field is in minutes.
 	        - timestamp field is datetime field.
 	        - This function is called from scheuled job with less frequency than lowest interval_field. Ideally, every minute.
+
+	When it returns True, the caller also holds a lease which prevents other workers from running
+	the same job. Caller should call `check_lease` periodically in long running jobs and
+	`release_lease` once it's done.
+
+	Timestamp is committed right away, the lease is released before the job's transaction is
+	committed and other workers must see the new timestamp by then.
 	"""
+	if not _is_due(setting, interval_field, timestamp_field):
+		return False
+
+	if not _acquire_lease(setting, timestamp_field):
+		_record_skipped_run(setting, timestamp_field)
+		return False
+
+	# previous run might have completed after the first check
+	if not _is_due(setting, interval_field, timestamp_field):
+		release_lease(setting, timestamp_field)
+		return False
+
+	frappe.db.set_value(setting, None, timestamp_field, now(), update_modified=False)
+	frappe.db.commit()
+	return True
+
+
+def _is_due(setting, interval_field, timestamp_field) -> bool:
 	interval = frappe.db.get_single_value(setting, interval_field, cache=True)
 	last_run = frappe.db.get_single_value(setting, timestamp_field)
 
-	if last_run and get_datetime() < get_datetime(
-		add_to_date(last_run, minutes=cint(interval, default=10))
-	):
+	return not (
+		last_run
+		and get_datetime() < get_datetime(add_to_date(last_run, minutes=cint(interval, default=10)))
+	)
+
+
+class LeaseLostError(Exception):
+	pass
+
+
+def renew_lease(setting, timestamp_field) -> bool:
+	"""Heartbeat for running job, extends the lease acquired by `need_to_run`.
+
+	Lease is only extended if a third of its TTL has passed, so it's cheap to call this often.
+	Forced runs don't hold a lease and are never stopped.
+	returns: False if lease was lost and the job should stop."""
+	key = _get_lease_key(setting, timestamp_field)
+	lease = (frappe.flags.scheduler_leases or {}).get(key)
+	if not lease:
+		return True
+	if lease.lost:
 		return False
 
-	frappe.db.set_value(setting, None, timestamp_field, now(), update_modified=False)
+	ttl = _get_lease_ttl()
+	if get_datetime() < add_to_date(lease.renewed_at, seconds=ttl // 3):
+		return True
+
+	cache = frappe.cache()
+	if not cache.eval(_RENEW_SCRIPT, 1, cache.make_key(key), lease.token, ttl):
+		lease.lost = True
+		return False
+
+	lease.renewed_at = get_datetime()
 	return True
+
+
+def check_lease(setting, timestamp_field) -> None:
+	"""Renew lease of running job, raises `LeaseLostError` if it was lost.
+
+	Another worker can acquire an expired lease and run the same job, so the job must stop."""
+	if not renew_lease(setting, timestamp_field):
+		raise LeaseLostError(
+			f"Lease of {setting}:{timestamp_field} expired, another run of the job might be in progress."
+		)
+
+
+def release_lease(setting, timestamp_field) -> None:
+	key = _get_lease_key(setting, timestamp_field)
+	lease = (frappe.flags.scheduler_leases or {}).pop(key, None)
+	if lease:
+		cache = frappe.cache()
+		cache.eval(_RELEASE_SCRIPT, 1, cache.make_key(key), lease.token)
+
+
+def get_lease_stats() -> Dict[str, int]:
+	"""Get number of runs skipped because another instance of the job was still running."""
+	return get_counters(LEASE_STATS_KEY)
+
+
+def _acquire_lease(setting, timestamp_field) -> bool:
+	key = _get_lease_key(setting, timestamp_field)
+	token = frappe.generate_hash(length=20)
+
+	cache = frappe.cache()
+	if not cache.set(cache.make_key(key), token, nx=True, ex=_get_lease_ttl()):
+		return False
+
+	if frappe.flags.scheduler_leases is None:
+		frappe.flags.scheduler_leases = {}
+	frappe.flags.scheduler_leases[key] = frappe._dict(token=token, renewed_at=get_datetime())
+	return True
+
+
+def _record_skipped_run(setting, timestamp_field) -> None:
+	job = f"{setting}:{timestamp_field}"
+	cache = frappe.cache()
+	cache.hincrby(cache.make_key(LEASE_STATS_KEY), job, 1)
+	frappe.logger("ecommerce_integrations").info(
+		f"Skipped {job} as previous run is still in progress ({frappe.local.site})"
+	)
+
+
+def _get_lease_key(setting, timestamp_field) -> str:
+	return f"ecommerce_job_lease:{setting}:{timestamp_field}"
+
+
+def _get_lease_ttl() -> int:
+	return cint(frappe.conf.get("ecommerce_job_lease_ttl")) or DEFAULT_LEASE_TTL
@@ -1,10 +1,19 @@
-from typing import Dict, List, NewType
+import copy
+import functools
+from typing import Dict, List, NewType, Tuple
 
+import frappe
 from frappe.model.document import Document
+from redis import Redis
 
 ERPNextWarehouse = NewType("ERPNextWarehouse", str)
 IntegrationWarehouse = NewType("IntegrationWarehouse", str)
 
+SETTING_VERSION_KEY = "ecommerce_setting_version"
+
+# (site, doctype) -> (version, document), shared by all requests / jobs handled by the process.
+_setting_cache: Dict[Tuple[str, str], Tuple[str, Document]] = {}
+
 
 class SettingController(Document):
 	def is_enabled(self) -> bool:
@@ -19,3 +28,97 @@ class SettingController(Document):
 
 	def get_integration_to_erpnext_wh_mapping(self) -> Dict[IntegrationWarehouse, ERPNextWarehouse]:
 		raise NotImplementedError()
+
+	def on_change(self):
+		clear_setting_cache(self.doctype)
+
+	def precompute(self) -> None:
+		"""Compute memoized values of cached settings once, when settings are loaded."""
+		for method in (
+			self.get_erpnext_warehouses,
+			self.get_erpnext_to_integration_wh_mapping,
+			self.get_integration_to_erpnext_wh_mapping,
+		):
+			try:
+				method()
+			except NotImplementedError:
+				pass
+
+
+def get_cached_setting(doctype: str) -> SettingController:
+	"""Get settings document, reloaded only when settings are saved.
+
+	Returned document is shared by all callers, it must not be modified.
+	Use `frappe.get_doc` for updating the settings."""
+	local_cache = frappe.local.__dict__.setdefault("ecommerce_setting_cache", {})
+	if doctype in local_cache:
+		return local_cache[doctype]
+
+	version = _get_setting_version(doctype)
+	cache_key = (frappe.local.site, doctype)
+
+	cached = _setting_cache.get(cache_key)
+	if cached and cached[0] == version:
+		setting = cached[1]
+	else:
+		setting = frappe.get_doc(doctype)
+		setting.flags.from_setting_cache = True
+		if isinstance(setting, SettingController):
+			setting.precompute()
+		_setting_cache[cache_key] = (version, setting)
+
+	local_cache[doctype] = setting
+	return setting
+
+
+def clear_setting_cache(doctype: str) -> None:
+	"""Invalidate cached settings in all processes once current transaction is committed.
+
+	Settings read before the commit would be cached under the new version otherwise, and nothing
+	is invalidated if the transaction is rolled back."""
+	frappe.db.after_commit.add(functools.partial(_bump_setting_version, doctype))
+
+
+def _bump_setting_version(doctype: str) -> None:
+	cache = frappe.cache()
+	# RedisWrapper.hset pickles values, version is read by raw `hget`.
+	Redis.hset(cache, cache.make_key(SETTING_VERSION_KEY), doctype, frappe.generate_hash(length=10))
+	_setting_cache.pop((frappe.local.site, doctype), None)
+	frappe.local.__dict__.get("ecommerce_setting_cache", {}).pop(doctype, None)
+
+
+def memoize_on_cached_setting(method):
+	"""Memoize result of a method on settings loaded by `get_cached_setting`.
+
+	Methods of settings loaded otherwise are not memoized as those documents can be modified.
+	Memoized dicts and lists are shared by the whole process, so callers get a shallow copy of
+	them. Their items should be immutable (strings, tuples)."""
+
+	@functools.wraps(method)
+	def wrapper(self, *args, **kwargs):
+		if not self.flags.from_setting_cache:
+			return method(self, *args, **kwargs)
+
+		memo = self.flags.setdefault("memoized", {})
+		key = (method.__name__, args, tuple(sorted(kwargs.items())))
+		if key not in memo:
+			memo[key] = method(self, *args, **kwargs)
+		return copy.copy(memo[key])
+
+	return wrapper
+
+
+def _get_setting_version(doctype: str) -> str:
+	"""Random token that changes on every save of the settings.
+
+	Token is used instead of a counter so that versions can't repeat after redis is flushed."""
+	cache = frappe.cache()
+	key = cache.make_key(SETTING_VERSION_KEY)
+
+	version = Redis.hget(cache, key, doctype)
+	if version is None:
+		# all processes should agree on the version, only set if no one has set it yet.
+		Redis.hsetnx(cache, key, doctype, frappe.generate_hash(length=10))
+		version = Redis.hget(cache, key, doctype)
+
+	return frappe.safe_decode(version)
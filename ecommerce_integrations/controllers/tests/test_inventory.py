@@ -0,0 +1,74 @@
+# Copyright (c) 2021, Frappe and Contributors
+# See LICENSE
+
+import unittest
+
+import frappe
+from frappe.utils import add_days, now
+
+from ecommerce_integrations.controllers.inventory import (
+	INVENTORY_CHANGE_DOCTYPE,
+	get_inventory_changes,
+	log_inventory_changes,
+	set_inventory_change_cursor,
+	update_inventory_sync_status_bulk,
+)
+
+TEST_INTEGRATION = "_test_inventory_journal"
+
+
+class TestInventoryChangeJournal(unittest.TestCase):
+	def tearDown(self):
+		frappe.db.delete(INVENTORY_CHANGE_DOCTYPE)
+
+	def test_full_scan_without_cursor(self):
+		frappe.db.set_global(f"ecommerce_inventory_change_cursor_{TEST_INTEGRATION}", None)
+		item_codes, cursor = get_inventory_changes(TEST_INTEGRATION)
+		self.assertIsNone(item_codes)
+		self.assertTrue(cursor)
+
+		set_inventory_change_cursor(TEST_INTEGRATION, add_days(now(), -30))
+		item_codes, _ = get_inventory_changes(TEST_INTEGRATION)
+		self.assertIsNone(item_codes, "Full scan is required if journal is pruned after cursor")
+
+	def test_changes_since_cursor(self):
+		set_inventory_change_cursor(TEST_INTEGRATION, now())
+		log_inventory_changes([("_Test Item", "_Test Warehouse - _TC")] * 2)
+
+		item_codes, cursor = get_inventory_changes(TEST_INTEGRATION)
+		self.assertEqual(item_codes, ["_Test Item"])
+
+		frappe.db.delete(INVENTORY_CHANGE_DOCTYPE)
+		set_inventory_change_cursor(TEST_INTEGRATION, cursor)
+		item_codes, _ = get_inventory_changes(TEST_INTEGRATION)
+		self.assertEqual(item_codes, [])
+
+
+class TestInventorySyncStatus(unittest.TestCase):
+	def test_bulk_update(self):
+		ecom_items = [
+			frappe.get_doc(
+				{
+					"doctype": "Ecommerce Item",
+					"integration": "shopify",
+					"integration_item_code": f"_TEST_SYNC_STATUS_{i}",
+					"erpnext_item_code": "_Test Item",
+				}
+			)
+			.insert()
+			.name
+			for i in range(3)
+		]
+		synced_on = add_days(now(), 1)
+
+		update_inventory_sync_status_bulk(ecom_items[:2], time=synced_on)
+
+		synced = frappe.get_all(
+			"Ecommerce Item",
+			filters={"name": ("in", ecom_items), "inventory_synced_on": synced_on},
+			pluck="name",
+		)
+		self.assertEqual(sorted(synced), sorted(ecom_items[:2]))
+
+		for ecom_item in ecom_items:
+			frappe.delete_doc("Ecommerce Item", ecom_item)
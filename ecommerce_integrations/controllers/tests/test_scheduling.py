@@ -0,0 +1,60 @@
+# Copyright (c) 2021, Frappe and Contributors
+# See LICENSE
+
+import unittest
+
+import frappe
+from frappe.utils import add_to_date
+
+from ecommerce_integrations.controllers.scheduling import (
+	LeaseLostError,
+	check_lease,
+	get_lease_stats,
+	need_to_run,
+	release_lease,
+	renew_lease,
+)
+
+SETTING = "Unicommerce Settings"
+ARGS = (SETTING, "inventory_sync_frequency", "last_inventory_sync")
+
+
+class TestSchedulingLease(unittest.TestCase):
+	def setUp(self):
+		frappe.db.set_value(SETTING, None, "last_inventory_sync", None)
+
+	def tearDown(self):
+		release_lease(SETTING, "last_inventory_sync")
+
+	def test_single_instance(self):
+		self.assertTrue(need_to_run(*ARGS))
+		self.assertFalse(need_to_run(*ARGS), "Job ran again before interval")
+
+		# previous run is still in progress when next run is due
+		frappe.db.set_value(SETTING, None, "last_inventory_sync", None)
+		own_leases = frappe.flags.scheduler_leases
+		frappe.flags.scheduler_leases = None
+
+		skipped = get_lease_stats().get(f"{SETTING}:last_inventory_sync", 0)
+		self.assertFalse(need_to_run(*ARGS), "Overlapping run allowed")
+		self.assertEqual(get_lease_stats()[f"{SETTING}:last_inventory_sync"], skipped + 1)
+
+		frappe.flags.scheduler_leases = own_leases
+		release_lease(SETTING, "last_inventory_sync")
+		self.assertTrue(need_to_run(*ARGS))
+
+	def test_lost_lease(self):
+		self.assertTrue(need_to_run(*ARGS))
+		check_lease(SETTING, "last_inventory_sync")
+
+		# lease expired while the job was running
+		key = f"ecommerce_job_lease:{SETTING}:last_inventory_sync"
+		lease = frappe.flags.scheduler_leases[key]
+		lease.renewed_at = add_to_date(lease.renewed_at, hours=-1)
+		frappe.cache().delete_value(key)
+
+		self.assertRaises(LeaseLostError, check_lease, SETTING, "last_inventory_sync")
+		self.assertFalse(renew_lease(SETTING, "last_inventory_sync"))
+
+	def test_forced_run_not_stopped(self):
+		check_lease(SETTING, "last_inventory_sync")
@@ -1,9 +1,72 @@
 # Copyright (c) 2021, Frappe and Contributors
 # See LICENSE
 
-# import frappe
 import unittest
 
+import frappe
+
+from ecommerce_integrations.controllers.setting import get_cached_setting
+
+SETTING = "Unicommerce Settings"
+
 
 class TestShopifySetting(unittest.TestCase):
 	pass
+
+
+class TestCachedSetting(unittest.TestCase):
+	def setUp(self):
+		self.clear_request_cache()
+
+	def clear_request_cache(self):
+		frappe.local.__dict__.pop("ecommerce_setting_cache", None)
+
+	def test_cached_across_requests(self):
+		setting = get_cached_setting(SETTING)
+		self.assertIs(setting, get_cached_setting(SETTING))
+
+		self.clear_request_cache()
+		self.assertIs(setting, get_cached_setting(SETTING))
+
+	def save_setting(self):
+		doc = frappe.get_doc(SETTING)
+		doc.flags.ignore_custom_fields = True
+		doc.flags.ignore_mandatory = True
+		doc.save()
+
+	def test_invalidated_on_commit(self):
+		setting = get_cached_setting(SETTING)
+
+		self.save_setting()
+		self.clear_request_cache()
+		self.assertIs(setting, get_cached_setting(SETTING), "invalidated before commit")
+
+		frappe.db.commit()
+		self.clear_request_cache()
+		self.assertIsNot(setting, get_cached_setting(SETTING))
+
+	def test_not_invalidated_on_rollback(self):
+		setting = get_cached_setting(SETTING)
+
+		self.save_setting()
+		frappe.db.rollback()
+
+		self.clear_request_cache()
+		self.assertIs(setting, get_cached_setting(SETTING))
+
+	def test_memoized_warehouse_mapping(self):
+		setting = get_cached_setting(SETTING)
+		mapping = setting.get_erpnext_to_integration_wh_mapping(all_wh=True)
+		self.assertTrue(setting.flags.memoized)
+
+		# callers get a copy of memoized value
+		mapping["_Test Warehouse"] = "_Test Integration Warehouse"
+		self.assertNotIn("_Test Warehouse", setting.get_erpnext_to_integration_wh_mapping(all_wh=True))
+
+		doc = frappe.get_doc(SETTING)
+		self.assertIsNot(
+			doc.get_erpnext_to_integration_wh_mapping(), doc.get_erpnext_to_integration_wh_mapping()
+		)
+		self.assertEqual(
+			doc.get_erpnext_to_integration_wh_mapping(), setting.get_erpnext_to_integration_wh_mapping()
+		)
@@ -0,0 +1,9 @@
+from ecommerce_integrations.controllers.setting import _bump_setting_version
+
+
+def clear_cached_setting(doctype: str) -> None:
+	"""Invalidate cached settings right away.
+
+	Saving settings only invalidates the cache once the transaction is committed, tests modify
+	settings without committing."""
+	_bump_setting_version(doctype)
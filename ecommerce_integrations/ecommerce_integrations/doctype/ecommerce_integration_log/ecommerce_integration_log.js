@@ -10,7 +10,6 @@ frappe.ui.form.on('Ecommerce Integration Log', {
 					args:{
 						method:frm.doc.method,
 						name: frm.doc.name,
-						request_data: frm.doc.request_data
 					},
 					callback: function(r){
 						frappe.msgprint(__("Reattempting to sync"))
@@ -1,20 +1,62 @@
 # Copyright (c) 2021, Frappe and contributors
 # For license information, please see LICENSE
 
+import gzip
 import json
+import os
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
 
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.query_builder import Interval
-from frappe.query_builder.functions import Now
-from frappe.utils import strip_html
+from frappe.utils import add_days, cint, now_datetime, strip_html
 from frappe.utils.data import cstr
 
+from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_integration_payload.ecommerce_integration_payload import (
+	PAYLOAD_DOCTYPE,
+	get_payload_delete_cutoff,
+	get_payload,
+	store_payload,
+)
+from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_item.ecommerce_item import (
+	clear_local_item_code_cache,
+)
+
+LOG_DOCTYPE = "Ecommerce Integration Log"
+
+# retention in days per status, overridden using `ecommerce_integration_log_retention` site config
+DEFAULT_LOG_RETENTION = {"Success": 90}
+
+LOG_RETENTION_CHUNK_SIZE = 1000
+
 
 class EcommerceIntegrationLog(Document):
 	def validate(self):
 		self._set_title()
+		self._store_payloads()
+
+	def onload(self):
+		# payloads are only decompressed for viewing in form
+		self.request_data = self.get_request_data()
+		self.response_data = self.get_response_data()
+
+	def get_request_data(self):
+		return self.request_data or get_payload(self.request_payload)
+
+	def get_response_data(self):
+		return self.response_data or get_payload(self.response_payload)
+
+	def _store_payloads(self):
+		"""Move request and response data to compressed and deduplicated payload storage."""
+		if self.request_data:
+			self.request_payload = store_payload(self.request_data)
+			self.request_data = None
+
+		if self.response_data:
+			self.response_payload = store_payload(self.response_data)
+			self.response_data = None
 
 	def _set_title(self):
 		title = None
@@ -31,10 +73,7 @@ class EcommerceIntegrationLog(Document):
 
 	@staticmethod
 	def clear_old_logs(days=90):
-		table = frappe.qb.DocType("Ecommerce Integration Log")
-		frappe.db.delete(
-			table, filters=((table.modified < (Now() - Interval(days=days)))) & (table.status == "Success")
-		)
+		delete_logs(status="Success", days=days)
 
 
 def create_log(
@@ -49,28 +88,39 @@ def create_log(
 	make_new=False,
 ):
 	make_new = make_new or not bool(frappe.flags.request_id)
+	log_buffer = frappe.flags.integration_log_buffer
 
 	if rollback:
 		frappe.db.rollback()
+		clear_local_item_code_cache()
 
 	if make_new:
 		log = frappe.get_doc({"doctype": "Ecommerce Integration Log", "integration": cstr(module_def)})
-		log.insert(ignore_permissions=True)
+		if log_buffer is None:
+			log.insert(ignore_permissions=True)
+		else:
+			# name is required for linking other logs to it before it's written.
+			log.name = frappe.generate_hash(length=10)
+			log.flags.pending_insert = True
+	elif log_buffer is not None and frappe.flags.request_id in log_buffer:
+		log = log_buffer[frappe.flags.request_id]
 	else:
 		log = frappe.get_doc("Ecommerce Integration Log", frappe.flags.request_id)
 
-	if response_data and not isinstance(response_data, str):
-		response_data = json.dumps(response_data, sort_keys=True, indent=4)
-
-	if request_data and not isinstance(request_data, str):
-		request_data = json.dumps(request_data, sort_keys=True, indent=4)
-
 	log.message = message or _get_message(exception)
 	log.method = log.method or method
 	log.response_data = response_data or log.response_data
 	log.request_data = request_data or log.request_data
 	log.traceback = log.traceback or frappe.get_traceback()
 	log.status = status
+
+	# used for attaching job level information, see `utils.instrumentation`
+	frappe.flags.last_integration_log = log.name
+
+	if log_buffer is not None:
+		log_buffer[log.name] = log
+		return log
+
 	log.save(ignore_permissions=True)
 
 	frappe.db.commit()
@@ -78,6 +128,44 @@ def create_log(
 	return log
 
 
+@contextmanager
+def buffered_logs(module_def=None, method=None):
+	"""Collect logs created using `create_log` and write them once when the job ends.
+
+	Can be used as a context manager or decorator. All logs are written with a single
+	commit at the end. Unhandled exceptions roll back the transaction and are recorded
+	on the current log before it's flushed and the exception is re-raised.
+
+	Nested usage is a no-op, the outermost context flushes the logs."""
+
+	if frappe.flags.integration_log_buffer is not None:
+		yield
+		return
+
+	frappe.flags.integration_log_buffer = {}
+	try:
+		yield
+	except Exception as e:
+		create_log(module_def=module_def, status="Error", exception=e, rollback=True, method=method)
+		raise
+	finally:
+		log_buffer = frappe.flags.integration_log_buffer
+		frappe.flags.integration_log_buffer = None
+		_flush_logs(log_buffer)
+
+
+def _flush_logs(log_buffer) -> None:
+	for log in log_buffer.values():
+		if log.flags.pending_insert:
+			log.flags.pending_insert = False
+			log.flags.name_set = True
+			log.insert(ignore_permissions=True)
+		else:
+			log.save(ignore_permissions=True)
+
+	frappe.db.commit()
+
+
 def _get_message(exception):
 	if hasattr(exception, "message"):
 		return strip_html(exception.message)
@@ -87,10 +175,168 @@ def _get_message(exception):
 		return _("Something went wrong while syncing")
 
 
+def on_doctype_update():
+	frappe.db.add_index(LOG_DOCTYPE, ["status", "modified"])
+	frappe.db.add_index(LOG_DOCTYPE, ["integration", "status", "modified"])
+
+
+def apply_log_retention() -> None:
+	"""Delete (and optionally archive) old logs as per configured retention. Runs daily.
+
+	site_config.json:
+	        "ecommerce_integration_log_retention": {
+	                "default": {"Success": 30, "Error": 180},
+	                "shopify": {"Invalid": 7}
+	        },
+	        "ecommerce_integration_log_archive": 1
+
+	Integration specific retention is merged with default retention. Retention of 0 days
+	means logs with that status are kept forever.
+	"""
+	retention_config = frappe.conf.get("ecommerce_integration_log_retention") or {}
+	archive = cint(frappe.conf.get("ecommerce_integration_log_archive"))
+
+	default_retention = {**DEFAULT_LOG_RETENTION, **retention_config.get("default", {})}
+	integrations = frappe.get_all(LOG_DOCTYPE, fields=["integration"], distinct=True, pluck="integration")
+
+	for integration in integrations:
+		retention = {**default_retention, **retention_config.get(integration or "", {})}
+		for status, days in retention.items():
+			if cint(days) > 0:
+				delete_logs(status=status, days=cint(days), integration=integration, archive=archive)
+
+
+def delete_logs(
+	status: str, days: int, integration: Optional[str] = "*", archive: bool = False
+) -> None:
+	"""Delete logs older than `days` and their payloads in chunks, committing after every chunk.
+
+	integration: "*" for logs of all integrations."""
+	log = frappe.qb.DocType(LOG_DOCTYPE)
+	query = (
+		frappe.qb.from_(log)
+		.select(log.name, log.request_payload, log.response_payload)
+		.where(log.status == status)
+		.where(log.modified < add_days(now_datetime(), -days))
+		.limit(LOG_RETENTION_CHUNK_SIZE)
+	)
+	if integration is None:
+		query = query.where(log.integration.isnull())
+	elif integration != "*":
+		query = query.where(log.integration == integration)
+
+	while True:
+		logs = query.run(as_dict=True)
+		if not logs:
+			break
+
+		names = [d.name for d in logs]
+		if archive:
+			archive_logs(names)
+		frappe.db.delete(LOG_DOCTYPE, {"name": ("in", names)})
+		_delete_unreferenced_payloads(
+			{d.request_payload for d in logs} | {d.response_payload for d in logs}
+		)
+		frappe.db.commit()
+
+		if len(names) < LOG_RETENTION_CHUNK_SIZE:
+			break
+
+
+def archive_logs(names: List[str]) -> None:
+	"""Append logs to gzip compressed monthly JSONL files in private files directory."""
+	logs = frappe.get_all(LOG_DOCTYPE, filters={"name": ("in", names)}, fields=["*"])
+
+	payload_names = {d.request_payload for d in logs} | {d.response_payload for d in logs}
+	payload_names.discard(None)
+	payloads = _get_payloads(list(payload_names))
+
+	logs_by_month = defaultdict(list)
+	for log in logs:
+		log.request_data = log.request_data or payloads.get(log.request_payload)
+		log.response_data = log.response_data or payloads.get(log.response_payload)
+		logs_by_month[log.modified.strftime("%Y-%m")].append(log)
+
+	archive_dir = frappe.get_site_path("private", "files", "ecommerce_integration_log_archive")
+	os.makedirs(archive_dir, exist_ok=True)
+
+	for month, month_logs in logs_by_month.items():
+		# gzip files can be appended to, each append creates a new member.
+		with gzip.open(os.path.join(archive_dir, f"{month}.jsonl.gz"), "at") as f:
+			for log in month_logs:
+				f.write(json.dumps(log, default=str) + "\n")
+
+
+def _get_payloads(names: List[str]) -> Dict[str, str]:
+	if not names:
+		return {}
+	payloads = frappe.get_all(
+		PAYLOAD_DOCTYPE, filters={"name": ("in", names)}, fields=["name", "compression", "payload"]
+	)
+	return {p.name: frappe.get_doc({"doctype": PAYLOAD_DOCTYPE, **p}).get_data() for p in payloads}
+
+
+def _delete_unreferenced_payloads(names: Iterable[Optional[str]]) -> None:
+	"""Delete payloads of deleted logs, unless other logs share them (payloads are deduplicated).
+
+	Recently stored or reused payloads are kept, logs of running jobs might reference them."""
+	names = [name for name in set(names) if name]
+	if not names:
+		return
+
+	referenced = set()
+	for field in ("request_payload", "response_payload"):
+		referenced.update(frappe.get_all(LOG_DOCTYPE, filters={field: ("in", names)}, pluck=field))
+
+	unreferenced = [name for name in names if name not in referenced]
+	if unreferenced:
+		frappe.db.delete(
+			PAYLOAD_DOCTYPE,
+			{"name": ("in", unreferenced), "modified": ("<", get_payload_delete_cutoff())},
+		)
+
+
+def delete_orphan_payloads() -> None:
+	"""Delete payloads which are not referenced by any log anymore.
+
+	Scans all payloads, retention job deletes payloads along with their logs. This is only needed
+	to clean up after logs deleted by other means."""
+	while True:
+		# recently stored or reused payloads might be used by logs that aren't committed yet.
+		names = frappe.db.sql_list(
+			"""
+			SELECT payload.name
+			FROM `tabEcommerce Integration Payload` payload
+			WHERE payload.modified < %(cutoff)s
+				AND NOT EXISTS (
+					SELECT 1 FROM `tabEcommerce Integration Log` log
+					WHERE log.request_payload = payload.name)
+				AND NOT EXISTS (
+					SELECT 1 FROM `tabEcommerce Integration Log` log
+					WHERE log.response_payload = payload.name)
+			LIMIT %(limit)s
+			""",
+			{"cutoff": get_payload_delete_cutoff(), "limit": LOG_RETENTION_CHUNK_SIZE},
+		)
+		if not names:
+			break
+
+		frappe.db.delete(
+			PAYLOAD_DOCTYPE, {"name": ("in", names), "modified": ("<", get_payload_delete_cutoff())}
+		)
+		frappe.db.commit()
+
+		if len(names) < LOG_RETENTION_CHUNK_SIZE:
+			break
+
+
 @frappe.whitelist()
-def resync(method, name, request_data):
+def resync(method, name, request_data=None):
 	frappe.only_for("System Manager")
 
+	if not request_data:
+		request_data = frappe.get_doc("Ecommerce Integration Log", name).get_request_data()
+
 	frappe.db.set_value("Ecommerce Integration Log", name, "status", "Queued", update_modified=False)
 	frappe.db.set_value("Ecommerce Integration Log", name, "traceback", "", update_modified=False)
 
@@ -1,9 +1,104 @@
 # Copyright (c) 2021, Frappe and Contributors
 # See LICENSE
 
-# import frappe
 import unittest
 
+import frappe
+from frappe.utils import add_days, now_datetime
+
+from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_integration_log.ecommerce_integration_log import (
+	buffered_logs,
+	create_log,
+	delete_logs,
+)
+
+LOG_DOCTYPE = "Ecommerce Integration Log"
+PAYLOAD_DOCTYPE = "Ecommerce Integration Payload"
+
 
 class TestEcommerceIntegrationLog(unittest.TestCase):
-	pass
+	def tearDown(self):
+		frappe.flags.request_id = None
+		frappe.flags.integration_log_buffer = None
+
+	def test_buffered_logs_are_written_on_exit(self):
+		with buffered_logs():
+			log = create_log(module_def="shopify", method="test_method", make_new=True)
+			frappe.flags.request_id = log.name
+			create_log(module_def="shopify", status="Success", message="done")
+
+			self.assertFalse(frappe.db.exists(LOG_DOCTYPE, log.name))
+
+		log = frappe.get_doc(LOG_DOCTYPE, log.name)
+		self.assertEqual(log.status, "Success")
+		self.assertEqual(log.method, "test_method")
+		self.assertEqual(log.message, "done")
+
+	def test_buffered_logs_flush_on_error(self):
+		def failing_job():
+			frappe.flags.request_id = create_log(module_def="shopify", make_new=True).name
+			raise frappe.ValidationError("Failed job")
+
+		self.assertRaises(frappe.ValidationError, buffered_logs(module_def="shopify")(failing_job))
+
+		log = frappe.get_doc(LOG_DOCTYPE, frappe.flags.request_id)
+		self.assertEqual(log.status, "Error")
+		self.assertIn("Failed job", log.message)
+
+	def test_nested_buffer(self):
+		with buffered_logs():
+			with buffered_logs():
+				log = create_log(module_def="shopify", make_new=True)
+			self.assertFalse(frappe.db.exists(LOG_DOCTYPE, log.name))
+
+		self.assertTrue(frappe.db.exists(LOG_DOCTYPE, log.name))
+
+	def test_delete_logs(self):
+		old_success = create_log(module_def="shopify", status="Success", make_new=True)
+		old_error = create_log(module_def="shopify", status="Error", make_new=True)
+		other_integration = create_log(module_def="unicommerce", status="Success", make_new=True)
+		new_success = create_log(module_def="shopify", status="Success", make_new=True)
+
+		for log in (old_success, old_error, other_integration):
+			frappe.db.set_value(
+				LOG_DOCTYPE, log.name, "modified", add_days(now_datetime(), -100), update_modified=False
+			)
+
+		delete_logs(status="Success", days=90, integration="shopify")
+
+		self.assertFalse(frappe.db.exists(LOG_DOCTYPE, old_success.name))
+		self.assertTrue(frappe.db.exists(LOG_DOCTYPE, old_error.name))
+		self.assertTrue(frappe.db.exists(LOG_DOCTYPE, other_integration.name))
+		self.assertTrue(frappe.db.exists(LOG_DOCTYPE, new_success.name))
+
+	def test_delete_logs_deletes_payloads(self):
+		def make_log(request_data):
+			return create_log(
+				module_def="shopify", status="Success", request_data=request_data, make_new=True
+			)
+
+		old = make_log({"old": 1})
+		shared = make_log({"shared": 1})
+		new = make_log({"shared": 1})
+		recent = make_log({"recent": 1})
+
+		for log in (old, shared, recent):
+			frappe.db.set_value(
+				LOG_DOCTYPE, log.name, "modified", add_days(now_datetime(), -100), update_modified=False
+			)
+		for log in (old, shared):
+			frappe.db.set_value(
+				PAYLOAD_DOCTYPE,
+				log.request_payload,
+				"modified",
+				add_days(now_datetime(), -100),
+				update_modified=False,
+			)
+
+		delete_logs(status="Success", days=90, integration="shopify")
+
+		self.assertFalse(frappe.db.exists(PAYLOAD_DOCTYPE, old.request_payload))
+		# still referenced by a log that is retained
+		self.assertTrue(frappe.db.exists(PAYLOAD_DOCTYPE, new.request_payload))
+		# recently stored, might be reused by a log that isn't committed yet
+		self.assertTrue(frappe.db.exists(PAYLOAD_DOCTYPE, recent.request_payload))
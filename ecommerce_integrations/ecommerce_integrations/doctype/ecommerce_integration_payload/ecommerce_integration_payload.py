@@ -0,0 +1,101 @@
+# Copyright (c) 2021, Frappe and contributors
+# For license information, please see LICENSE
+
+import base64
+import hashlib
+import json
+import zlib
+from typing import Any, Optional
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, add_to_date, get_datetime, now, now_datetime
+
+COMPRESSION = "zlib"
+
+PAYLOAD_DOCTYPE = "Ecommerce Integration Payload"
+
+# unreferenced payloads are only deleted if they weren't stored or reused within grace period,
+# logs referencing them might not be committed yet. Reused payloads are touched at most hourly.
+PAYLOAD_DELETE_GRACE_DAYS = 1
+PAYLOAD_TOUCH_INTERVAL = 60 * 60  # seconds
+
+
+class EcommerceIntegrationPayload(Document):
+	"""Compressed request/response data of integration logs.
+
+	Name of the document is sha256 hash of the payload, so same payload is stored only once."""
+
+	compression: str
+	size: int
+	payload: str  # base64 encoded compressed data
+
+	def get_data(self) -> str:
+		data = base64.b64decode(self.payload)
+		if self.compression == COMPRESSION:
+			data = zlib.decompress(data)
+		return data.decode()
+
+
+def store_payload(data: Any) -> Optional[str]:
+	"""Store payload in minified and compressed form.
+
+	returns: name of payload document, None if there is nothing to store."""
+	if not data:
+		return
+
+	serialized = _minify(data).encode()
+	content_hash = hashlib.sha256(serialized).hexdigest()
+
+	modified = frappe.db.get_value(PAYLOAD_DOCTYPE, content_hash, "modified")
+	touched_after = add_to_date(now_datetime(), seconds=-PAYLOAD_TOUCH_INTERVAL)
+	if modified and get_datetime(modified) > touched_after:
+		return content_hash
+
+	# reused payload is locked, so it can't be deleted by log retention until this log is committed.
+	if modified and frappe.db.get_value(PAYLOAD_DOCTYPE, content_hash, "name", for_update=True):
+		frappe.db.set_value(PAYLOAD_DOCTYPE, content_hash, "modified", now(), update_modified=False)
+		return content_hash
+
+	payload = frappe.get_doc(
+		{
+			"doctype": PAYLOAD_DOCTYPE,
+			"compression": COMPRESSION,
+			"size": len(serialized),
+			"payload": base64.b64encode(zlib.compress(serialized)).decode(),
+		}
+	)
+	payload.name = content_hash
+	payload.flags.name_set = True
+	payload.insert(ignore_permissions=True, ignore_if_duplicate=True)
+
+	return content_hash
+
+
+def get_payload_delete_cutoff():
+	"""Payloads modified after cutoff might be used by logs that aren't committed yet."""
+	return add_days(now_datetime(), -PAYLOAD_DELETE_GRACE_DAYS)
+
+
+def get_payload(name: Optional[str]) -> Optional[str]:
+	"""Get decompressed payload from payload document."""
+	if not name:
+		return
+
+	payload = frappe.db.get_value(PAYLOAD_DOCTYPE, name, ["compression", "payload"], as_dict=True)
+	if payload:
+		return frappe.get_doc({"doctype": PAYLOAD_DOCTYPE, **payload}).get_data()
+
+
+def _minify(data: Any) -> str:
+	if isinstance(data, bytes):
+		data = data.decode()
+
+	if isinstance(data, str):
+		try:
+			data = json.loads(data)
+		except ValueError:
+			# not a JSON payload, e.g. URL and body of failed API request
+			return data
+
+	return json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
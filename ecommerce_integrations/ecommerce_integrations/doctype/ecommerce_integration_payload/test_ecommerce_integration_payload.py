@@ -0,0 +1,56 @@
+# Copyright (c) 2021, Frappe and Contributors
+# See LICENSE
+
+import json
+import unittest
+
+import frappe
+from frappe.utils import add_days, get_datetime, now_datetime
+
+from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_integration_log.ecommerce_integration_log import (
+	create_log,
+)
+from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_integration_payload.ecommerce_integration_payload import (
+	PAYLOAD_DOCTYPE,
+	get_payload,
+	get_payload_delete_cutoff,
+	store_payload,
+)
+
+
+class TestEcommerceIntegrationPayload(unittest.TestCase):
+	def test_payload_roundtrip(self):
+		data = {"id": 42, "line_items": [{"sku": "TEST_ITEM_1", "quantity": 2}]}
+
+		name = store_payload(json.dumps(data, indent=4))
+		self.assertEqual(json.loads(get_payload(name)), data)
+
+		# minified and deduplicated
+		self.assertEqual(store_payload(data), name)
+		self.assertEqual(get_payload(name), json.dumps(data, sort_keys=True, separators=(",", ":")))
+
+	def test_reused_payload_touched(self):
+		name = store_payload({"id": 43})
+		frappe.db.set_value(
+			PAYLOAD_DOCTYPE, name, "modified", add_days(now_datetime(), -100), update_modified=False
+		)
+
+		self.assertEqual(store_payload({"id": 43}), name)
+		modified = frappe.db.get_value(PAYLOAD_DOCTYPE, name, "modified")
+		self.assertGreater(get_datetime(modified), get_payload_delete_cutoff())
+
+	def test_non_json_payload(self):
+		data = "URL: https://example.com\n\nbody: {}"
+		self.assertEqual(get_payload(store_payload(data)), data)
+		self.assertIsNone(store_payload(None))
+
+	def test_log_payloads(self):
+		log = create_log(
+			module_def="shopify", request_data={"order": 1}, response_data="OK", make_new=True
+		)
+		log.reload()
+
+		self.assertFalse(log.request_data)
+		self.assertTrue(log.request_payload)
+		self.assertEqual(json.loads(log.get_request_data()), {"order": 1})
+		self.assertEqual(log.get_response_data(), "OK")
@@ -0,0 +1,17 @@
+# Copyright (c) 2021, Frappe and contributors
+# For license information, please see LICENSE
+
+import frappe
+from frappe.model.document import Document
+
+
+class EcommerceInventoryChange(Document):
+	"""Append-only journal of (item_code, warehouse) pairs with changed stock levels.
+
+	see `ecommerce_integrations.controllers.inventory.record_inventory_change`"""
+
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Ecommerce Inventory Change", ["creation"])
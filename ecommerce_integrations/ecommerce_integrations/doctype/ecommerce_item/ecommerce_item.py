@@ -1,13 +1,27 @@
 # Copyright (c) 2021, Frappe and contributors
 # For license information, please see LICENSE
 
-from typing import Dict, Optional
+import functools
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 import frappe
 from erpnext import get_default_company
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import cstr, get_datetime, now
+from frappe.utils import cint, cstr, get_datetime, now
+from redis import Redis
+
+# Redis hash holding integration item -> ERPNext item code mappings
+ITEM_CODE_CACHE_KEY = "ecommerce_item_code_map"
+# whole hash expires, bounds staleness from writes that bypass invalidation (e.g. raw SQL)
+ITEM_CODE_CACHE_TTL = 24 * 60 * 60
+
+# (integration_item_code, variant_id, sku) used for bulk lookups
+ItemKey = Tuple[Optional[str], Optional[str], Optional[str]]
+
+# process wide lookup statistics, see `get_item_code_cache_stats`
+_cache_stats = Counter()
 
 
 class EcommerceItem(Document):
@@ -25,6 +39,36 @@ class EcommerceItem(Document):
 	def before_insert(self):
 		self.check_unique_constraints()
 
+	def on_update(self):
+		self.clear_item_code_cache()
+
+	def on_trash(self):
+		self.clear_item_code_cache()
+
+	def clear_item_code_cache(self):
+		"""Remove cached lookups for current and previous values of this mapping.
+
+		Lookups are removed again after commit, other processes could have cached the old mapping
+		in the meantime."""
+		old_doc = self.get_doc_before_save()
+		for doc in (self, old_doc):
+			if not doc:
+				continue
+			invalidate = functools.partial(
+				invalidate_item_code_cache,
+				doc.integration,
+				doc.integration_item_code,
+				variant_id=doc.variant_id,
+				sku=doc.sku,
+			)
+			invalidate()
+			frappe.db.after_commit.add(invalidate)
+			# cached values of this mapping must not be written to redis until transaction is committed.
+			uncommitted = _get_local_cache().uncommitted
+			if doc.integration not in uncommitted:
+				uncommitted.add(doc.integration)
+				frappe.db.after_commit.add(functools.partial(uncommitted.discard, doc.integration))
+
 	def check_unique_constraints(self) -> None:
 		filters = []
 
@@ -70,17 +114,11 @@ def is_synced(
 	if sku:
 		return _is_sku_synced(integration, sku)
 
-	filter = {"integration": integration, "integration_item_code": integration_item_code}
-
-	if variant_id:
-		filter.update({"variant_id": variant_id})
-
-	return bool(frappe.db.exists("Ecommerce Item", filter))
+	return bool(get_erpnext_item_code(integration, integration_item_code, variant_id=variant_id))
 
 
 def _is_sku_synced(integration: str, sku: str) -> bool:
-	filter = {"integration": integration, "sku": sku}
-	return bool(frappe.db.exists("Ecommerce Item", filter))
+	return bool(_get_item_code_by_sku(integration, sku))
 
 
 def get_erpnext_item_code(
@@ -95,7 +133,22 @@ def get_erpnext_item_code(
 	elif has_variants:
 		filters.update({"has_variants": 1})
 
-	return frappe.db.get_value("Ecommerce Item", filters, fieldname="erpnext_item_code")
+	cache_key = _get_cache_key(integration, integration_item_code, variant_id, has_variants)
+	return _get_cached_item_code(
+		integration,
+		cache_key,
+		lambda: frappe.db.get_value("Ecommerce Item", filters, fieldname="erpnext_item_code"),
+	)
+
+
+def _get_item_code_by_sku(integration: str, sku: str) -> Optional[str]:
+	return _get_cached_item_code(
+		integration,
+		_get_sku_cache_key(integration, sku),
+		lambda: frappe.db.get_value(
+			"Ecommerce Item", {"sku": sku, "integration": integration}, fieldname="erpnext_item_code"
+		),
+	)
 
 
 def get_erpnext_item(
@@ -112,9 +165,7 @@ def get_erpnext_item(
 
 	item_code = None
 	if sku:
-		item_code = frappe.db.get_value(
-			"Ecommerce Item", {"sku": sku, "integration": integration}, fieldname="erpnext_item_code"
-		)
+		item_code = _get_item_code_by_sku(integration, sku)
 	if not item_code:
 		item_code = get_erpnext_item_code(
 			integration, integration_item_code, variant_id=variant_id, has_variants=has_variants
@@ -124,6 +175,197 @@ def get_erpnext_item(
 		return frappe.get_doc("Item", item_code)
 
 
+def get_erpnext_item_codes(
+	integration: str, keys: Iterable[ItemKey]
+) -> Dict[ItemKey, Optional[str]]:
+	"""Get ERPNext item codes for multiple integration items using a single query.
+
+	keys: (integration_item_code, variant_id, sku) tuples, variant_id and sku are optional.
+	Same as `get_erpnext_item` SKU is checked first and then item code + variant id.
+	Returns dictionary of input key => item code (None if not synced)."""
+	return _get_bulk_item_codes(integration, keys, sku_fallback=True)
+
+
+def is_synced_bulk(integration: str, keys: Iterable[ItemKey]) -> Dict[ItemKey, bool]:
+	"""Bulk version of `is_synced`, see `get_erpnext_item_codes` for format of keys."""
+	item_codes = _get_bulk_item_codes(integration, keys, sku_fallback=False)
+	return {key: bool(item_code) for key, item_code in item_codes.items()}
+
+
+def _get_bulk_item_codes(
+	integration: str, keys: Iterable[ItemKey], sku_fallback: bool
+) -> Dict[ItemKey, Optional[str]]:
+	def get_cache_keys(key) -> List[str]:
+		code, variant_id, sku = (cstr(k) for k in key)
+		cache_keys = []
+		if sku:
+			cache_keys.append(_get_sku_cache_key(integration, sku))
+		if code and (sku_fallback or not sku):
+			cache_keys.append(_get_cache_key(integration, code, variant_id))
+		return cache_keys
+
+	def resolve(key) -> Optional[str]:
+		item_codes = _get_local_cache().item_codes
+		for cache_key in get_cache_keys(key):
+			if cache_key in item_codes:
+				return item_codes[cache_key]
+
+	keys = list(dict.fromkeys(keys))
+	resolved = {key: resolve(key) for key in keys}
+
+	pending = [key for key, item_code in resolved.items() if not item_code]
+	_cache_stats["local_hits"] += len(keys) - len(pending)
+	if pending:
+		_cache_stats["misses"] += len(pending)
+		_fetch_item_codes(integration, pending)
+		resolved.update({key: resolve(key) for key in pending})
+
+	return resolved
+
+
+def _fetch_item_codes(integration: str, keys: List[ItemKey]) -> None:
+	"""Fetch all Ecommerce Items matching any of the keys and add them to cache."""
+	codes = {cstr(key[0]) for key in keys if key[0]}
+	skus = {cstr(key[2]) for key in keys if key[2]}
+
+	or_filters = {}
+	if codes:
+		or_filters["integration_item_code"] = ("in", list(codes))
+	if skus:
+		or_filters["sku"] = ("in", list(skus))
+	if not or_filters:
+		return
+
+	items = frappe.get_all(
+		"Ecommerce Item",
+		filters={"integration": integration},
+		or_filters=or_filters,
+		fields=["erpnext_item_code", "integration_item_code", "variant_id", "sku", "has_variants"],
+		order_by="modified desc",
+	)
+
+	item_codes = {}
+	for item in items:
+		cache_keys = [_get_cache_key(integration, item.integration_item_code)]
+		if item.variant_id:
+			cache_keys.append(_get_cache_key(integration, item.integration_item_code, item.variant_id))
+		if item.has_variants:
+			cache_keys.append(_get_cache_key(integration, item.integration_item_code, has_variants=1))
+		if item.sku:
+			cache_keys.append(_get_sku_cache_key(integration, item.sku))
+
+		for cache_key in cache_keys:
+			item_codes.setdefault(cache_key, item.erpnext_item_code)
+
+	for cache_key, item_code in item_codes.items():
+		_set_cached_item_code(integration, cache_key, item_code)
+
+
+def _get_cache_key(
+	integration: str, integration_item_code: str, variant_id: Optional[str] = None, has_variants=0
+) -> str:
+	return f"{integration}:code:{cstr(integration_item_code)}:{cstr(variant_id)}:{cint(has_variants)}"
+
+
+def _get_sku_cache_key(integration: str, sku: str) -> str:
+	return f"{integration}:sku:{cstr(sku)}"
+
+
+def _get_local_cache():
+	"""Per job (or request) in-memory layer in front of redis cache."""
+	if getattr(frappe.local, "ecommerce_item_cache", None) is None:
+		frappe.local.ecommerce_item_cache = frappe._dict(item_codes={}, uncommitted=set())
+	return frappe.local.ecommerce_item_cache
+
+
+def _get_cached_item_code(
+	integration: str, cache_key: str, fetch: Callable[[], Optional[str]]
+) -> Optional[str]:
+	"""Lookup item code in job cache, then redis and finally using `fetch`.
+
+	Only positive results are cached, missing mappings are always checked in DB."""
+	local_cache = _get_local_cache()
+
+	item_code = local_cache.item_codes.get(cache_key)
+	if item_code:
+		_cache_stats["local_hits"] += 1
+		return item_code
+
+	item_code = frappe.cache().hget(ITEM_CODE_CACHE_KEY, cache_key)
+	if item_code:
+		_cache_stats["hits"] += 1
+		local_cache.item_codes[cache_key] = item_code
+	else:
+		_cache_stats["misses"] += 1
+		item_code = fetch()
+		if item_code:
+			_set_cached_item_code(integration, cache_key, item_code)
+
+	return item_code
+
+
+def _set_cached_item_code(integration: str, cache_key: str, item_code: str) -> None:
+	local_cache = _get_local_cache()
+	local_cache.item_codes[cache_key] = item_code
+	if integration not in local_cache.uncommitted:
+		cache = frappe.cache()
+		cache.hset(ITEM_CODE_CACHE_KEY, cache_key, item_code)
+
+		key = cache.make_key(ITEM_CODE_CACHE_KEY)
+		# -1: hash exists without expiry
+		if Redis.ttl(cache, key) == -1:
+			Redis.expire(cache, key, ITEM_CODE_CACHE_TTL)
+
+
+def invalidate_item_code_cache(
+	integration: str,
+	integration_item_code: str,
+	variant_id: Optional[str] = None,
+	sku: Optional[str] = None,
+) -> None:
+	"""Remove cached item code lookups that can resolve to specified Ecommerce Item."""
+	keys = [
+		_get_cache_key(integration, integration_item_code),
+		_get_cache_key(integration, integration_item_code, has_variants=1),
+	]
+	if variant_id:
+		keys.append(_get_cache_key(integration, integration_item_code, variant_id))
+	if sku:
+		keys.append(_get_sku_cache_key(integration, sku))
+
+	local_cache = _get_local_cache()
+	for key in keys:
+		local_cache.item_codes.pop(key, None)
+		frappe.cache().hdel(ITEM_CODE_CACHE_KEY, key)
+
+
+def clear_local_item_code_cache() -> None:
+	"""Discard in-memory lookups, required when a transaction is rolled back.
+
+	Redis never holds mappings created in an uncommitted transaction, so it's not cleared."""
+	frappe.local.ecommerce_item_cache = None
+
+
+def clear_item_code_cache() -> None:
+	"""Clear all cached Ecommerce Item lookups."""
+	clear_local_item_code_cache()
+	frappe.cache().delete_key(ITEM_CODE_CACHE_KEY)
+
+
+def clear_item_code_cache_on_rename(doc, method=None, *args) -> None:
+	"""Item rename (or merge) updates item codes of Ecommerce Items without invalidating cache."""
+	clear_local_item_code_cache()
+	frappe.db.after_commit.add(clear_item_code_cache)
+
+
+def get_item_code_cache_stats() -> Dict[str, int]:
+	"""Get hit/miss counters of item code lookups in current process."""
+	stats = {key: _cache_stats[key] for key in ("local_hits", "hits", "misses")}
+	lookups = sum(stats.values())
+	stats["hit_ratio"] = (stats["local_hits"] + stats["hits"]) / lookups if lookups else 0.0
+	return stats
+
+
 def create_ecommerce_item(
 	integration: str,
 	integration_item_code: str,
@@ -132,6 +374,7 @@ def create_ecommerce_item(
 	sku: Optional[str] = None,
 	variant_of: Optional[str] = None,
 	has_variants=0,
+	inventory_item_id: Optional[str] = None,
 ) -> None:
 	"""Create Item in erpnext and link it with Ecommerce item doctype.
 
@@ -141,6 +384,8 @@ def create_ecommerce_item(
 	# SKU not allowed for template items
 	sku = cstr(sku) if not has_variants else None
 
+	# existence check before creating item should not rely on possibly stale cache
+	invalidate_item_code_cache(integration, integration_item_code, variant_id=variant_id, sku=sku)
 	if is_synced(integration, integration_item_code, variant_id, sku):
 		return
 
@@ -168,6 +413,7 @@ def create_ecommerce_item(
 			"variant_id": cstr(variant_id),
 			"variant_of": cstr(variant_of),
 			"sku": sku,
+			"inventory_item_id": cstr(inventory_item_id),
 			"item_synced_on": now(),
 		}
 	)
@@ -4,6 +4,7 @@
 import unittest
 
 import frappe
+from redis import Redis
 
 from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_item import ecommerce_item
 
@@ -64,6 +65,88 @@ class TestEcommerceItem(unittest.TestCase):
 		self.assertEqual(a.name, b.name)
 		self.assertEqual(a.item_code, b.item_code)
 
+	def test_cached_lookup_invalidated_on_update(self):
+		self._create_doc()
+		self.assertEqual(ecommerce_item.get_erpnext_item_code("shopify", "T-SHIRT"), "_Test Item")
+
+		doc = frappe.get_last_doc("Ecommerce Item")
+		doc.erpnext_item_code = "_Test Item 2"
+		doc.save()
+		self.assertEqual(ecommerce_item.get_erpnext_item_code("shopify", "T-SHIRT"), "_Test Item 2")
+
+		doc.delete()
+		self.assertFalse(ecommerce_item.is_synced("shopify", "T-SHIRT"))
+
+	def test_cached_lookup_redis_layer(self):
+		self._create_doc_with_sku()
+		self.assertTrue(ecommerce_item.is_synced("shopify", "T-SHIRT", sku="TEST_ITEM_1"))
+
+		# simulate a new job: only redis cache is available
+		ecommerce_item.clear_local_item_code_cache()
+		frappe.cache().hset(
+			ecommerce_item.ITEM_CODE_CACHE_KEY,
+			ecommerce_item._get_sku_cache_key("shopify", "TEST_ITEM_1"),
+			"_Test Item",
+		)
+		hits = ecommerce_item.get_item_code_cache_stats()["hits"]
+		self.assertTrue(ecommerce_item.is_synced("shopify", "T-SHIRT", sku="TEST_ITEM_1"))
+		self.assertEqual(ecommerce_item.get_item_code_cache_stats()["hits"], hits + 1)
+
+	def test_redis_cache_invalidated_after_commit(self):
+		self._create_doc()
+		frappe.db.commit()
+		self.assertEqual(ecommerce_item.get_erpnext_item_code("shopify", "T-SHIRT"), "_Test Item")
+
+		doc = frappe.get_last_doc("Ecommerce Item")
+		doc.erpnext_item_code = "_Test Item 2"
+		doc.save()
+
+		# another worker caches the committed mapping before this transaction is committed
+		cache_key = ecommerce_item._get_cache_key("shopify", "T-SHIRT")
+		frappe.cache().hset(ecommerce_item.ITEM_CODE_CACHE_KEY, cache_key, "_Test Item")
+		frappe.db.commit()
+
+		self.assertIsNone(frappe.cache().hget(ecommerce_item.ITEM_CODE_CACHE_KEY, cache_key))
+		self.assertEqual(ecommerce_item.get_erpnext_item_code("shopify", "T-SHIRT"), "_Test Item 2")
+
+	def test_redis_cache_expires(self):
+		self._create_doc()
+		frappe.db.commit()
+		self.assertFalse(ecommerce_item._get_local_cache().uncommitted, "not cleared after commit")
+
+		ecommerce_item.clear_item_code_cache()
+
+		self.assertTrue(ecommerce_item.is_synced("shopify", "T-SHIRT"))
+		cache = frappe.cache()
+		ttl = Redis.ttl(cache, cache.make_key(ecommerce_item.ITEM_CODE_CACHE_KEY))
+		self.assertTrue(0 < ttl <= ecommerce_item.ITEM_CODE_CACHE_TTL)
+
+	def test_missing_lookup_not_cached(self):
+		self.assertFalse(ecommerce_item.is_synced("shopify", "T-SHIRT"))
+		self._create_doc()
+		self.assertTrue(ecommerce_item.is_synced("shopify", "T-SHIRT"))
+
+	def test_bulk_lookup(self):
+		self._create_doc_with_sku()
+		self._create_variant_doc()
+
+		keys = [
+			("T-SHIRT", None, "TEST_ITEM_1"),
+			("T-SHIRT", "T-SHIRT-RED", None),
+			("T-SHIRT", "UNKNOWN", "UNKNOWNSKU"),
+			("UNKNOWN", None, None),
+		]
+		item_codes = ecommerce_item.get_erpnext_item_codes("shopify", keys)
+		self.assertEqual(item_codes[keys[0]], "_Test Item")
+		self.assertEqual(item_codes[keys[1]], "_Test Item 2")
+		self.assertIsNone(item_codes[keys[2]])
+		self.assertIsNone(item_codes[keys[3]])
+
+		synced = ecommerce_item.is_synced_bulk("shopify", keys)
+		self.assertEqual(synced, {key: bool(item_codes[key]) for key in keys})
+		for key in keys:
+			self.assertEqual(synced[key], ecommerce_item.is_synced("shopify", *key))
+
 	def _create_doc(self):
 		"""basic test for creation of ecommerce item"""
 		frappe.get_doc(
@@ -99,14 +99,26 @@ doc_events = {
 	"Item": {
 		"after_insert": "ecommerce_integrations.shopify.product.upload_erpnext_item",
 		"on_update": "ecommerce_integrations.shopify.product.upload_erpnext_item",
+		"after_rename": "ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_item.ecommerce_item.clear_item_code_cache_on_rename",
 		"validate": [
 			"ecommerce_integrations.utils.taxation.validate_tax_template",
 			"ecommerce_integrations.unicommerce.product.validate_item",
 		],
 	},
 	"Sales Order": {
-		"on_update_after_submit": "ecommerce_integrations.unicommerce.order.update_shipping_info",
-		"on_cancel": "ecommerce_integrations.unicommerce.status_updater.ignore_pick_list_on_sales_order_cancel",
+		"on_submit": "ecommerce_integrations.controllers.inventory.record_inventory_change",
+		"on_update_after_submit": [
+			"ecommerce_integrations.unicommerce.order.update_shipping_info",
+			"ecommerce_integrations.controllers.inventory.record_inventory_change",
+		],
+		"on_cancel": [
+			"ecommerce_integrations.unicommerce.status_updater.ignore_pick_list_on_sales_order_cancel",
+			"ecommerce_integrations.controllers.inventory.record_inventory_change",
+		],
+	},
+	"Stock Ledger Entry": {
+		"on_submit": "ecommerce_integrations.controllers.inventory.record_inventory_change",
+		"on_cancel": "ecommerce_integrations.controllers.inventory.record_inventory_change",
 	},
 	"Stock Entry": {
 		"validate": "ecommerce_integrations.unicommerce.grn.validate_stock_entry_for_grn",
@@ -114,16 +126,26 @@ doc_events = {
 		"on_cancel": "ecommerce_integrations.unicommerce.grn.prevent_grn_cancel",
 	},
 	"Item Price": {"on_change": "ecommerce_integrations.utils.price_list.discard_item_prices"},
+	"Warehouse": {
+		"on_update": "ecommerce_integrations.controllers.inventory.clear_warehouse_bounds_cache",
+		"on_trash": "ecommerce_integrations.controllers.inventory.clear_warehouse_bounds_cache",
+		"after_rename": "ecommerce_integrations.controllers.inventory.clear_warehouse_bounds_cache",
+	},
 }
 
 # Scheduled Tasks
 # ---------------
 
 scheduler_events = {
-	"all": ["ecommerce_integrations.shopify.inventory.update_inventory_on_shopify"],
+	"all": [
+		"ecommerce_integrations.shopify.inventory.update_inventory_on_shopify",
+		"ecommerce_integrations.shopify.doctype.shopify_webhook_inbox.shopify_webhook_inbox.drain_webhook_inbox",
+	],
 	"daily": [],
 	"daily_long": [
-		"ecommerce_integrations.zenoti.doctype.zenoti_settings.zenoti_settings.sync_stocks"
+		"ecommerce_integrations.zenoti.doctype.zenoti_settings.zenoti_settings.sync_stocks",
+		"ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_integration_log.ecommerce_integration_log.apply_log_retention",
+		"ecommerce_integrations.controllers.inventory.delete_old_inventory_changes",
 	],
 	"hourly": [
 		"ecommerce_integrations.shopify.order.sync_old_orders",
@@ -150,6 +172,9 @@ scheduler_events = {
 # bootinfo - hide old doctypes
 extend_bootinfo = "ecommerce_integrations.boot.boot_session"
 
+# called after every request made using `utils.http_client`
+integration_request_listeners = ["ecommerce_integrations.utils.api_metrics.record_request"]
+
 # Testing
 # -------
 
@@ -2,20 +2,30 @@ import base64
 import hashlib
 import hmac
 import json
-from typing import List
+import threading
+import time
+from typing import List, Optional
 
 import frappe
 from frappe import _
+from shopify.base import ShopifyResource
 from shopify.resources import Webhook
 from shopify.session import Session
 
+from ecommerce_integrations.controllers.setting import get_cached_setting
 from ecommerce_integrations.shopify.constants import (
 	API_VERSION,
 	EVENT_MAPPER,
 	SETTING_DOCTYPE,
 	WEBHOOK_EVENTS,
 )
+from ecommerce_integrations.shopify.doctype.shopify_webhook_inbox.shopify_webhook_inbox import (
+	store_webhook,
+)
 from ecommerce_integrations.shopify.utils import create_shopify_log
+from ecommerce_integrations.utils.api_metrics import instrument_shopify_connection
+
+instrument_shopify_connection()
 
 
 def temp_shopify_session(func):
@@ -27,7 +37,7 @@ def temp_shopify_session(func):
 		if frappe.flags.in_test:
 			return func(*args, **kwargs)
 
-		setting = frappe.get_doc(SETTING_DOCTYPE)
+		setting = get_cached_setting(SETTING_DOCTYPE)
 		if setting.is_enabled():
 			auth_details = (setting.shopify_url, API_VERSION, setting.get_password("password"))
 
@@ -97,10 +107,16 @@ def store_request_data() -> None:
 
 		_validate_request(frappe.request, hmac_header)
 
-		data = json.loads(frappe.request.data)
 		event = frappe.request.headers.get("X-Shopify-Topic")
+		if event not in EVENT_MAPPER:
+			return
 
-		process_request(data, event)
+		# processing is deferred to `drain_webhook_inbox` so that webhooks are acknowledged quickly.
+		store_webhook(
+			topic=event,
+			payload=frappe.safe_decode(frappe.request.data),
+			webhook_id=frappe.get_request_header("X-Shopify-Webhook-Id"),
+		)
 
 
 def process_request(data, event):
@@ -119,7 +135,7 @@ def process_request(data, event):
 
 
 def _validate_request(req, hmac_header):
-	settings = frappe.get_doc(SETTING_DOCTYPE)
+	settings = get_cached_setting(SETTING_DOCTYPE)
 	secret_key = settings.shared_secret
 
 	sig = base64.b64encode(hmac.new(secret_key.encode("utf8"), req.data, hashlib.sha256).digest())
@@ -127,3 +143,72 @@ def _validate_request(req, hmac_header):
 	if sig != bytes(hmac_header.encode()):
 		create_shopify_log(status="Error", request_data=req.data)
 		frappe.throw(_("Unverified Webhook Data"))
+
+
+class ShopifyRateLimiter:
+	"""Leaky bucket limiter for REST API calls, shared by threads using the same store.
+
+	Shopify reports bucket usage in `X-Shopify-Shop-Api-Call-Limit` header (e.g. "32/40"), the
+	bucket leaks at 1/20th of its size per second. Calls wait while the bucket is almost full,
+	so that the bucket stays near full without requests getting throttled (HTTP 429).
+
+	API docs: https://shopify.dev/docs/api/usage/rate-limits#rest-admin-api-rate-limits
+	"""
+
+	def __init__(self, headroom: int = 2):
+		self.headroom = headroom
+		self.capacity = 40
+		self.leak_rate = 2.0
+		self.level = 0.0
+		self._updated_at = time.monotonic()
+		self._lock = threading.Lock()
+
+	def acquire(self) -> None:
+		"""Wait till bucket has room for one more call and reserve it."""
+		while True:
+			with self._lock:
+				self._leak()
+				limit = self.capacity - self.headroom
+				if self.level + 1 <= limit:
+					self.level += 1
+					return
+				wait = (self.level + 1 - limit) / self.leak_rate
+			time.sleep(wait)
+
+	def update(self, call_limit: Optional[str]) -> None:
+		"""Sync with bucket usage reported by Shopify."""
+		try:
+			used, capacity = (int(value) for value in call_limit.split("/"))
+		except (AttributeError, ValueError):
+			return
+
+		with self._lock:
+			self._leak()
+			self.capacity = capacity
+			self.leak_rate = capacity / 20
+			# reported usage includes calls by other apps, local usage includes calls in flight.
+			self.level = max(self.level, float(used))
+
+	def throttled(self, retry_after: Optional[float] = None) -> None:
+		"""Mark bucket as full after a call was throttled and wait for it to drain."""
+		with self._lock:
+			self.level = float(self.capacity)
+			self._updated_at = time.monotonic()
+		time.sleep(retry_after or 1 / self.leak_rate)
+
+	def _leak(self) -> None:
+		now = time.monotonic()
+		self.level = max(0.0, self.level - (now - self._updated_at) * self.leak_rate)
+		self._updated_at = now
+
+
+def get_last_call_limit() -> Optional[str]:
+	"""Get `X-Shopify-Shop-Api-Call-Limit` of last REST call made by current thread."""
+	response = getattr(ShopifyResource.connection, "response", None)
+	return get_response_header(response, "X-Shopify-Shop-Api-Call-Limit")
+
+
+def get_response_header(response, name: str) -> Optional[str]:
+	for header, value in (getattr(response, "headers", None) or {}).items():
+		if header.lower() == name.lower():
+			return value
@@ -7,6 +7,8 @@ SETTING_DOCTYPE = "Shopify Setting"
 OLD_SETTINGS_DOCTYPE = "Shopify Settings"
 
 API_VERSION = "2022-04"
+# `inventorySetQuantities` mutation isn't available in REST API version
+GRAPHQL_API_VERSION = "2024-04"
 
 WEBHOOK_EVENTS = [
 	"orders/create",
@@ -24,6 +26,15 @@ EVENT_MAPPER = {
 	"orders/partially_fulfilled": "ecommerce_integrations.shopify.fulfillment.prepare_delivery_note",
 }
 
+# events of same order received together are merged and synced by one job, see `order.sync_order_events`
+COALESCED_EVENTS = [
+	"orders/create",
+	"orders/paid",
+	"orders/fulfilled",
+	"orders/partially_fulfilled",
+]
+COALESCED_EVENTS_METHOD = "ecommerce_integrations.shopify.order.sync_order_events"
+
 SHOPIFY_VARIANTS_ATTR_LIST = ["option1", "option2", "option3"]
 
 # custom fields
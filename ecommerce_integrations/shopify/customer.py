@@ -5,6 +5,7 @@ from frappe import _
 from frappe.utils import cstr, validate_phone_number
 
 from ecommerce_integrations.controllers.customer import EcommerceCustomer
+from ecommerce_integrations.controllers.setting import get_cached_setting
 from ecommerce_integrations.shopify.constants import (
 	ADDRESS_ID_FIELD,
 	CUSTOMER_ID_FIELD,
@@ -15,7 +16,7 @@ from ecommerce_integrations.shopify.constants import (
 
 class ShopifyCustomer(EcommerceCustomer):
 	def __init__(self, customer_id: str):
-		self.setting = frappe.get_doc(SETTING_DOCTYPE)
+		self.setting = get_cached_setting(SETTING_DOCTYPE)
 		super().__init__(customer_id, CUSTOMER_ID_FIELD, MODULE_NAME)
 
 	def sync_customer(self, customer: Dict[str, Any]) -> None:
@@ -0,0 +1,67 @@
+# Copyright (c) 2021, Frappe and contributors
+# For license information, please see LICENSE
+
+from typing import Dict, List
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_to_date, cint, get_datetime
+
+IMPORT_WINDOW_DOCTYPE = "Shopify Order Import Window"
+
+# days, overridden by `shopify_order_import_window_days` site config
+IMPORT_WINDOW_DAYS = 7
+
+
+class ShopifyOrderImportWindow(Document):
+	"""Part of old orders range, imported by its own job. See `order.sync_old_orders`.
+
+	`last_order_id` is the cursor of import, a failed or interrupted import resumes from it."""
+
+	pass
+
+
+def get_import_windows(from_time, to_time) -> List:
+	"""Split range in windows and return them, windows not created by earlier runs are created."""
+	from_time, to_time = get_datetime(from_time), get_datetime(to_time)
+	window_days = cint(frappe.conf.get("shopify_order_import_window_days")) or IMPORT_WINDOW_DAYS
+
+	names = []
+	start = from_time
+	while start < to_time:
+		end = min(add_to_date(start, days=window_days), to_time)
+		name = frappe.db.get_value(IMPORT_WINDOW_DOCTYPE, {"from_time": start, "to_time": end})
+		if not name:
+			window = frappe.get_doc(
+				{"doctype": IMPORT_WINDOW_DOCTYPE, "from_time": start, "to_time": end, "status": "Pending"}
+			).insert(ignore_permissions=True)
+			name = window.name
+		names.append(name)
+		start = end
+
+	return frappe.get_all(
+		IMPORT_WINDOW_DOCTYPE,
+		filters={"name": ("in", names)},
+		fields=["name", "status", "modified"],
+		order_by="from_time asc",
+	)
+
+
+def get_import_progress(from_time, to_time) -> Dict[str, int]:
+	"""Aggregated progress of all windows in range."""
+	windows = frappe.get_all(
+		IMPORT_WINDOW_DOCTYPE,
+		filters={"from_time": (">=", from_time), "to_time": ("<=", to_time)},
+		fields=["status", "orders_imported"],
+	)
+
+	return {
+		"total": len(windows),
+		"completed": sum(1 for w in windows if w.status == "Completed"),
+		"failed": sum(1 for w in windows if w.status == "Failed"),
+		"orders_imported": sum(cint(w.orders_imported) for w in windows),
+	}
+
+
+def on_doctype_update():
+	frappe.db.add_index(IMPORT_WINDOW_DOCTYPE, ["from_time", "to_time"])
@@ -0,0 +1,39 @@
+# Copyright (c) 2021, Frappe and Contributors
+# See LICENSE
+
+import unittest
+
+import frappe
+
+from ecommerce_integrations.shopify.doctype.shopify_order_import_window.shopify_order_import_window import (
+	IMPORT_WINDOW_DOCTYPE,
+	get_import_progress,
+	get_import_windows,
+)
+
+FROM_TIME = "2020-01-01 00:00:00"
+TO_TIME = "2020-01-20 00:00:00"
+
+
+class TestShopifyOrderImportWindow(unittest.TestCase):
+	def setUp(self):
+		frappe.db.delete(IMPORT_WINDOW_DOCTYPE)
+
+	def test_range_split_in_windows(self):
+		windows = get_import_windows(FROM_TIME, TO_TIME)
+		self.assertEqual(len(windows), 3)
+
+		last_window = frappe.get_doc(IMPORT_WINDOW_DOCTYPE, windows[-1].name)
+		self.assertEqual(str(last_window.from_time), "2020-01-15 00:00:00")
+		self.assertEqual(str(last_window.to_time), TO_TIME)
+
+		# rerun reuses windows and their progress
+		frappe.db.set_value(
+			IMPORT_WINDOW_DOCTYPE, windows[0].name, {"status": "Completed", "orders_imported": 42}
+		)
+		rerun = get_import_windows(FROM_TIME, TO_TIME)
+		self.assertEqual([w.name for w in rerun], [w.name for w in windows])
+		self.assertEqual(rerun[0].status, "Completed")
+
+		progress = get_import_progress(FROM_TIME, TO_TIME)
+		self.assertEqual(progress, {"total": 3, "completed": 1, "failed": 0, "orders_imported": 42})
@@ -34,6 +34,20 @@ frappe.ui.form.on("Shopify Setting", {
 		frm.add_custom_button(__("View Logs"), () => {
 			frappe.set_route("List", "Ecommerce Integration Log", {"integration": "Shopify"});
 		});
+
+		const progress = frm.doc.__onload && frm.doc.__onload.old_orders_import_progress;
+		if (progress && progress.total) {
+			frm.dashboard.add_progress(
+				__("Old Orders Import"),
+				(progress.completed * 100) / progress.total,
+				__("{0} of {1} windows imported, {2} failed, {3} orders synced", [
+					progress.completed,
+					progress.total,
+					progress.failed,
+					progress.orders_imported,
+				])
+			);
+		}
 	}
 });
 
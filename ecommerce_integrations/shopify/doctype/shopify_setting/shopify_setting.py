@@ -1,12 +1,12 @@
 # Copyright (c) 2021, Frappe and contributors
 # For license information, please see LICENSE
 
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 import frappe
 from frappe import _
 from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
-from frappe.utils import get_datetime
+from frappe.utils import cstr, get_datetime
 from pyactiveresource.connection import UnauthorizedAccess
 from shopify.resources import Location
 
@@ -14,6 +14,7 @@ from ecommerce_integrations.controllers.setting import (
 	ERPNextWarehouse,
 	IntegrationWarehouse,
 	SettingController,
+	memoize_on_cached_setting,
 )
 from ecommerce_integrations.shopify import connection
 from ecommerce_integrations.shopify.constants import (
@@ -26,6 +27,9 @@ from ecommerce_integrations.shopify.constants import (
 	ORDER_STATUS_FIELD,
 	SUPPLIER_ID_FIELD,
 )
+from ecommerce_integrations.shopify.doctype.shopify_order_import_window.shopify_order_import_window import (
+	get_import_progress,
+)
 from ecommerce_integrations.shopify.utils import (
 	ensure_old_connector_is_disabled,
 	migrate_from_old_connector,
@@ -46,6 +50,13 @@ class ShopifySetting(SettingController):
 		if self.is_enabled():
 			setup_custom_fields()
 
+	def onload(self):
+		if self.old_orders_from and self.old_orders_to:
+			self.set_onload(
+				"old_orders_import_progress",
+				get_import_progress(self.old_orders_from, self.old_orders_to),
+			)
+
 	def on_update(self):
 		if self.is_enabled() and not self.is_old_data_migrated:
 			migrate_from_old_connector()
@@ -95,21 +106,38 @@ class ShopifySetting(SettingController):
 				{"shopify_location_id": location.id, "shopify_location_name": location.name},
 			)
 
+	@memoize_on_cached_setting
 	def get_erpnext_warehouses(self) -> List[ERPNextWarehouse]:
 		return [wh_map.erpnext_warehouse for wh_map in self.shopify_warehouse_mapping]
 
+	@memoize_on_cached_setting
 	def get_erpnext_to_integration_wh_mapping(self) -> Dict[ERPNextWarehouse, IntegrationWarehouse]:
 		return {
 			wh_map.erpnext_warehouse: wh_map.shopify_location_id
 			for wh_map in self.shopify_warehouse_mapping
 		}
 
+	@memoize_on_cached_setting
 	def get_integration_to_erpnext_wh_mapping(self) -> Dict[IntegrationWarehouse, ERPNextWarehouse]:
 		return {
 			wh_map.shopify_location_id: wh_map.erpnext_warehouse
 			for wh_map in self.shopify_warehouse_mapping
 		}
 
+	@memoize_on_cached_setting
+	def get_tax_account_map(self) -> Dict[str, Tuple[str, Optional[str]]]:
+		"""Get mapping of Shopify tax title to (tax account, tax description).
+
+		Titles are case folded, same as case insensitive lookup in database."""
+		return {
+			get_tax_title_key(tax_map.shopify_tax): (tax_map.tax_account, tax_map.tax_description)
+			for tax_map in self.taxes
+		}
+
+
+def get_tax_title_key(title) -> str:
+	return cstr(title).strip().casefold()
+
 
 def setup_custom_fields():
 	custom_fields = {
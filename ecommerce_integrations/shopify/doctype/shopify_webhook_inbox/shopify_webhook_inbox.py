@@ -0,0 +1,261 @@
+# Copyright (c) 2021, Frappe and contributors
+# For license information, please see LICENSE
+
+import functools
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import flt, now, now_datetime, time_diff_in_seconds
+from redis import Redis
+from redis.exceptions import LockError
+
+from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_integration_log.ecommerce_integration_log import (
+	buffered_logs,
+)
+from ecommerce_integrations.shopify.constants import (
+	COALESCED_EVENTS,
+	COALESCED_EVENTS_METHOD,
+	EVENT_MAPPER,
+	MODULE_NAME,
+)
+from ecommerce_integrations.shopify.utils import create_shopify_log
+from ecommerce_integrations.utils.cache import get_counters
+
+INBOX_DOCTYPE = "Shopify Webhook Inbox"
+
+DRAIN_BATCH_SIZE = 500
+DRAIN_LOCK_KEY = "shopify_webhook_inbox_drain"
+DRAIN_LOCK_TIMEOUT = 15 * 60
+DRAIN_LOCK_WAIT = 60
+# set while a drain job is queued, webhook requests don't enqueue another one meanwhile.
+DRAIN_PENDING_KEY = "shopify_webhook_inbox_drain_pending"
+DRAIN_PENDING_EXPIRY = 60
+
+# shopify retries failed webhooks for 48 hours
+DEDUPE_KEY_PREFIX = "shopify_webhook_seen"
+DEDUPE_TTL = 48 * 60 * 60
+DUPLICATE_STATS_KEY = "shopify_webhook_duplicate_stats"
+
+# seconds, overridden by `shopify_webhook_coalesce_window` site config
+COALESCE_WINDOW = 5
+
+
+class ShopifyWebhookInbox(Document):
+	"""Raw webhooks received from Shopify and not yet processed.
+
+	Webhook requests only append to this table, see `drain_webhook_inbox`."""
+
+	pass
+
+
+def store_webhook(topic: str, payload: str, webhook_id: Optional[str] = None) -> None:
+	"""Append webhook to inbox and make sure a drain job is scheduled.
+
+	Retried deliveries of a webhook (same webhook id) are dropped. Webhook id is only marked as
+	seen once the inbox row is committed, so that shopify's retry isn't dropped if this request
+	fails."""
+	if webhook_id and _is_seen(f"id:{webhook_id}"):
+		_record_duplicate(topic, "webhook_id")
+		return
+
+	timestamp = now()
+	user = frappe.session.user
+	frappe.db.bulk_insert(
+		INBOX_DOCTYPE,
+		fields=["name", "creation", "modified", "owner", "modified_by", "topic", "webhook_id", "payload"],
+		values=[
+			(frappe.generate_hash(length=10), timestamp, timestamp, user, user, topic, webhook_id, payload)
+		],
+	)
+	if webhook_id:
+		frappe.db.after_commit.add(functools.partial(_mark_seen, f"id:{webhook_id}"))
+	_schedule_drain()
+
+
+def drain_webhook_inbox() -> None:
+	"""Create logs for received webhooks in batches and enqueue their processing.
+
+	Enqueued by webhook requests and also runs on every scheduler tick as a fallback. Only one
+	drain job runs at a time, others wait for it to finish."""
+	cache = frappe.cache()
+	lock = cache.lock(cache.make_key(DRAIN_LOCK_KEY), timeout=DRAIN_LOCK_TIMEOUT)
+	if not lock.acquire(blocking_timeout=DRAIN_LOCK_WAIT):
+		return
+
+	# webhooks received after this enqueue another drain job, this one may have finished reading.
+	cache.delete(cache.make_key(DRAIN_PENDING_KEY))
+	try:
+		_wait_for_coalesce_window()
+		while True:
+			webhooks = frappe.get_all(
+				INBOX_DOCTYPE,
+				fields=["name", "topic", "payload"],
+				order_by="creation asc",
+				limit=DRAIN_BATCH_SIZE,
+			)
+			if webhooks:
+				_process_webhooks(webhooks)
+			if len(webhooks) < DRAIN_BATCH_SIZE:
+				break
+	finally:
+		try:
+			lock.release()
+		except LockError:
+			# lock expired, some other drain job might be running now.
+			pass
+
+
+def _process_webhooks(webhooks: List) -> None:
+	seen_updates = set()
+
+	with buffered_logs(module_def=MODULE_NAME, method="drain_webhook_inbox"):
+		# logs are written and inbox is cleared in same transaction.
+		frappe.db.delete(INBOX_DOCTYPE, {"name": ("in", [webhook.name for webhook in webhooks])})
+
+		log_buffer = frappe.flags.integration_log_buffer
+		buffered = set(log_buffer)
+		try:
+			jobs = _get_jobs(webhooks, seen_updates)
+			logs = [
+				create_shopify_log(method=method, request_data=raw_payload, make_new=True)
+				for method, _payload, raw_payload in jobs
+			]
+		except Exception:
+			# rollback restores the inbox rows and they are drained again, only the error log is kept.
+			for name in set(log_buffer) - buffered:
+				del log_buffer[name]
+			raise
+
+	# only marked after commit, uncommitted webhooks are drained again if this job fails.
+	for update_key in seen_updates:
+		_mark_seen(update_key)
+
+	for (method, payload, _raw_payload), log in zip(jobs, logs):
+		frappe.enqueue(
+			method=method,
+			queue="short",
+			timeout=300,
+			is_async=True,
+			**{"payload": payload, "request_id": log.name},
+		)
+
+
+def _get_jobs(webhooks: List, seen_updates: Set[str]) -> List[Tuple[str, Dict, str]]:
+	"""Get (method, payload, raw payload) of jobs to enqueue, duplicates are dropped and events of
+	same order are coalesced."""
+	jobs = []
+	order_jobs = {}  # shopify order id -> index of its coalesced job
+
+	for webhook in webhooks:
+		method = EVENT_MAPPER.get(webhook.topic)
+		if not method:
+			continue
+
+		try:
+			payload = json.loads(webhook.payload)
+		except ValueError as e:
+			create_shopify_log(
+				status="Error", method=method, request_data=webhook.payload, exception=e, make_new=True
+			)
+			continue
+
+		# same order state delivered again, e.g. retry of a webhook without id
+		update_key = _get_update_key(webhook.topic, payload)
+		if update_key:
+			if update_key in seen_updates or _is_seen(update_key):
+				_record_duplicate(webhook.topic, "order_update")
+				continue
+			seen_updates.add(update_key)
+
+		if webhook.topic not in COALESCED_EVENTS or not payload.get("id"):
+			jobs.append((method, payload, webhook.payload))
+			continue
+
+		# all events carry full order, only latest state of the order needs to be synced.
+		order_id = str(payload["id"])
+		if order_id not in order_jobs:
+			order_jobs[order_id] = len(jobs)
+			jobs.append((COALESCED_EVENTS_METHOD, payload, webhook.payload))
+			continue
+
+		_record_duplicate(webhook.topic, "coalesced")
+		index = order_jobs[order_id]
+		if not _is_older(payload, jobs[index][1]):
+			jobs[index] = (COALESCED_EVENTS_METHOD, payload, webhook.payload)
+
+	return jobs
+
+
+def get_duplicate_stats() -> Dict[str, int]:
+	"""Get number of duplicate webhooks dropped, by topic and reason.
+
+	Events merged into a coalesced order sync are counted with "coalesced" reason."""
+	return get_counters(DUPLICATE_STATS_KEY)
+
+
+def _is_older(order: Dict, other_order: Dict) -> bool:
+	updated_at, other_updated_at = _parse_time(order), _parse_time(other_order)
+	return bool(updated_at and other_updated_at and updated_at < other_updated_at)
+
+
+def _parse_time(order: Dict) -> Optional[datetime]:
+	try:
+		return datetime.fromisoformat(order["updated_at"].replace("Z", "+00:00"))
+	except (KeyError, AttributeError, ValueError):
+		return None
+
+
+def _wait_for_coalesce_window() -> None:
+	"""Hold webhooks received in last few seconds, so other events of same order can arrive."""
+	window = frappe.conf.get("shopify_webhook_coalesce_window")
+	window = COALESCE_WINDOW if window is None else flt(window)
+
+	oldest = frappe.get_all(
+		INBOX_DOCTYPE, fields=["creation"], order_by="creation asc", limit=1, pluck="creation"
+	)
+	if oldest:
+		wait = window - time_diff_in_seconds(now_datetime(), oldest[0])
+		if wait > 0:
+			time.sleep(wait)
+
+
+def _get_update_key(topic: str, payload: Dict) -> Optional[str]:
+	if payload.get("id") and payload.get("updated_at"):
+		return f"update:{topic}:{payload['id']}:{payload['updated_at']}"
+
+
+def _is_seen(key: str) -> bool:
+	cache = frappe.cache()
+	return bool(Redis.exists(cache, cache.make_key(f"{DEDUPE_KEY_PREFIX}:{key}")))
+
+
+def _mark_seen(key: str) -> bool:
+	"""Record key in dedupe store, returns False if it was already recorded."""
+	cache = frappe.cache()
+	return bool(
+		Redis.set(cache, cache.make_key(f"{DEDUPE_KEY_PREFIX}:{key}"), 1, nx=True, ex=DEDUPE_TTL)
+	)
+
+
+def _record_duplicate(topic: str, reason: str) -> None:
+	cache = frappe.cache()
+	cache.hincrby(cache.make_key(DUPLICATE_STATS_KEY), f"{topic}:{reason}", 1)
+
+
+def _schedule_drain() -> None:
+	cache = frappe.cache()
+	key = cache.make_key(DRAIN_PENDING_KEY)
+	if Redis.set(cache, key, 1, nx=True, ex=DRAIN_PENDING_EXPIRY):
+		frappe.enqueue(
+			"ecommerce_integrations.shopify.doctype.shopify_webhook_inbox.shopify_webhook_inbox.drain_webhook_inbox",
+			queue="short",
+			enqueue_after_commit=True,
+		)
+
+
+def on_doctype_update():
+	frappe.db.add_index(INBOX_DOCTYPE, ["creation"])
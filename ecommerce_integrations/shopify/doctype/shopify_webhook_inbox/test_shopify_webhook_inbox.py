@@ -0,0 +1,148 @@
+# Copyright (c) 2021, Frappe and Contributors
+# See LICENSE
+
+import json
+import unittest
+from unittest.mock import patch
+
+import frappe
+
+from ecommerce_integrations.shopify.constants import COALESCED_EVENTS_METHOD, EVENT_MAPPER
+from ecommerce_integrations.shopify.doctype.shopify_webhook_inbox import shopify_webhook_inbox
+from ecommerce_integrations.shopify.doctype.shopify_webhook_inbox.shopify_webhook_inbox import (
+	INBOX_DOCTYPE,
+	drain_webhook_inbox,
+	get_duplicate_stats,
+	store_webhook,
+)
+
+LOG_DOCTYPE = "Ecommerce Integration Log"
+
+
+class TestShopifyWebhookInbox(unittest.TestCase):
+	def setUp(self):
+		frappe.db.delete(INBOX_DOCTYPE)
+
+		patcher = patch(
+			"ecommerce_integrations.shopify.doctype.shopify_webhook_inbox.shopify_webhook_inbox.COALESCE_WINDOW",
+			0,
+		)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	@patch("frappe.enqueue")
+	def test_drain_inbox(self, enqueue):
+		orders = [{"id": 4213452}, {"id": 4213453}]
+		for order in orders:
+			store_webhook("orders/create", json.dumps(order), webhook_id=frappe.generate_hash())
+		self.assertEqual(frappe.db.count(INBOX_DOCTYPE), 2)
+
+		enqueue.reset_mock()
+		drain_webhook_inbox()
+
+		self.assertEqual(frappe.db.count(INBOX_DOCTYPE), 0)
+		self.assertEqual(enqueue.call_count, 2)
+		for call, order in zip(enqueue.call_args_list, orders):
+			self.assertEqual(call.kwargs["method"], COALESCED_EVENTS_METHOD)
+			self.assertEqual(call.kwargs["payload"], order)
+
+			log = frappe.get_doc("Ecommerce Integration Log", call.kwargs["request_id"])
+			self.assertEqual(log.status, "Queued")
+			self.assertEqual(json.loads(log.get_request_data()), order)
+
+	@patch("frappe.enqueue")
+	def test_duplicates_dropped(self, enqueue):
+		webhook_id = frappe.generate_hash()
+		order = {"id": frappe.generate_hash(), "updated_at": "2021-05-04T11:12:31+05:30"}
+		before = get_duplicate_stats()
+
+		store_webhook("orders/paid", json.dumps(order), webhook_id=webhook_id)
+		frappe.db.commit()
+		# retry of same delivery
+		store_webhook("orders/paid", json.dumps(order), webhook_id=webhook_id)
+		self.assertEqual(frappe.db.count(INBOX_DOCTYPE), 1)
+
+		# same order state with different webhook id
+		store_webhook("orders/paid", json.dumps(order), webhook_id=frappe.generate_hash())
+		# order updated since
+		order["updated_at"] = "2021-05-04T11:13:31+05:30"
+		store_webhook("orders/paid", json.dumps(order), webhook_id=frappe.generate_hash())
+
+		enqueue.reset_mock()
+		drain_webhook_inbox()
+
+		self.assertEqual(frappe.db.count(INBOX_DOCTYPE), 0)
+		# both states of the order are coalesced into one sync of the latest state
+		enqueue.assert_called_once()
+		self.assertEqual(enqueue.call_args.kwargs["method"], COALESCED_EVENTS_METHOD)
+		self.assertEqual(enqueue.call_args.kwargs["payload"], order)
+
+		after = get_duplicate_stats()
+		for reason in ("webhook_id", "order_update", "coalesced"):
+			key = f"orders/paid:{reason}"
+			self.assertEqual(after.get(key, 0) - before.get(key, 0), 1)
+
+	@patch("frappe.enqueue")
+	def test_failed_drain_keeps_only_error_log(self, enqueue):
+		for order in ({"id": 4213454}, {"id": 4213455}):
+			store_webhook("orders/create", json.dumps(order), webhook_id=frappe.generate_hash())
+		frappe.db.commit()
+		queued_logs = frappe.db.count(LOG_DOCTYPE, {"status": "Queued"})
+		error_logs = frappe.db.count(LOG_DOCTYPE, {"status": "Error"})
+
+		create_log = shopify_webhook_inbox.create_shopify_log
+		calls = []
+
+		def fail_on_second_log(*args, **kwargs):
+			calls.append(kwargs)
+			if len(calls) > 1:
+				raise frappe.ValidationError("Failed to create log")
+			return create_log(*args, **kwargs)
+
+		enqueue.reset_mock()
+		with patch.object(shopify_webhook_inbox, "create_shopify_log", fail_on_second_log):
+			self.assertRaises(frappe.ValidationError, drain_webhook_inbox)
+
+		enqueue.assert_not_called()
+		# inbox rows are restored to be drained again
+		self.assertEqual(frappe.db.count(INBOX_DOCTYPE), 2)
+		self.assertEqual(frappe.db.count(LOG_DOCTYPE, {"status": "Queued"}), queued_logs)
+		self.assertEqual(frappe.db.count(LOG_DOCTYPE, {"status": "Error"}), error_logs + 1)
+
+		frappe.db.delete(INBOX_DOCTYPE)
+		frappe.db.commit()
+
+	@patch("frappe.enqueue")
+	def test_failed_request_not_marked_seen(self, enqueue):
+		webhook_id = frappe.generate_hash()
+		order = json.dumps({"id": frappe.generate_hash()})
+
+		store_webhook("orders/create", order, webhook_id=webhook_id)
+		frappe.db.rollback()
+
+		# shopify's retry is accepted
+		store_webhook("orders/create", order, webhook_id=webhook_id)
+		self.assertEqual(frappe.db.count(INBOX_DOCTYPE, {"webhook_id": webhook_id}), 1)
+
+	@patch("frappe.enqueue")
+	def test_order_events_coalesced(self, enqueue):
+		order_id = frappe.generate_hash()
+		events = [
+			("orders/create", "2021-05-04T11:12:31+05:30", None),
+			("orders/fulfilled", "2021-05-04T11:14:31+05:30", "fulfilled"),
+			# delivered out of order
+			("orders/paid", "2021-05-04T11:13:31+05:30", None),
+			("orders/cancelled", "2021-05-04T11:15:31+05:30", "fulfilled"),
+		]
+		for topic, updated_at, fulfillment_status in events:
+			order = {"id": order_id, "updated_at": updated_at, "fulfillment_status": fulfillment_status}
+			store_webhook(topic, json.dumps(order), webhook_id=frappe.generate_hash())
+
+		enqueue.reset_mock()
+		drain_webhook_inbox()
+
+		self.assertEqual(enqueue.call_count, 2)
+		sync, cancel = enqueue.call_args_list
+		self.assertEqual(sync.kwargs["method"], COALESCED_EVENTS_METHOD)
+		self.assertEqual(sync.kwargs["payload"]["updated_at"], "2021-05-04T11:14:31+05:30")
+		self.assertEqual(cancel.kwargs["method"], EVENT_MAPPER["orders/cancelled"])
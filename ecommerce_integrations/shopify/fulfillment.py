@@ -2,19 +2,27 @@ import frappe
 from erpnext.selling.doctype.sales_order.sales_order import make_delivery_note
 from frappe.utils import cint, cstr, getdate
 
+from ecommerce_integrations.controllers.setting import get_cached_setting
+from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_integration_log.ecommerce_integration_log import (
+	buffered_logs,
+)
 from ecommerce_integrations.shopify.constants import (
 	FULLFILLMENT_ID_FIELD,
+	MODULE_NAME,
 	ORDER_ID_FIELD,
 	ORDER_NUMBER_FIELD,
 	SETTING_DOCTYPE,
 )
 from ecommerce_integrations.shopify.order import get_sales_order
 from ecommerce_integrations.shopify.utils import create_shopify_log
+from ecommerce_integrations.utils.instrumentation import instrument_job
 
 
+@instrument_job(module_def=MODULE_NAME)
+@buffered_logs(module_def=MODULE_NAME)
 def prepare_delivery_note(payload, request_id=None):
 	frappe.set_user("Administrator")
-	setting = frappe.get_doc(SETTING_DOCTYPE)
+	setting = get_cached_setting(SETTING_DOCTYPE)
 	frappe.flags.request_id = request_id
 
 	order = payload
@@ -60,7 +68,7 @@ def get_fulfillment_items(dn_items, fulfillment_items, location_id=None):
 	# local import to avoid circular imports
 	from ecommerce_integrations.shopify.product import get_item_code
 
-	setting = frappe.get_cached_doc(SETTING_DOCTYPE)
+	setting = get_cached_setting(SETTING_DOCTYPE)
 	wh_map = setting.get_integration_to_erpnext_wh_mapping()
 	warehouse = wh_map.get(str(location_id)) or setting.warehouse
 
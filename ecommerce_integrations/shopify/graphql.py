@@ -0,0 +1,160 @@
+import json
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+
+from ecommerce_integrations.controllers.setting import get_cached_setting
+from ecommerce_integrations.shopify.constants import GRAPHQL_API_VERSION, SETTING_DOCTYPE
+from ecommerce_integrations.utils import http_client
+
+JsonDict = Dict[str, Any]
+
+MAX_THROTTLE_RETRIES = 5
+BULK_OPERATION_POLL_INTERVAL = 5  # seconds
+
+BULK_OPERATION_RUN_QUERY = """
+mutation ($query: String!) {
+	bulkOperationRunQuery(query: $query) {
+		bulkOperation { id status }
+		userErrors { field message }
+	}
+}
+"""
+
+CURRENT_BULK_OPERATION_QUERY = """
+query {
+	currentBulkOperation { id status errorCode objectCount url }
+}
+"""
+
+
+class ShopifyGraphQLError(frappe.ValidationError):
+	pass
+
+
+class ShopifyGraphQLClient:
+	"""Wrapper around Shopify Admin GraphQL API.
+
+	GraphQL API is rate limited by query cost instead of number of requests. Cost budget
+	reported in `extensions.cost.throttleStatus` of every response is tracked, requests wait
+	for the budget to restore instead of getting throttled.
+
+	API docs: https://shopify.dev/docs/api/usage/rate-limits#graphql-admin-api-rate-limits
+	"""
+
+	def __init__(self, shopify_url: Optional[str] = None, password: Optional[str] = None):
+		setting = get_cached_setting(SETTING_DOCTYPE)
+		shopify_url = shopify_url or setting.shopify_url
+		self.url = f"https://{shopify_url}/admin/api/{GRAPHQL_API_VERSION}/graphql.json"
+		self._headers = {
+			"X-Shopify-Access-Token": password or setting.get_password("password"),
+			"Content-Type": "application/json",
+		}
+
+		self.currently_available: Optional[float] = None
+		self.restore_rate: Optional[float] = None
+		# last requested cost of each query, used as estimate for next request of same query.
+		self._query_costs: Dict[str, float] = {}
+
+	def execute(self, query: str, variables: Optional[JsonDict] = None) -> JsonDict:
+		"""Execute query and return `data` of response.
+
+		Throttled requests are retried after waiting, other errors raise ShopifyGraphQLError."""
+		for _attempt in range(MAX_THROTTLE_RETRIES + 1):
+			self._wait_for_budget(self._query_costs.get(query))
+
+			response = http_client.post(
+				self.url, json={"query": query, "variables": variables or {}}, headers=self._headers
+			)
+			response.raise_for_status()
+			result = response.json()
+
+			cost = self._update_budget(result)
+			if cost:
+				self._query_costs[query] = cost
+
+			errors = result.get("errors") or []
+			if any(_is_throttled(error) for error in errors):
+				self._wait_for_budget(self._query_costs.get(query))
+				continue
+			if errors:
+				raise ShopifyGraphQLError(
+					_("Shopify GraphQL error: {0}").format(", ".join(e.get("message", "") for e in errors))
+				)
+			return result.get("data") or {}
+
+		raise ShopifyGraphQLError(_("Shopify GraphQL request throttled, retries exhausted."))
+
+	def run_bulk_query(
+		self, query: str, on_progress: Optional[Callable[[int], None]] = None
+	) -> Optional[str]:
+		"""Run query as a bulk operation, wait for it to finish and return URL of JSONL result.
+
+		`on_progress` is called with number of objects fetched so far on every poll. Returns None
+		if query didn't return any objects.
+
+		API docs: https://shopify.dev/docs/api/usage/bulk-operations/queries"""
+		result = self.execute(BULK_OPERATION_RUN_QUERY, {"query": query})["bulkOperationRunQuery"]
+		if result.get("userErrors"):
+			raise ShopifyGraphQLError(
+				_("Shopify bulk operation error: {0}").format(
+					", ".join(e.get("message", "") for e in result["userErrors"])
+				)
+			)
+		operation_id = result["bulkOperation"]["id"]
+
+		while True:
+			time.sleep(BULK_OPERATION_POLL_INTERVAL)
+			operation = self.execute(CURRENT_BULK_OPERATION_QUERY).get("currentBulkOperation") or {}
+			if operation.get("id") != operation_id:
+				raise ShopifyGraphQLError(_("Shopify bulk operation {0} was replaced.").format(operation_id))
+
+			if on_progress:
+				on_progress(cint(operation.get("objectCount")))
+
+			status = operation.get("status")
+			if status == "COMPLETED":
+				return operation.get("url")
+			if status in ("FAILED", "CANCELED", "EXPIRED"):
+				raise ShopifyGraphQLError(
+					_("Shopify bulk operation {0}: {1}").format(status, operation.get("errorCode") or "")
+				)
+
+	def _update_budget(self, result: JsonDict) -> Optional[float]:
+		cost = (result.get("extensions") or {}).get("cost") or {}
+		throttle_status = cost.get("throttleStatus") or {}
+
+		if throttle_status:
+			self.currently_available = throttle_status.get("currentlyAvailable")
+			self.restore_rate = throttle_status.get("restoreRate")
+		return cost.get("requestedQueryCost")
+
+	def _wait_for_budget(self, cost: Optional[float]) -> None:
+		if not cost or self.currently_available is None or not self.restore_rate:
+			return
+
+		shortfall = cost - self.currently_available
+		if shortfall > 0:
+			time.sleep(shortfall / self.restore_rate)
+			self.currently_available = cost
+
+
+def _is_throttled(error: JsonDict) -> bool:
+	return (error.get("extensions") or {}).get("code") == "THROTTLED"
+
+
+def iter_bulk_results(url: str) -> Iterator[JsonDict]:
+	"""Stream JSONL result of a bulk operation, result files can be too large to load at once."""
+	with http_client.get(url, stream=True) as response:
+		response.raise_for_status()
+		for line in response.iter_lines():
+			if line:
+				yield json.loads(line)
+
+
+def get_gid(resource: str, id) -> str:
+	"""Get GraphQL global id from REST id. e.g. 123 -> gid://shopify/Location/123"""
+	return f"gid://shopify/{resource}/{id}"
@@ -1,26 +1,84 @@
+import queue
+import threading
 from collections import Counter
-from typing import Dict
+from contextlib import nullcontext
+from typing import Dict, Optional
 
 import frappe
-from frappe.utils import cint, now
+from frappe.utils import cint, cstr, flt, now
+from pyactiveresource.connection import ClientError
 from shopify.resources import InventoryLevel, Variant
+from shopify.session import Session
 
 from ecommerce_integrations.controllers.inventory import (
+	get_inventory_changes,
 	get_inventory_levels,
-	update_inventory_sync_status,
+	log_inventory_changes,
+	set_inventory_change_cursor,
+	update_inventory_sync_status_bulk,
 )
-from ecommerce_integrations.controllers.scheduling import need_to_run
-from ecommerce_integrations.shopify.connection import temp_shopify_session
-from ecommerce_integrations.shopify.constants import MODULE_NAME, SETTING_DOCTYPE
+from ecommerce_integrations.controllers.scheduling import (
+	check_lease,
+	need_to_run,
+	release_lease,
+	renew_lease,
+)
+from ecommerce_integrations.controllers.setting import get_cached_setting
+from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_integration_log.ecommerce_integration_log import (
+	buffered_logs,
+)
+from ecommerce_integrations.shopify.connection import (
+	ShopifyRateLimiter,
+	get_last_call_limit,
+	get_response_header,
+	temp_shopify_session,
+)
+from ecommerce_integrations.shopify.constants import API_VERSION, MODULE_NAME, SETTING_DOCTYPE
+from ecommerce_integrations.shopify.graphql import ShopifyGraphQLClient, ShopifyGraphQLError, get_gid
 from ecommerce_integrations.shopify.utils import create_shopify_log
+from ecommerce_integrations.utils.instrumentation import instrument_job
+
+# maximum number of quantities accepted by `inventorySetQuantities`
+GRAPHQL_BATCH_SIZE = 250
 
+# threads uploading inventory levels using REST API, overridden by
+# `shopify_inventory_upload_workers` site config
+DEFAULT_REST_WORKERS = 4
+MAX_THROTTLE_RETRIES = 3
+LEASE_RENEW_INTERVAL = 30  # seconds
 
+VARIANT_INVENTORY_ITEM_QUERY = """
+query ($ids: [ID!]!) {
+	nodes(ids: $ids) {
+		... on ProductVariant {
+			legacyResourceId
+			inventoryItem {
+				legacyResourceId
+			}
+		}
+	}
+}
+"""
+
+INVENTORY_SET_QUANTITIES_MUTATION = """
+mutation ($input: InventorySetQuantitiesInput!) {
+	inventorySetQuantities(input: $input) {
+		userErrors {
+			field
+			message
+		}
+	}
+}
+"""
+
+
+@instrument_job(module_def=MODULE_NAME)
 def update_inventory_on_shopify() -> None:
 	"""Upload stock levels from ERPNext to Shopify.
 
 	Called by scheduler on configured interval.
 	"""
-	setting = frappe.get_doc(SETTING_DOCTYPE)
+	setting = get_cached_setting(SETTING_DOCTYPE)
 
 	if not setting.is_enabled() or not setting.update_erpnext_stock_levels_to_shopify:
 		return
@@ -28,37 +86,280 @@ def update_inventory_on_shopify() -> None:
 	if not need_to_run(SETTING_DOCTYPE, "inventory_sync_frequency", "last_inventory_sync"):
 		return
 
-	warehous_map = setting.get_erpnext_to_integration_wh_mapping()
-	inventory_levels = get_inventory_levels(tuple(warehous_map.keys()), MODULE_NAME)
+	try:
+		warehous_map = setting.get_erpnext_to_integration_wh_mapping()
+		changed_items, cursor = get_inventory_changes(MODULE_NAME)
+		inventory_levels = get_inventory_levels(
+			tuple(warehous_map.keys()), MODULE_NAME, item_codes=changed_items
+		)
+
+		if inventory_levels:
+			upload_inventory_data_to_shopify(inventory_levels, warehous_map)
 
-	if inventory_levels:
-		upload_inventory_data_to_shopify(inventory_levels, warehous_map)
+		set_inventory_change_cursor(MODULE_NAME, cursor)
+	finally:
+		release_lease(SETTING_DOCTYPE, "last_inventory_sync")
 
 
 @temp_shopify_session
+@buffered_logs(module_def=MODULE_NAME, method="update_inventory_on_shopify")
 def upload_inventory_data_to_shopify(inventory_levels, warehous_map) -> None:
 	synced_on = now()
 
 	for d in inventory_levels:
 		d.shopify_location_id = warehous_map[d.warehouse]
 
+	if cint(get_cached_setting(SETTING_DOCTYPE).use_graphql_for_inventory):
+		_upload_inventory_using_graphql(inventory_levels)
+	else:
+		_upload_inventory_using_rest(inventory_levels)
+
+	# retry failed items in next run. Sync status of an item is shared by all its warehouses, it
+	# isn't advanced if any of them failed, otherwise the retried level is filtered out as synced.
+	failed_levels = [d for d in inventory_levels if d.status == "Failed"]
+	failed_items = {d.ecom_item for d in failed_levels}
+	update_inventory_sync_status_bulk(
+		[
+			d.ecom_item
+			for d in inventory_levels
+			if d.status == "Success" and d.ecom_item not in failed_items
+		],
+		time=synced_on,
+	)
+	log_inventory_changes((d.item_code, d.warehouse) for d in failed_levels)
+
+	_log_inventory_update_status(inventory_levels)
+
+
+def _upload_inventory_using_rest(inventory_levels) -> None:
+	"""Set inventory levels using REST API, from a pool of threads sharing one rate limit."""
+	pending = queue.Queue()
+	for d in inventory_levels:
+		pending.put(d)
+
+	# all workers use same shopify session, so they share the same rate limit bucket.
+	limiter = ShopifyRateLimiter()
+	stop = threading.Event()
+	args = (frappe.local.site, frappe.local.sites_path, _get_auth_details(), pending, limiter, stop)
+
+	worker_count = cint(frappe.conf.get("shopify_inventory_upload_workers")) or DEFAULT_REST_WORKERS
+	workers = [
+		threading.Thread(target=_rest_upload_worker, args=args, daemon=True)
+		for _ in range(min(worker_count, len(inventory_levels)))
+	]
+	for worker in workers:
+		worker.start()
+
+	for worker in workers:
+		while worker.is_alive():
+			if not renew_lease(SETTING_DOCTYPE, "last_inventory_sync"):
+				# workers finish levels being uploaded and exit, remaining levels are left pending.
+				stop.set()
+			worker.join(timeout=LEASE_RENEW_INTERVAL)
+	check_lease(SETTING_DOCTYPE, "last_inventory_sync")
+
+	inventory_item_ids = {}
+	for d in inventory_levels:
+		if d.status == "Failed":
+			create_shopify_log(method="update_inventory_on_shopify", status="Error", message=d.error)
+			# stored id might be stale (e.g. variant recreated), fetch it again on retry.
+			inventory_item_ids[d.ecom_item] = None
+		elif d.fetched_inventory_item_id:
+			inventory_item_ids[d.ecom_item] = d.inventory_item_id
+	save_inventory_item_ids(inventory_item_ids)
+
+
+def _rest_upload_worker(site, sites_path, auth_details, pending, limiter, stop) -> None:
+	frappe.init(site=site, sites_path=sites_path)
+	frappe.connect()
+	try:
+		with Session.temp(*auth_details) if auth_details else nullcontext():
+			while not stop.is_set():
+				try:
+					d = pending.get_nowait()
+				except queue.Empty:
+					return
+				_upload_inventory_level(d, limiter)
+	finally:
+		frappe.destroy()
+
+
+def _upload_inventory_level(d, limiter: ShopifyRateLimiter) -> None:
+	"""Upload one inventory level, runs in worker thread so it shouldn't write to database."""
+	try:
+		if not d.inventory_item_id:
+			variant = _call_rest_api(limiter, Variant.find, d.variant_id)
+			d.inventory_item_id = cstr(variant.inventory_item_id)
+			d.fetched_inventory_item_id = True
+
+		_call_rest_api(
+			limiter,
+			InventoryLevel.set,
+			location_id=d.shopify_location_id,
+			inventory_item_id=d.inventory_item_id,
+			# shopify doesn't support fractional quantity
+			available=cint(d.actual_qty) - cint(d.reserved_qty),
+		)
+		d.status = "Success"
+	except Exception:
+		d.status = "Failed"
+		# logs are created by main thread, traceback is only available here.
+		d.error = frappe.get_traceback()
+
+
+def _call_rest_api(limiter: ShopifyRateLimiter, method, *args, **kwargs):
+	for attempt in range(MAX_THROTTLE_RETRIES + 1):
+		limiter.acquire()
 		try:
-			variant = Variant.find(d.variant_id)
-			inventory_id = variant.inventory_item_id
+			result = method(*args, **kwargs)
+		except ClientError as e:
+			if getattr(e.response, "code", None) != 429 or attempt == MAX_THROTTLE_RETRIES:
+				raise
+			limiter.throttled(flt(get_response_header(e.response, "Retry-After")) or None)
+			continue
 
-			InventoryLevel.set(
-				location_id=d.shopify_location_id,
-				inventory_item_id=inventory_id,
-				# shopify doesn't support fractional quantity
-				available=cint(d.actual_qty) - cint(d.reserved_qty),
-			)
-			update_inventory_sync_status(d.ecom_item, time=synced_on)
-			d.status = "Success"
+		limiter.update(get_last_call_limit())
+		return result
+
+
+def _get_auth_details():
+	# no auth in testing, same as `temp_shopify_session`
+	if frappe.flags.in_test:
+		return None
+
+	setting = get_cached_setting(SETTING_DOCTYPE)
+	return setting.shopify_url, API_VERSION, setting.get_password("password")
+
+
+def _upload_inventory_using_graphql(inventory_levels) -> None:
+	"""Set inventory levels using `inventorySetQuantities` mutation, 250 levels per request."""
+	client = ShopifyGraphQLClient()
+
+	for chunk in _chunk(inventory_levels, GRAPHQL_BATCH_SIZE):
+		check_lease(SETTING_DOCTYPE, "last_inventory_sync")
+		try:
+			missing = [d for d in chunk if not d.inventory_item_id]
+			if missing:
+				inventory_item_ids = get_inventory_item_ids(client, {d.variant_id for d in missing})
+				for d in missing:
+					d.inventory_item_id = inventory_item_ids.get(cstr(d.variant_id))
+					if not d.inventory_item_id:
+						d.status = "Failed"
+				save_inventory_item_ids(
+					{d.ecom_item: d.inventory_item_id for d in missing if d.inventory_item_id}
+				)
+
+			_set_inventory_quantities(client, [d for d in chunk if d.inventory_item_id])
 		except Exception as e:
 			create_shopify_log(method="update_inventory_on_shopify", status="Error", exception=e)
-			d.status = "Failed"
+			for d in chunk:
+				d.status = "Failed"
 
-	_log_inventory_update_status(inventory_levels)
+
+def backfill_inventory_item_ids() -> None:
+	"""Store inventory item ids of Ecommerce Items synced before they were stored on sync."""
+	client = ShopifyGraphQLClient()
+	ecommerce_items = frappe.get_all(
+		"Ecommerce Item",
+		filters={
+			"integration": MODULE_NAME,
+			"has_variants": 0,
+			"variant_id": ("is", "set"),
+			"inventory_item_id": ("is", "not set"),
+		},
+		fields=["name", "variant_id"],
+	)
+
+	for chunk in _chunk(ecommerce_items, GRAPHQL_BATCH_SIZE):
+		inventory_item_ids = get_inventory_item_ids(client, {d.variant_id for d in chunk})
+		save_inventory_item_ids(
+			{
+				d.name: inventory_item_ids[cstr(d.variant_id)]
+				for d in chunk
+				if cstr(d.variant_id) in inventory_item_ids
+			}
+		)
+		frappe.db.commit()
+
+
+def get_inventory_item_ids(client: ShopifyGraphQLClient, variant_ids) -> Dict[str, str]:
+	"""Get inventory item ids of variants, variants that don't exist anymore are skipped.
+
+	returns: variant id -> inventory item id"""
+	data = client.execute(
+		VARIANT_INVENTORY_ITEM_QUERY,
+		{"ids": [get_gid("ProductVariant", variant_id) for variant_id in variant_ids]},
+	)
+	return {
+		node["legacyResourceId"]: node["inventoryItem"]["legacyResourceId"]
+		for node in data.get("nodes") or []
+		if node and node.get("inventoryItem")
+	}
+
+
+def _set_inventory_quantities(client: ShopifyGraphQLClient, inventory_levels) -> None:
+	"""Set quantities and update status of each level as per reported user errors.
+
+	Levels with errors are marked as failed and remaining levels are submitted again, as
+	it's not guaranteed that rest of the levels were updated."""
+	while inventory_levels:
+		quantities = [
+			{
+				"inventoryItemId": get_gid("InventoryItem", d.inventory_item_id),
+				"locationId": get_gid("Location", d.shopify_location_id),
+				# shopify doesn't support fractional quantity
+				"quantity": cint(d.actual_qty) - cint(d.reserved_qty),
+			}
+			for d in inventory_levels
+		]
+		data = client.execute(
+			INVENTORY_SET_QUANTITIES_MUTATION,
+			{
+				"input": {
+					"name": "available",
+					"reason": "correction",
+					"ignoreCompareQuantity": True,
+					"quantities": quantities,
+				}
+			},
+		)
+
+		user_errors = data["inventorySetQuantities"]["userErrors"]
+		if not user_errors:
+			for d in inventory_levels:
+				d.status = "Success"
+			return
+
+		failed_indexes = {_get_error_index(error) for error in user_errors}
+		if None in failed_indexes:
+			# error not related to a specific level
+			raise ShopifyGraphQLError(", ".join(error["message"] for error in user_errors))
+
+		for idx in failed_indexes:
+			inventory_levels[idx].status = "Failed"
+		# stored id might be stale (e.g. variant recreated), fetch it again on retry.
+		save_inventory_item_ids({inventory_levels[idx].ecom_item: None for idx in failed_indexes})
+		inventory_levels = [d for idx, d in enumerate(inventory_levels) if idx not in failed_indexes]
+
+
+def save_inventory_item_ids(inventory_item_ids: Dict[str, str]) -> None:
+	"""Store inventory item ids on Ecommerce Items. inventory_item_ids: ecommerce item -> id"""
+	for ecom_item, inventory_item_id in inventory_item_ids.items():
+		frappe.db.set_value(
+			"Ecommerce Item", ecom_item, "inventory_item_id", inventory_item_id, update_modified=False
+		)
+
+
+def _get_error_index(user_error) -> Optional[int]:
+	"""Get index of quantity from error field path e.g. ["input", "quantities", "3", "locationId"]"""
+	field = user_error.get("field") or []
+	if len(field) >= 3 and field[1] == "quantities" and cstr(field[2]).isdigit():
+		return cint(field[2])
+
+
+def _chunk(items, size):
+	for i in range(0, len(items), size):
+		yield items[i : i + size]
 
 
 def _log_inventory_update_status(inventory_levels) -> None:
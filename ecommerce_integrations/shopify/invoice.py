@@ -2,21 +2,29 @@ import frappe
 from erpnext.selling.doctype.sales_order.sales_order import make_sales_invoice
 from frappe.utils import cint, cstr, getdate, nowdate
 
+from ecommerce_integrations.controllers.setting import get_cached_setting
+from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_integration_log.ecommerce_integration_log import (
+	buffered_logs,
+)
 from ecommerce_integrations.shopify.constants import (
+	MODULE_NAME,
 	ORDER_ID_FIELD,
 	ORDER_NUMBER_FIELD,
 	SETTING_DOCTYPE,
 )
 from ecommerce_integrations.shopify.utils import create_shopify_log
+from ecommerce_integrations.utils.instrumentation import instrument_job
 
 
+@instrument_job(module_def=MODULE_NAME)
+@buffered_logs(module_def=MODULE_NAME)
 def prepare_sales_invoice(payload, request_id=None):
 	from ecommerce_integrations.shopify.order import get_sales_order
 
 	order = payload
 
 	frappe.set_user("Administrator")
-	setting = frappe.get_doc(SETTING_DOCTYPE)
+	setting = get_cached_setting(SETTING_DOCTYPE)
 	frappe.flags.request_id = request_id
 
 	try:
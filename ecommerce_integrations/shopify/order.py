@@ -2,14 +2,19 @@ import json
 
 import frappe
 from frappe import _
-from frappe.utils import cint, cstr, flt, get_datetime, getdate, nowdate
-from shopify.collection import PaginatedIterator
+from frappe.utils import add_to_date, cint, cstr, flt, get_datetime, getdate, now_datetime, nowdate
+from redis.exceptions import LockError
 from shopify.resources import Order
 
+from ecommerce_integrations.controllers.setting import get_cached_setting
+from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_integration_log.ecommerce_integration_log import (
+	buffered_logs,
+)
 from ecommerce_integrations.shopify.connection import temp_shopify_session
 from ecommerce_integrations.shopify.constants import (
 	CUSTOMER_ID_FIELD,
 	EVENT_MAPPER,
+	MODULE_NAME,
 	ORDER_ID_FIELD,
 	ORDER_ITEM_DISCOUNT_FIELD,
 	ORDER_NUMBER_FIELD,
@@ -17,12 +22,30 @@ from ecommerce_integrations.shopify.constants import (
 	SETTING_DOCTYPE,
 )
 from ecommerce_integrations.shopify.customer import ShopifyCustomer
+from ecommerce_integrations.shopify.doctype.shopify_order_import_window.shopify_order_import_window import (
+	IMPORT_WINDOW_DOCTYPE,
+	get_import_progress,
+	get_import_windows,
+)
+from ecommerce_integrations.shopify.doctype.shopify_setting.shopify_setting import (
+	get_tax_title_key,
+)
 from ecommerce_integrations.shopify.product import create_items_if_not_exist, get_item_code
 from ecommerce_integrations.shopify.utils import create_shopify_log
+from ecommerce_integrations.utils.instrumentation import instrument_job
 from ecommerce_integrations.utils.price_list import get_dummy_price_list
 from ecommerce_integrations.utils.taxation import get_dummy_tax_category
 
+ORDER_SYNC_LOCK_TIMEOUT = 5 * 60
+ORDER_SYNC_LOCK_WAIT = 2 * 60
+
+# old orders import, see `sync_old_orders`
+ORDER_IMPORT_PAGE_SIZE = 250
+ORDER_IMPORT_TIMEOUT = 4 * 60 * 60
 
+
+@instrument_job(module_def=MODULE_NAME)
+@buffered_logs(module_def=MODULE_NAME)
 def sync_sales_order(payload, request_id=None):
 	order = payload
 	frappe.set_user("Administrator")
@@ -32,20 +55,9 @@ def sync_sales_order(payload, request_id=None):
 		create_shopify_log(status="Invalid", message="Sales order already exists, not synced")
 		return
 	try:
-		shopify_customer = order.get("customer", {})
-		shopify_customer["billing_address"] = order.get("billing_address")
-		shopify_customer["shipping_address"] = order.get("shipping_address")
-		customer_id = shopify_customer.get("id")
-		if customer_id:
-			customer = ShopifyCustomer(customer_id=customer_id)
-			if not customer.is_synced():
-				customer.sync_customer(customer=shopify_customer)
-			else:
-				customer.update_existing_addresses(shopify_customer)
-
-		create_items_if_not_exist(order)
-
-		setting = frappe.get_doc(SETTING_DOCTYPE)
+		sync_order_customer_and_items(order)
+
+		setting = get_cached_setting(SETTING_DOCTYPE)
 		create_order(order, setting)
 	except Exception as e:
 		create_shopify_log(status="Error", exception=e, rollback=True)
@@ -53,6 +65,54 @@ def sync_sales_order(payload, request_id=None):
 		create_shopify_log(status="Success")
 
 
+@instrument_job(module_def=MODULE_NAME)
+@buffered_logs(module_def=MODULE_NAME)
+def sync_order_events(payload, request_id=None):
+	"""Sync latest state of an order received from one or more coalesced events.
+
+	Creates sales order if it doesn't exist yet, then sales invoice and delivery notes as per
+	order state. Each step is skipped if it's already done, so it is safe to run repeatedly."""
+	order = payload
+	frappe.set_user("Administrator")
+	frappe.flags.request_id = request_id
+
+	cache = frappe.cache()
+	# events of same order drained in different batches can be synced concurrently.
+	lock = cache.lock(
+		cache.make_key(f"shopify_order_sync:{order['id']}"),
+		timeout=ORDER_SYNC_LOCK_TIMEOUT,
+		blocking_timeout=ORDER_SYNC_LOCK_WAIT,
+	)
+	try:
+		with lock:
+			if not frappe.db.get_value("Sales Order", filters={ORDER_ID_FIELD: cstr(order["id"])}):
+				sync_order_customer_and_items(order)
+
+			setting = get_cached_setting(SETTING_DOCTYPE)
+			create_order(order, setting)
+			# next job of the order should see the changes
+			frappe.db.commit()
+	except Exception as e:
+		create_shopify_log(status="Error", exception=e, rollback=True)
+	else:
+		create_shopify_log(status="Success")
+
+
+def sync_order_customer_and_items(order):
+	shopify_customer = order.get("customer", {})
+	shopify_customer["billing_address"] = order.get("billing_address")
+	shopify_customer["shipping_address"] = order.get("shipping_address")
+	customer_id = shopify_customer.get("id")
+	if customer_id:
+		customer = ShopifyCustomer(customer_id=customer_id)
+		if not customer.is_synced():
+			customer.sync_customer(customer=shopify_customer)
+		else:
+			customer.update_existing_addresses(shopify_customer)
+
+	create_items_if_not_exist(order)
+
+
 def create_order(order, setting, company=None):
 	# local import to avoid circular dependencies
 	from ecommerce_integrations.shopify.fulfillment import create_delivery_note
@@ -220,11 +280,7 @@ def get_order_taxes(shopify_order, setting):
 
 
 def get_tax_account_head(tax):
-	tax_title = str(tax.get("title"))
-
-	tax_account = frappe.db.get_value(
-		"Shopify Tax Account", {"parent": SETTING_DOCTYPE, "shopify_tax": tax_title}, "tax_account",
-	)
+	tax_account, _description = _get_tax_account(tax)
 
 	if not tax_account:
 		frappe.throw(_("Tax Account not specified for Shopify Tax {0}").format(tax.get("title")))
@@ -233,13 +289,13 @@ def get_tax_account_head(tax):
 
 
 def get_tax_account_description(tax):
-	tax_title = tax.get("title")
+	_tax_account, tax_description = _get_tax_account(tax)
+	return tax_description
 
-	tax_description = frappe.db.get_value(
-		"Shopify Tax Account", {"parent": SETTING_DOCTYPE, "shopify_tax": tax_title}, "tax_description",
-	)
 
-	return tax_description
+def _get_tax_account(tax):
+	tax_accounts = get_cached_setting(SETTING_DOCTYPE).get_tax_account_map()
+	return tax_accounts.get(get_tax_title_key(tax.get("title")), (None, None))
 
 
 def update_taxes_with_shipping_lines(taxes, shipping_lines, setting, taxes_inclusive=False):
@@ -291,6 +347,8 @@ def get_sales_order(order_id):
 		return frappe.get_doc("Sales Order", sales_order)
 
 
+@instrument_job(module_def=MODULE_NAME)
+@buffered_logs(module_def=MODULE_NAME)
 def cancel_order(payload, request_id=None):
 	"""Called by order/cancelled event.
 
@@ -335,47 +393,134 @@ def cancel_order(payload, request_id=None):
 		create_shopify_log(status="Success")
 
 
-@temp_shopify_session
 def sync_old_orders():
+	"""Split old orders range in windows and queue import of unfinished windows.
+
+	Runs hourly, each window is imported by its own job so a long import can be spread across
+	workers and a failed window resumes from its cursor on next run."""
 	frappe.set_user("Administrator")
 
-	shopify_setting = frappe.get_doc(SETTING_DOCTYPE)
+	shopify_setting = get_cached_setting(SETTING_DOCTYPE)
 	if not cint(shopify_setting.sync_old_orders):
 		return
 
+	windows = get_import_windows(shopify_setting.old_orders_from, shopify_setting.old_orders_to)
+	stale_before = add_to_date(now_datetime(), seconds=-ORDER_IMPORT_TIMEOUT)
+	for window in windows:
+		if window.status == "Completed":
+			continue
+		# queued or running windows are only picked again if their job died.
+		if window.status in ("Queued", "In Progress") and window.modified > stale_before:
+			continue
+
+		frappe.db.set_value(IMPORT_WINDOW_DOCTYPE, window.name, "status", "Queued")
+		frappe.enqueue(
+			"ecommerce_integrations.shopify.order.import_order_window",
+			queue="long",
+			timeout=ORDER_IMPORT_TIMEOUT,
+			enqueue_after_commit=True,
+			window=window.name,
+		)
+
+	_complete_old_orders_sync(shopify_setting)
+
+
+@temp_shopify_session
+def import_order_window(window: str):
+	frappe.set_user("Administrator")
+
+	cache = frappe.cache()
+	lock = cache.lock(cache.make_key(f"shopify_order_import:{window}"), timeout=ORDER_IMPORT_TIMEOUT)
+	if not lock.acquire(blocking=False):
+		# window is being imported by another job
+		return
+
 	try:
-		orders = _fetch_old_orders(shopify_setting.old_orders_from, shopify_setting.old_orders_to)
+		_import_order_window(frappe.get_doc(IMPORT_WINDOW_DOCTYPE, window))
+	finally:
+		try:
+			lock.release()
+		except LockError:
+			pass
 
-		for order in orders:
-			log = create_shopify_log(
-				method=EVENT_MAPPER["orders/create"], request_data=json.dumps(order), make_new=True
-			)
-			sync_sales_order(order, request_id=log.name)
 
-		shopify_setting = frappe.get_doc(SETTING_DOCTYPE)
-		shopify_setting.sync_old_orders = 0
-		shopify_setting.save()
+def _import_order_window(window) -> None:
+	if window.status == "Completed":
+		return
 
-		create_shopify_log(
-			status="Success", method="ecommerce_integrations.shopify.order.sync_old_orders"
-		)
+	window.db_set({"status": "In Progress", "error": None})
+	frappe.db.commit()
+
+	try:
+		while True:
+			orders = _fetch_old_orders(window.from_time, window.to_time, since_id=window.last_order_id)
+			for order in orders:
+				log = create_shopify_log(
+					method=EVENT_MAPPER["orders/create"], request_data=json.dumps(order), make_new=True
+				)
+				# already synced orders (e.g. on window boundary) are skipped
+				sync_sales_order(order, request_id=log.name)
+
+			if orders:
+				window.db_set(
+					{
+						"last_order_id": cstr(orders[-1]["id"]),
+						"orders_imported": cint(window.orders_imported) + len(orders),
+					}
+				)
+			if len(orders) < ORDER_IMPORT_PAGE_SIZE:
+				window.db_set("status", "Completed")
+				frappe.db.commit()
+				break
+			frappe.db.commit()
 	except Exception as e:
+		frappe.db.rollback()
+		window.db_set({"status": "Failed", "error": cstr(e)})
 		create_shopify_log(
-			status="Error", method="ecommerce_integrations.shopify.order.sync_old_orders", exception=e
+			status="Error",
+			method="ecommerce_integrations.shopify.order.import_order_window",
+			exception=e,
+			make_new=True,
 		)
+		frappe.db.commit()
+		return
+
+	_complete_old_orders_sync(get_cached_setting(SETTING_DOCTYPE))
+
+
+def _complete_old_orders_sync(shopify_setting) -> None:
+	"""Disable old orders sync once every window of the range is imported."""
+	if not cint(shopify_setting.sync_old_orders):
+		return
+
+	progress = get_import_progress(shopify_setting.old_orders_from, shopify_setting.old_orders_to)
+	if not progress["total"] or progress["completed"] < progress["total"]:
+		return
+
+	shopify_setting = frappe.get_doc(SETTING_DOCTYPE)
+	shopify_setting.sync_old_orders = 0
+	shopify_setting.save()
+
+	create_shopify_log(
+		status="Success",
+		method="ecommerce_integrations.shopify.order.sync_old_orders",
+		message=_("{0} old orders imported").format(progress["orders_imported"]),
+		make_new=True,
+	)
+
 
+def _fetch_old_orders(from_time, to_time, since_id=None):
+	"""Fetch one page of shopify orders in specified range, created after `since_id` order.
 
-def _fetch_old_orders(from_time, to_time):
-	"""Fetch all shopify orders in specified range and return an iterator on fetched orders."""
+	Orders are sorted by id when `since_id` is passed, so last id of a page is the cursor for next."""
 
 	from_time = get_datetime(from_time).astimezone().isoformat()
 	to_time = get_datetime(to_time).astimezone().isoformat()
-	orders_iterator = PaginatedIterator(
-		Order.find(created_at_min=from_time, created_at_max=to_time, limit=250)
+	orders = Order.find(
+		created_at_min=from_time,
+		created_at_max=to_time,
+		since_id=cint(since_id),
+		limit=ORDER_IMPORT_PAGE_SIZE,
 	)
 
-	for orders in orders_iterator:
-		for order in orders:
-			# Using generator instead of fetching all at once is better for
-			# avoiding rate limits and reducing resource usage.
-			yield order.to_dict()
+	return [order.to_dict() for order in orders]
@@ -70,6 +70,11 @@ shopify.ProductImporter = class {
                             <div id="shopify-sync-info">
                                 <div class="py-3 border-bottom">
                                     <button type="button" id="btn-sync-all" class="btn btn-xl btn-primary w-100 font-weight-bold py-3">Sync all Products</button>
+                                    <div class="checkbox mt-3 mb-0">
+                                        <label title="${__('Export whole catalog from Shopify at once, faster for large catalogs')}">
+                                            <input type="checkbox" id="chk-bulk-operation"> ${__('Use Shopify bulk operation')}
+                                        </label>
+                                    </div>
                                 </div>
                                 <div class="product-count py-3 d-flex justify-content-stretch">
                                     <div class="text-center p-3 mx-2 rounded w-100" style="background-color: var(--bg-color)">
@@ -314,7 +319,10 @@ shopify.ProductImporter = class {
 		if (this.syncRunning) {
 			frappe.msgprint(__('Sync already in progress'));
 		} else {
-			frappe.call({ method: 'ecommerce_integrations.shopify.page.shopify_import_products.shopify_import_products.import_all_products' })
+			frappe.call({
+				method: 'ecommerce_integrations.shopify.page.shopify_import_products.shopify_import_products.import_all_products',
+				args: { use_bulk_operation: $('#chk-bulk-operation').prop('checked') ? 1 : 0 },
+			})
 		}
 
 		// sync progress
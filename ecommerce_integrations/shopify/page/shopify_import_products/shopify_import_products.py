@@ -2,16 +2,23 @@ from time import process_time
 
 import frappe
 from frappe.exceptions import UniqueValidationError
+from frappe.utils import cint
 from shopify.resources import Product
 
 from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_item import ecommerce_item
 from ecommerce_integrations.shopify.connection import temp_shopify_session
 from ecommerce_integrations.shopify.constants import MODULE_NAME
-from ecommerce_integrations.shopify.product import ShopifyProduct
+from ecommerce_integrations.shopify.graphql import ShopifyGraphQLClient, iter_bulk_results
+from ecommerce_integrations.shopify.product import (
+	PRODUCTS_BULK_QUERY,
+	ShopifyProduct,
+	iter_products_from_bulk_results,
+)
 
 # constants
 SYNC_JOB_NAME = "shopify.job.sync.all.products"
 REALTIME_KEY = "shopify.key.sync.all.products"
+BULK_IMPORT_COMMIT_INTERVAL = 100  # products
 
 
 @frappe.whitelist()
@@ -25,10 +32,14 @@ def fetch_all_products(from_=None):
 
 	collection = _fetch_products_from_shopify(from_)
 
+	synced_products = ecommerce_item.is_synced_bulk(
+		MODULE_NAME, [(product.id, None, None) for product in collection]
+	)
+
 	products = []
 	for product in collection:
 		d = product.to_dict()
-		d["synced"] = is_synced(product.id)
+		d["synced"] = synced_products[(product.id, None, None)]
 		products.append(d)
 
 	next_url = None
@@ -117,9 +128,14 @@ def is_synced(product):
 
 
 @frappe.whitelist()
-def import_all_products():
+def import_all_products(use_bulk_operation=False):
 	frappe.enqueue(
-		queue_sync_all_products, queue="long", job_name=SYNC_JOB_NAME, key=REALTIME_KEY,
+		queue_sync_all_products_using_bulk_operation
+		if cint(use_bulk_operation)
+		else queue_sync_all_products,
+		queue="long",
+		job_name=SYNC_JOB_NAME,
+		key=REALTIME_KEY,
 	)
 
 
@@ -136,11 +152,14 @@ def queue_sync_all_products(*args, **kwargs):
 	collection = _fetch_products_from_shopify(limit=100)
 	savepoint = "shopify_product_sync"
 	while _sync:
+		synced_products = ecommerce_item.is_synced_bulk(
+			MODULE_NAME, [(product.id, None, None) for product in collection]
+		)
 		for product in collection:
 			try:
 				publish(f"Syncing product {product.id}", br=False)
 				frappe.db.savepoint(savepoint)
-				if is_synced(product.id):
+				if synced_products[(product.id, None, None)]:
 					publish(f"Product {product.id} already synced. Skipping...")
 					continue
 
@@ -170,6 +189,48 @@ def queue_sync_all_products(*args, **kwargs):
 	return True
 
 
+def queue_sync_all_products_using_bulk_operation(*args, **kwargs):
+	"""Import all products using a single Shopify bulk operation.
+
+	Whole catalog is exported by Shopify as JSONL file, which is streamed and synced product by
+	product instead of fetching every product separately."""
+	start_time = process_time()
+	publish("Starting Shopify bulk operation...")
+
+	client = ShopifyGraphQLClient()
+	url = client.run_bulk_query(
+		PRODUCTS_BULK_QUERY,
+		on_progress=lambda count: publish(f"Shopify exported {count} records...", br=False),
+	)
+
+	savepoint = "shopify_product_sync"
+	products = iter_products_from_bulk_results(iter_bulk_results(url)) if url else []
+	for count, product_dict in enumerate(products, start=1):
+		product_id = product_dict["id"]
+		try:
+			publish(f"Syncing product {product_id}", br=False)
+			frappe.db.savepoint(savepoint)
+			if is_synced(product_id):
+				publish(f"Product {product_id} already synced. Skipping...")
+				continue
+
+			ShopifyProduct(product_id)._make_item(product_dict)
+
+			publish(f"✅ Synced Product {product_id}", synced=True)
+
+		except Exception as e:
+			publish(f"❌ Error Syncing Product {product_id} : {str(e)}", error=True)
+			frappe.db.rollback(save_point=savepoint)
+
+		finally:
+			if count % BULK_IMPORT_COMMIT_INTERVAL == 0:
+				frappe.db.commit()  # prevents too many write request error
+
+	end_time = process_time()
+	publish(f"🎉 Done in {end_time - start_time}s", done=True)
+	return True
+
+
 def publish(message, synced=False, error=False, done=False, br=True):
 	frappe.publish_realtime(
 		REALTIME_KEY,
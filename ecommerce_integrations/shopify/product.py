@@ -1,11 +1,12 @@
-from typing import Optional
+from typing import Dict, Iterable, Iterator, Optional
 
 import frappe
 from frappe import _, msgprint
-from frappe.utils import cint, cstr
+from frappe.utils import cint, cstr, flt
 from frappe.utils.nestedset import get_root_of
 from shopify.resources import Product, Variant
 
+from ecommerce_integrations.controllers.setting import get_cached_setting
 from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_item import ecommerce_item
 from ecommerce_integrations.shopify.connection import temp_shopify_session
 from ecommerce_integrations.shopify.constants import (
@@ -17,6 +18,44 @@ from ecommerce_integrations.shopify.constants import (
 )
 from ecommerce_integrations.shopify.utils import create_shopify_log
 
+# products with variants, fetched using bulk operation. See `iter_products_from_bulk_results`
+PRODUCTS_BULK_QUERY = """
+{
+	products {
+		edges {
+			node {
+				id
+				legacyResourceId
+				title
+				descriptionHtml
+				productType
+				vendor
+				options { name position values }
+				featuredImage { url }
+				variants {
+					edges {
+						node {
+							id
+							legacyResourceId
+							title
+							sku
+							price
+							selectedOptions { name value }
+							inventoryItem {
+								legacyResourceId
+								measurement { weight { unit value } }
+							}
+						}
+					}
+				}
+			}
+		}
+	}
+}
+"""
+
+GRAPHQL_WEIGHT_UNIT_MAP = {"KILOGRAMS": "kg", "GRAMS": "g", "OUNCES": "oz", "POUNDS": "lb"}
+
 
 class ShopifyProduct:
 	def __init__(
@@ -30,7 +69,7 @@ class ShopifyProduct:
 		self.variant_id = str(variant_id) if variant_id else None
 		self.sku = str(sku) if sku else None
 		self.has_variants = has_variants
-		self.setting = frappe.get_doc(SETTING_DOCTYPE)
+		self.setting = get_cached_setting(SETTING_DOCTYPE)
 
 		if not self.setting.is_enabled():
 			frappe.throw(_("Can not create Shopify product when integration is disabled."))
@@ -69,6 +108,7 @@ class ShopifyProduct:
 
 		else:
 			product_dict["variant_id"] = product_dict["variants"][0]["id"]
+			product_dict["inventory_item_id"] = product_dict["variants"][0].get("inventory_item_id")
 			self._create_item(product_dict, warehouse)
 
 	def _create_attribute(self, product_dict):
@@ -136,10 +176,16 @@ class ShopifyProduct:
 
 		integration_item_code = product_dict["id"]  # shopify product_id
 		variant_id = product_dict.get("variant_id", "")  # shopify variant_id if has variants
+		inventory_item_id = product_dict.get("inventory_item_id")
 		sku = item_dict["sku"]
 
 		if not _match_sku_and_link_item(
-			item_dict, integration_item_code, variant_id, variant_of=variant_of, has_variant=has_variant
+			item_dict,
+			integration_item_code,
+			variant_id,
+			variant_of=variant_of,
+			has_variant=has_variant,
+			inventory_item_id=inventory_item_id,
 		):
 			ecommerce_item.create_ecommerce_item(
 				MODULE_NAME,
@@ -149,6 +195,7 @@ class ShopifyProduct:
 				sku=sku,
 				variant_of=variant_of,
 				has_variants=has_variant,
+				inventory_item_id=inventory_item_id,
 			)
 
 	def _create_item_variants(self, product_dict, warehouse, attributes):
@@ -161,6 +208,7 @@ class ShopifyProduct:
 				shopify_item_variant = {
 					"id": product_dict.get("id"),
 					"variant_id": variant.get("id"),
+					"inventory_item_id": variant.get("inventory_item_id"),
 					"item_code": variant.get("id"),
 					"title": product_dict.get("title", "").strip() + "-" + variant.get("title"),
 					"product_type": product_dict.get("product_type"),
@@ -250,6 +298,62 @@ def _has_variants(product_dict) -> bool:
 	return bool(options and "Default Title" not in options[0]["values"])
 
 
+def iter_products_from_bulk_results(records: Iterable[Dict]) -> Iterator[Dict]:
+	"""Build product dicts in REST API format from JSONL records of `PRODUCTS_BULK_QUERY`.
+
+	Variant records follow their product's record, so only one product is held in memory."""
+	product = None
+	for record in records:
+		if not record.get("__parentId"):
+			if product:
+				yield product
+			product = _get_product_from_bulk_record(record)
+		elif product and record["__parentId"] == product["admin_graphql_api_id"]:
+			product["variants"].append(_get_variant_from_bulk_record(record, product))
+
+	if product:
+		yield product
+
+
+def _get_product_from_bulk_record(record) -> Dict:
+	image = record.get("featuredImage")
+	return {
+		"id": record["legacyResourceId"],
+		"admin_graphql_api_id": record["id"],
+		"title": record.get("title") or "",
+		"body_html": record.get("descriptionHtml"),
+		"product_type": record.get("productType"),
+		"vendor": record.get("vendor"),
+		"options": record.get("options") or [],
+		"image": {"src": image["url"]} if image else None,
+		"variants": [],
+	}
+
+
+def _get_variant_from_bulk_record(record, product) -> Dict:
+	inventory_item = record.get("inventoryItem") or {}
+	weight = (inventory_item.get("measurement") or {}).get("weight") or {}
+
+	variant = {
+		"id": record["legacyResourceId"],
+		"title": record.get("title") or "",
+		"sku": record.get("sku"),
+		"price": record.get("price"),
+		"inventory_item_id": inventory_item.get("legacyResourceId"),
+		"weight": flt(weight.get("value")),
+		"weight_unit": GRAPHQL_WEIGHT_UNIT_MAP.get(weight.get("unit"), "kg"),
+	}
+
+	# selected options are `option1`, `option2`.. in REST API, numbered by position of the option.
+	option_positions = {option["name"]: option.get("position") for option in product["options"]}
+	for selected_option in record.get("selectedOptions") or []:
+		position = cint(option_positions.get(selected_option["name"]))
+		if 0 < position <= len(SHOPIFY_VARIANTS_ATTR_LIST):
+			variant[SHOPIFY_VARIANTS_ATTR_LIST[position - 1]] = selected_option["value"]
+
+	return variant
+
+
 def _get_sku(product_dict):
 	if product_dict.get("variants"):
 		return product_dict.get("variants")[0].get("sku")
@@ -263,7 +367,7 @@ def _get_item_image(product_dict):
 
 
 def _match_sku_and_link_item(
-	item_dict, product_id, variant_id, variant_of=None, has_variant=False
+	item_dict, product_id, variant_id, variant_of=None, has_variant=False, inventory_item_id=None
 ) -> bool:
 	"""Tries to match new item with existing item using Shopify SKU == item_code.
 
@@ -285,6 +389,7 @@ def _match_sku_and_link_item(
 					"has_variants": 0,
 					"variant_id": cstr(variant_id),
 					"sku": sku,
+					"inventory_item_id": cstr(inventory_item_id),
 				}
 			)
 
@@ -296,15 +401,15 @@ def _match_sku_and_link_item(
 
 def create_items_if_not_exist(order):
 	"""Using shopify order, sync all items that are not already synced."""
-	for item in order.get("line_items", []):
-
-		product_id = item["product_id"]
-		variant_id = item.get("variant_id")
-		sku = item.get("sku")
-		product = ShopifyProduct(product_id, variant_id=variant_id, sku=sku)
+	items = [
+		(item["product_id"], item.get("variant_id"), item.get("sku"))
+		for item in order.get("line_items", [])
+	]
+	synced_items = ecommerce_item.is_synced_bulk(MODULE_NAME, items)
 
-		if not product.is_synced():
-			product.sync_product()
+	for (product_id, variant_id, sku), synced in synced_items.items():
+		if not synced:
+			ShopifyProduct(product_id, variant_id=variant_id, sku=sku).sync_product()
 
 
 def get_item_code(shopify_item):
@@ -334,7 +439,7 @@ def upload_erpnext_item(doc, method=None):
 	if item.flags.from_integration:
 		return
 
-	setting = frappe.get_doc(SETTING_DOCTYPE)
+	setting = get_cached_setting(SETTING_DOCTYPE)
 
 	if not setting.is_enabled() or not setting.upload_erpnext_items:
 		return
@@ -376,6 +481,7 @@ def upload_erpnext_item(doc, method=None):
 					"integration_item_code": str(product.id),
 					"variant_id": str(product.variants[0].id),
 					"sku": str(product.variants[0].sku),
+					"inventory_item_id": cstr(product.variants[0].inventory_item_id),
 				}
 			)
 			ecom_item.insert()
@@ -2,6 +2,7 @@
 # See LICENSE
 
 import unittest
+from unittest.mock import patch
 
 import frappe
 from shopify.resources import Webhook
@@ -38,3 +39,32 @@ class TestShopifyConnection(unittest.TestCase):
 		with Session.temp(self.setting.shopify_url, API_VERSION, self.setting.get_password("password")):
 			for wh in Webhook.find():
 				self.assertNotEqual(wh.address, callback_url)
+
+
+class TestShopifyRateLimiter(unittest.TestCase):
+	def test_bucket_level(self):
+		limiter = connection.ShopifyRateLimiter(headroom=2)
+		for _ in range(5):
+			limiter.acquire()
+		self.assertAlmostEqual(limiter.level, 5, delta=0.5)
+
+		# usage by other apps is reported by shopify
+		limiter.update("30/80")
+		self.assertEqual(limiter.capacity, 80)
+		self.assertEqual(limiter.leak_rate, 4)
+		self.assertAlmostEqual(limiter.level, 30, delta=0.5)
+
+		# unknown header is ignored
+		limiter.update(None)
+		self.assertEqual(limiter.capacity, 80)
+
+	def test_waits_when_full(self):
+		limiter = connection.ShopifyRateLimiter(headroom=2)
+		limiter.update("38/40")
+
+		with patch.object(connection.time, "sleep") as sleep:
+			sleep.side_effect = lambda seconds: setattr(limiter, "level", limiter.level - 2 * seconds)
+			limiter.acquire()
+
+		sleep.assert_called()
+		self.assertLessEqual(limiter.level, 38)
@@ -0,0 +1,109 @@
+# Copyright (c) 2021, Frappe and Contributors
+# See LICENSE
+
+import json
+from unittest.mock import patch
+
+import responses
+from frappe import _dict
+
+from ecommerce_integrations.shopify.constants import GRAPHQL_API_VERSION
+from ecommerce_integrations.shopify.inventory import (
+	_upload_inventory_using_graphql,
+	upload_inventory_data_to_shopify,
+)
+from ecommerce_integrations.shopify.tests.utils import TestCase
+
+GRAPHQL_URL = f"https://frappetest.myshopify.com/admin/api/{GRAPHQL_API_VERSION}/graphql.json"
+
+THROTTLE_STATUS = {
+	"cost": {
+		"requestedQueryCost": 10,
+		"throttleStatus": {"maximumAvailable": 1000, "currentlyAvailable": 990, "restoreRate": 50},
+	}
+}
+
+
+class TestGraphQLInventoryUpload(TestCase):
+	@responses.activate
+	def test_per_level_errors(self):
+		mutations = []
+		variant_queries = []
+
+		def graphql_callback(request):
+			body = json.loads(request.body)
+			if "nodes" in body["query"]:
+				variant_queries.append(sorted(body["variables"]["ids"]))
+				data = {
+					"nodes": [
+						{"legacyResourceId": "102", "inventoryItem": {"legacyResourceId": "202"}},
+						None,
+					]
+				}
+			else:
+				quantities = body["variables"]["input"]["quantities"]
+				mutations.append(quantities)
+				# second level is rejected on first attempt
+				errors = (
+					[{"field": ["input", "quantities", "1", "locationId"], "message": "Not stocked"}]
+					if len(quantities) > 1
+					else []
+				)
+				data = {"inventorySetQuantities": {"userErrors": errors}}
+			return 200, {}, json.dumps({"data": data, "extensions": THROTTLE_STATUS})
+
+		responses.add_callback(responses.POST, GRAPHQL_URL, callback=graphql_callback)
+
+		# first level has inventory item id stored on ecommerce item
+		levels = [
+			_dict(
+				ecom_item=f"_Test Ecommerce Item {variant_id}",
+				variant_id=variant_id,
+				inventory_item_id=inventory_item_id,
+				shopify_location_id="301",
+				actual_qty=5.0,
+				reserved_qty=2.0,
+			)
+			for variant_id, inventory_item_id in (("101", "201"), ("102", None), ("103", None))
+		]
+		_upload_inventory_using_graphql(levels)
+
+		self.assertEqual([d.status for d in levels], ["Success", "Failed", "Failed"])
+		self.assertEqual(levels[1].inventory_item_id, "202")
+		self.assertEqual(
+			variant_queries, [["gid://shopify/ProductVariant/102", "gid://shopify/ProductVariant/103"]]
+		)
+		self.assertEqual(len(mutations), 2)
+		self.assertEqual(
+			mutations[1],
+			[
+				{
+					"inventoryItemId": "gid://shopify/InventoryItem/201",
+					"locationId": "gid://shopify/Location/301",
+					"quantity": 3,
+				}
+			],
+		)
+
+
+class TestInventorySyncStatus(TestCase):
+	@patch("ecommerce_integrations.shopify.inventory.log_inventory_changes")
+	@patch("ecommerce_integrations.shopify.inventory.update_inventory_sync_status_bulk")
+	@patch("ecommerce_integrations.shopify.inventory._upload_inventory_using_rest")
+	def test_partially_failed_item(self, upload, update_sync_status, log_changes):
+		statuses = {("A", "WH1"): "Success", ("A", "WH2"): "Failed", ("B", "WH1"): "Success"}
+		levels = [
+			_dict(ecom_item=ecom_item, item_code=ecom_item, warehouse=warehouse, variant_id=ecom_item)
+			for ecom_item, warehouse in statuses
+		]
+
+		def set_status(inventory_levels):
+			for d in inventory_levels:
+				d.status = statuses[(d.ecom_item, d.warehouse)]
+
+		upload.side_effect = set_status
+		upload_inventory_data_to_shopify(levels, {"WH1": "301", "WH2": "302"})
+
+		# sync status of item with a failed warehouse isn't advanced, so its retry isn't skipped
+		self.assertEqual(update_sync_status.call_args[0][0], ["B"])
+		self.assertEqual(list(log_changes.call_args[0][0]), [("A", "WH2")])
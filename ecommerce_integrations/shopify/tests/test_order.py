@@ -3,10 +3,48 @@
 
 import json
 import unittest
+from unittest.mock import patch
 
-from ecommerce_integrations.shopify.order import sync_sales_order
+import frappe
+
+from ecommerce_integrations.controllers.tests.utils import clear_cached_setting
+from ecommerce_integrations.shopify.constants import SETTING_DOCTYPE
+from ecommerce_integrations.shopify.order import (
+	get_tax_account_description,
+	get_tax_account_head,
+	sync_sales_order,
+)
+from ecommerce_integrations.shopify.tests.utils import TestCase
 
 
 class TestOrder(unittest.TestCase):
 	def test_sync_with_variants(self):
 		pass
+
+
+class TestTaxAccount(TestCase):
+	def set_tax_accounts(self, taxes):
+		with patch(
+			"ecommerce_integrations.shopify.doctype.shopify_setting.shopify_setting.ShopifySetting._handle_webhooks"
+		):
+			setting = frappe.get_doc(SETTING_DOCTYPE)
+			setting.set("taxes", taxes)
+			setting.save(ignore_permissions=True)
+		clear_cached_setting(SETTING_DOCTYPE)
+
+	def test_tax_account_lookup(self):
+		self.set_tax_accounts(
+			[{"shopify_tax": "IGST", "tax_account": "_Test Account VAT - _TC", "tax_description": "GST"}]
+		)
+
+		self.assertEqual(get_tax_account_head({"title": "igst "}), "_Test Account VAT - _TC")
+		self.assertEqual(get_tax_account_description({"title": "IGST"}), "GST")
+		self.assertIsNone(get_tax_account_description({"title": "CGST"}))
+		self.assertRaises(frappe.ValidationError, get_tax_account_head, {"title": "CGST"})
+
+		# cache is invalidated when settings are saved
+		self.set_tax_accounts(
+			[{"shopify_tax": "CGST", "tax_account": "_Test Account VAT - _TC", "tax_description": None}]
+		)
+		self.assertEqual(get_tax_account_head({"title": "CGST"}), "_Test Account VAT - _TC")
+		self.assertRaises(frappe.ValidationError, get_tax_account_head, {"title": "IGST"})
@@ -3,7 +3,7 @@
 
 import frappe
 
-from ecommerce_integrations.shopify.product import ShopifyProduct
+from ecommerce_integrations.shopify.product import ShopifyProduct, iter_products_from_bulk_results
 
 from .utils import TestCase
 
@@ -63,3 +63,36 @@ class TestProduct(TestCase):
 
 		self.assertEqual(len(created_ecom_variants), 9)
 		self.assertEqual(sorted(required_variants), sorted(created_ecom_variants))
+
+	def test_products_from_bulk_results(self):
+		records = [
+			{
+				"id": "gid://shopify/Product/1",
+				"legacyResourceId": "1",
+				"title": "Shirt",
+				"options": [{"name": "Size", "position": 1}, {"name": "Color", "position": 2}],
+				"featuredImage": {"url": "https://cdn.shopify.com/shirt.png"},
+			},
+			{
+				"id": "gid://shopify/ProductVariant/11",
+				"legacyResourceId": "11",
+				"selectedOptions": [{"name": "Color", "value": "Red"}, {"name": "Size", "value": "S"}],
+				"inventoryItem": {
+					"legacyResourceId": "111",
+					"measurement": {"weight": {"unit": "GRAMS", "value": 200}},
+				},
+				"__parentId": "gid://shopify/Product/1",
+			},
+			{"id": "gid://shopify/Product/2", "legacyResourceId": "2", "title": "Mug"},
+		]
+
+		shirt, mug = iter_products_from_bulk_results(iter(records))
+
+		self.assertEqual(shirt["id"], "1")
+		self.assertEqual(shirt["image"], {"src": "https://cdn.shopify.com/shirt.png"})
+		(variant,) = shirt["variants"]
+		self.assertEqual(variant["option1"], "S")
+		self.assertEqual(variant["option2"], "Red")
+		self.assertEqual(variant["inventory_item_id"], "111")
+		self.assertEqual((variant["weight"], variant["weight_unit"]), (200, "g"))
+		self.assertEqual(mug["variants"], [])
@@ -9,6 +9,7 @@ from erpnext import get_default_cost_center
 from pyactiveresource.activeresource import ActiveResource
 from pyactiveresource.testing import http_fake
 
+from ecommerce_integrations.controllers.tests.utils import clear_cached_setting
 from ecommerce_integrations.shopify.constants import API_VERSION, SETTING_DOCTYPE
 
 # Following code is adapted from Shopify python api under MIT license with minor changes.
@@ -79,6 +80,7 @@ class TestCase(unittest.TestCase):
 					],
 				}
 			).save(ignore_permissions=True)
+		clear_cached_setting(SETTING_DOCTYPE)
 
 	def setUp(self):
 		ActiveResource.site = None
@@ -2,13 +2,14 @@ import base64
 from typing import Any, Dict, List, Optional, Tuple
 
 import frappe
-import requests
 from frappe import _
 from frappe.utils import cint, cstr, get_datetime
 from pytz import timezone
 
+from ecommerce_integrations.controllers.setting import get_cached_setting
 from ecommerce_integrations.unicommerce.constants import SETTINGS_DOCTYPE
 from ecommerce_integrations.unicommerce.utils import create_unicommerce_log
+from ecommerce_integrations.utils import http_client
 
 JsonDict = Dict[str, Any]
 
@@ -22,7 +23,7 @@ class UnicommerceAPIClient:
 	def __init__(
 		self, url: Optional[str] = None, access_token: Optional[str] = None,
 	):
-		self.settings = frappe.get_doc(SETTINGS_DOCTYPE)
+		self.settings = get_cached_setting(SETTINGS_DOCTYPE)
 		self.base_url = url or f"https://{self.settings.unicommerce_site}"
 		self.access_token = access_token
 		self.__initialize_auth()
@@ -30,7 +31,10 @@ class UnicommerceAPIClient:
 	def __initialize_auth(self):
 		"""Initialize and setup authentication details"""
 		if not self.access_token:
-			self.settings.renew_tokens()
+			if self.settings.is_token_expired():
+				# cached settings are shared and read-only, renew and save using a fresh copy.
+				self.settings = frappe.get_doc(SETTINGS_DOCTYPE)
+				self.settings.renew_tokens()
 			self.access_token = self.settings.get_password("access_token")
 
 		self._auth_headers = {"Authorization": f"Bearer {self.access_token}"}
@@ -54,7 +58,7 @@ class UnicommerceAPIClient:
 		url = self.base_url + endpoint
 
 		try:
-			response = requests.request(
+			response = http_client.request(
 				url=url, method=method, headers=headers, json=body, params=params, files=files
 			)
 			# unicommerce gives useful info in response text, show it in error logs
@@ -5,6 +5,7 @@ import frappe
 from frappe import _
 from frappe.utils.nestedset import get_root_of
 
+from ecommerce_integrations.controllers.setting import get_cached_setting
 from ecommerce_integrations.unicommerce.constants import (
 	ADDRESS_JSON_FIELD,
 	CUSTOMER_CODE_FIELD,
@@ -33,7 +34,7 @@ def _create_new_customer(order):
 	if customer:
 		return customer
 
-	setting = frappe.get_cached_doc(SETTINGS_DOCTYPE)
+	setting = get_cached_setting(SETTINGS_DOCTYPE)
 	customer_group = (
 		frappe.db.get_value(
 			"Unicommerce Channel", {"channel_id": order["channel"]}, fieldname="customer_group"
@@ -4,7 +4,6 @@
 from typing import Dict, List, Optional, Tuple
 
 import frappe
-import requests
 from frappe import _
 from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
 from frappe.utils import add_to_date, get_datetime, now_datetime
@@ -13,6 +12,7 @@ from ecommerce_integrations.controllers.setting import (
 	ERPNextWarehouse,
 	IntegrationWarehouse,
 	SettingController,
+	memoize_on_cached_setting,
 )
 from ecommerce_integrations.unicommerce.constants import (
 	ADDRESS_JSON_FIELD,
@@ -43,6 +43,7 @@ from ecommerce_integrations.unicommerce.constants import (
 	TRACKING_CODE_FIELD,
 )
 from ecommerce_integrations.unicommerce.utils import create_unicommerce_log
+from ecommerce_integrations.utils import http_client
 
 
 class UnicommerceSettings(SettingController):
@@ -71,18 +72,23 @@ class UnicommerceSettings(SettingController):
 			setup_custom_fields(update=False)
 
 	def renew_tokens(self, save=True):
-		if now_datetime() >= get_datetime(self.expires_on):
-			try:
-				self.update_tokens()
-			except Exception as e:
-				create_unicommerce_log(status="Error", message="Failed to authenticate with Unicommerce")
-				raise e
+		if not self.is_token_expired():
+			return
+
+		try:
+			self.update_tokens()
+		except Exception as e:
+			create_unicommerce_log(status="Error", message="Failed to authenticate with Unicommerce")
+			raise e
 		if save:
 			self.flags.ignore_custom_fields = True
 			self.save()
 			frappe.db.commit()
 			self.load_from_db()
 
+	def is_token_expired(self) -> bool:
+		return now_datetime() >= get_datetime(self.expires_on)
+
 	def update_tokens(self, grant_type="password"):
 		url = f"https://{self.unicommerce_site}/oauth/token"
 
@@ -92,7 +98,7 @@ class UnicommerceSettings(SettingController):
 		elif grant_type == "refresh_token":
 			params.update({"refresh_token": self.get_password("refresh_token")})
 
-		res = requests.get(url, params=params)
+		res = http_client.get(url, params=params)
 		if res.status_code == 200:
 			res = res.json()
 			self.access_token = res["access_token"]
@@ -140,6 +146,7 @@ class UnicommerceSettings(SettingController):
 				_("Warehouse Mapping should be unique and one-to-one without repeating same warehouses.")
 			)
 
+	@memoize_on_cached_setting
 	def get_erpnext_warehouses(self, all_wh=False) -> List[ERPNextWarehouse]:
 		"""Get list of configured ERPNext warehouses.
 
@@ -149,6 +156,7 @@ class UnicommerceSettings(SettingController):
 			wh_map.erpnext_warehouse for wh_map in self.warehouse_mapping if wh_map.enabled or all_wh
 		]
 
+	@memoize_on_cached_setting
 	def get_erpnext_to_integration_wh_mapping(
 		self, all_wh=False
 	) -> Dict[ERPNextWarehouse, IntegrationWarehouse]:
@@ -161,6 +169,7 @@ class UnicommerceSettings(SettingController):
 			if wh_map.enabled or all_wh
 		}
 
+	@memoize_on_cached_setting
 	def get_integration_to_erpnext_wh_mapping(
 		self, all_wh=False
 	) -> Dict[IntegrationWarehouse, ERPNextWarehouse]:
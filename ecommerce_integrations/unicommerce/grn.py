@@ -8,6 +8,7 @@ from frappe.utils import cint, getdate
 from frappe.utils.csvutils import UnicodeWriter
 from frappe.utils.file_manager import save_file
 
+from ecommerce_integrations.controllers.setting import get_cached_setting
 from ecommerce_integrations.unicommerce.api_client import UnicommerceAPIClient
 from ecommerce_integrations.unicommerce.constants import (
 	GRN_STOCK_ENTRY_TYPE,
@@ -78,7 +79,7 @@ def validate_stock_entry_for_grn(doc, method=None):
 	if not is_unicommerce_grn(stock_entry):
 		return
 
-	settings = frappe.get_doc(SETTINGS_DOCTYPE)
+	settings = get_cached_setting(SETTINGS_DOCTYPE)
 
 	if not settings.is_enabled():
 		return
@@ -111,7 +112,7 @@ def upload_grn(doc, method=None):
 	if not is_unicommerce_grn(stock_entry):
 		return
 
-	settings = frappe.get_doc(SETTINGS_DOCTYPE)
+	settings = get_cached_setting(SETTINGS_DOCTYPE)
 	facility_code = get_facility_code(stock_entry, settings)
 	csv_file = _prepare_grn_import_csv(doc)
 
@@ -142,14 +143,38 @@ def _prepare_grn_import_csv(stock_entry) -> str:
 
 	rows = []
 	vendor_code = frappe.db.get_single_value(SETTINGS_DOCTYPE, "vendor_code")
+	invoice_date = _get_unicommerce_format_date(stock_entry.posting_date)
 
-	for item in stock_entry.items:
-		price = frappe.db.get_value("Item", item.item_code, "standard_rate") or ""
-		invoice_date = _get_unicommerce_format_date(stock_entry.posting_date)
+	item_codes = list({item.item_code for item in stock_entry.items})
+	batches = list({item.batch_no for item in stock_entry.items if item.batch_no})
 
-		batch_details = frappe.db.get_value(
-			"Batch", item.batch_no, fieldname=["manufacturing_date", "expiry_date"], as_dict=True
+	prices = dict(
+		frappe.get_all(
+			"Item", filters={"name": ("in", item_codes)}, fields=["name", "standard_rate"], as_list=True,
 		)
+	)
+	batch_details_map = {}
+	if batches:
+		batch_details_map = {
+			batch.name: batch
+			for batch in frappe.get_all(
+				"Batch",
+				filters={"name": ("in", batches)},
+				fields=["name", "manufacturing_date", "expiry_date"],
+			)
+		}
+	skus = {}
+	for ecom_item in frappe.get_all(
+		"Ecommerce Item",
+		filters={"erpnext_item_code": ("in", item_codes), "integration": MODULE_NAME},
+		fields=["erpnext_item_code", "integration_item_code"],
+	):
+		skus.setdefault(ecom_item.erpnext_item_code, ecom_item.integration_item_code)
+
+	for item in stock_entry.items:
+		price = prices.get(item.item_code) or ""
+
+		batch_details = batch_details_map.get(item.batch_no)
 		manufacturing_date = _get_unicommerce_format_date(
 			batch_details.manufacturing_date if batch_details else getdate()
 		)
@@ -157,11 +182,7 @@ def _prepare_grn_import_csv(stock_entry) -> str:
 			batch_details.expiry_date if batch_details else getdate("2099-01-01")
 		)
 
-		sku = frappe.db.get_value(
-			"Ecommerce Item",
-			{"erpnext_item_code": item.item_code, "integration": MODULE_NAME},
-			"integration_item_code",
-		)
+		sku = skus.get(item.item_code)
 		if not sku:
 			frappe.throw(_("Item {} does not have associated Unicommerce SKU.").format(item.item_code))
 
@@ -5,19 +5,26 @@ import frappe
 from frappe.utils import cint, now
 
 from ecommerce_integrations.controllers.inventory import (
+	get_inventory_changes,
 	get_inventory_levels,
-	get_inventory_levels_of_group_warehouse,
-	update_inventory_sync_status,
+	get_inventory_levels_of_group_warehouses,
+	get_warehouse_bounds,
+	log_inventory_changes,
+	set_inventory_change_cursor,
+	update_inventory_sync_status_bulk,
 )
-from ecommerce_integrations.controllers.scheduling import need_to_run
+from ecommerce_integrations.controllers.scheduling import check_lease, need_to_run, release_lease
+from ecommerce_integrations.controllers.setting import get_cached_setting
 from ecommerce_integrations.unicommerce.api_client import UnicommerceAPIClient
 from ecommerce_integrations.unicommerce.constants import MODULE_NAME, SETTINGS_DOCTYPE
+from ecommerce_integrations.utils.instrumentation import instrument_job
 
 # Note: Undocumented but currently handles ~1000 inventory changes in one request.
 # Remaining to be done in next interval.
 MAX_INVENTORY_UPDATE_IN_REQUEST = 1000
 
 
+@instrument_job(module_def=MODULE_NAME)
 def update_inventory_on_unicommerce(client=None, force=False):
 	"""Update ERPnext warehouse wise inventory to Unicommerce.
 
@@ -26,7 +33,7 @@ def update_inventory_on_unicommerce(client=None, force=False):
 
 	force=True ignores the set frequency.
 	"""
-	settings = frappe.get_cached_doc(SETTINGS_DOCTYPE)
+	settings = get_cached_setting(SETTINGS_DOCTYPE)
 
 	if not settings.is_enabled() or not settings.enable_inventory_sync:
 		return
@@ -37,6 +44,13 @@ def update_inventory_on_unicommerce(client=None, force=False):
 	):
 		return
 
+	try:
+		_update_inventory(settings, client)
+	finally:
+		release_lease(SETTINGS_DOCTYPE, "last_inventory_sync")
+
+
+def _update_inventory(settings, client=None) -> None:
 	# get configured warehouses
 	warehouses = settings.get_erpnext_warehouses()
 	wh_to_facility_map = settings.get_erpnext_to_integration_wh_mapping()
@@ -48,19 +62,33 @@ def update_inventory_on_unicommerce(client=None, force=False):
 	success_map: Dict[str, bool] = defaultdict(lambda: True)
 	inventory_synced_on = now()
 
-	for warehouse in warehouses:
-		is_group_warehouse = cint(frappe.db.get_value("Warehouse", warehouse, "is_group"))
+	changed_items, cursor = get_inventory_changes(MODULE_NAME)
+	# items that need to be synced again in next run
+	pending_changes = []
 
-		if is_group_warehouse:
-			erpnext_inventory = get_inventory_levels_of_group_warehouse(
-				warehouse=warehouse, integration=MODULE_NAME
-			)
+	warehouse_bounds = get_warehouse_bounds(warehouses)
+	group_warehouses = [wh for wh, bounds in warehouse_bounds.items() if cint(bounds.is_group)]
+
+	# consolidated inventory of all group warehouses is fetched in one pass
+	group_warehouse_inventory = defaultdict(list)
+	for d in get_inventory_levels_of_group_warehouses(
+		group_warehouses, integration=MODULE_NAME, item_codes=changed_items
+	):
+		group_warehouse_inventory[d.warehouse].append(d)
+
+	for warehouse in warehouses:
+		check_lease(SETTINGS_DOCTYPE, "last_inventory_sync")
+		if warehouse in group_warehouses:
+			erpnext_inventory = group_warehouse_inventory[warehouse]
 		else:
-			erpnext_inventory = get_inventory_levels(warehouses=(warehouse,), integration=MODULE_NAME)
+			erpnext_inventory = get_inventory_levels(
+				warehouses=(warehouse,), integration=MODULE_NAME, item_codes=changed_items
+			)
 
 		if not erpnext_inventory:
 			continue
 
+		pending_inventory = erpnext_inventory[MAX_INVENTORY_UPDATE_IN_REQUEST:]
 		erpnext_inventory = erpnext_inventory[:MAX_INVENTORY_UPDATE_IN_REQUEST]
 
 		# TODO: consider reserved qty on both platforms.
@@ -79,10 +107,21 @@ def update_inventory_on_unicommerce(client=None, force=False):
 				# Any one warehouse sync failure should be considered failure
 				success_map[ecom_item] = success_map[ecom_item] and status
 
+			failed_skus = {sku for sku, status in response.items() if not status}
+		else:
+			failed_skus = set(inventory_map)
+
+		pending_inventory += [d for d in erpnext_inventory if d.integration_item_code in failed_skus]
+		for d in pending_inventory:
+			pending_changes.append((d.item_code, warehouse))
+			# sync status is per item, it's not advanced until all its warehouses are synced.
+			success_map[d.ecom_item] = False
+
 	_update_inventory_sync_status(success_map, inventory_synced_on)
+	log_inventory_changes(pending_changes)
+	set_inventory_change_cursor(MODULE_NAME, cursor)
 
 
 def _update_inventory_sync_status(ecom_item_success_map: Dict[str, bool], timestamp: str) -> None:
-	for ecom_item, status in ecom_item_success_map.items():
-		if status:
-			update_inventory_sync_status(ecom_item, timestamp)
+	synced_items = [ecom_item for ecom_item, status in ecom_item_success_map.items() if status]
+	update_inventory_sync_status_bulk(synced_items, timestamp)
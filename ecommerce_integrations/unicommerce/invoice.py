@@ -4,12 +4,12 @@ from collections import defaultdict
 from typing import Any, Dict, List, NewType, Optional
 
 import frappe
-import requests
 from erpnext.selling.doctype.sales_order.sales_order import make_sales_invoice
 from frappe import _
 from frappe.utils import cint, flt, nowdate
 from frappe.utils.file_manager import save_file
 
+from ecommerce_integrations.controllers.setting import get_cached_setting
 from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_item import ecommerce_item
 from ecommerce_integrations.unicommerce.api_client import UnicommerceAPIClient
 from ecommerce_integrations.unicommerce.constants import (
@@ -33,6 +33,8 @@ from ecommerce_integrations.unicommerce.utils import (
 	get_unicommerce_date,
 	remove_non_alphanumeric_chars,
 )
+from ecommerce_integrations.utils import http_client
+from ecommerce_integrations.utils.instrumentation import instrument_job
 
 JsonDict = Dict[str, Any]
 SOCode = NewType("SOCode", str)
@@ -125,6 +127,7 @@ def generate_unicommerce_invoices(
 		)
 
 
+@instrument_job(module_def=MODULE_NAME)
 def bulk_generate_invoices(
 	sales_orders: List[SOCode],
 	warehouse_allocation: Optional[WHAllocation] = None,
@@ -342,7 +345,7 @@ def create_sales_invoice(
 		create_unicommerce_log(status="Invalid", message="Sales Invoice already exists, skipped")
 		return si
 
-	settings = frappe.get_cached_doc(SETTINGS_DOCTYPE)
+	settings = get_cached_setting(SETTINGS_DOCTYPE)
 	channel_config = frappe.get_cached_doc("Unicommerce Channel", channel)
 
 	uni_line_items = si_data["invoiceItems"]
@@ -551,7 +554,7 @@ def fetch_label_pdf(package, invoicing_response, client, facility_code):
 
 def fetch_pdf_as_base64(link):
 	try:
-		response = requests.get(link)
+		response = http_client.get(link)
 		response.raise_for_status()
 
 		return base64.b64encode(response.content)
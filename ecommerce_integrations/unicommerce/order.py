@@ -5,7 +5,8 @@ from typing import Any, Dict, Iterator, List, NewType, Optional, Set, Tuple
 import frappe
 from frappe.utils import add_to_date, flt
 
-from ecommerce_integrations.controllers.scheduling import need_to_run
+from ecommerce_integrations.controllers.scheduling import check_lease, need_to_run, release_lease
+from ecommerce_integrations.controllers.setting import get_cached_setting
 from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_item import ecommerce_item
 from ecommerce_integrations.unicommerce.api_client import UnicommerceAPIClient
 from ecommerce_integrations.unicommerce.constants import (
@@ -26,14 +27,16 @@ from ecommerce_integrations.unicommerce.constants import (
 from ecommerce_integrations.unicommerce.customer import sync_customer
 from ecommerce_integrations.unicommerce.product import import_product_from_unicommerce
 from ecommerce_integrations.unicommerce.utils import create_unicommerce_log, get_unicommerce_date
+from ecommerce_integrations.utils.instrumentation import instrument_job
 from ecommerce_integrations.utils.taxation import get_dummy_tax_category
 
 UnicommerceOrder = NewType("UnicommerceOrder", Dict[str, Any])
 
 
+@instrument_job(module_def=MODULE_NAME)
 def sync_new_orders(client: UnicommerceAPIClient = None, force=False):
 	"""This is called from a scheduled job and syncs all new orders from last synced time."""
-	settings = frappe.get_cached_doc(SETTINGS_DOCTYPE)
+	settings = get_cached_setting(SETTINGS_DOCTYPE)
 
 	if not settings.is_enabled():
 		return
@@ -43,21 +46,25 @@ def sync_new_orders(client: UnicommerceAPIClient = None, force=False):
 	if not force and not need_to_run(SETTINGS_DOCTYPE, "order_sync_frequency", "last_order_sync"):
 		return
 
-	if client is None:
-		client = UnicommerceAPIClient()
+	try:
+		if client is None:
+			client = UnicommerceAPIClient()
 
-	status = "COMPLETE" if settings.only_sync_completed_orders else None
+		status = "COMPLETE" if settings.only_sync_completed_orders else None
 
-	new_orders = _get_new_orders(client, status=status)
+		new_orders = _get_new_orders(client, status=status)
 
-	if new_orders is None:
-		return
+		if new_orders is None:
+			return
 
-	for order in new_orders:
-		sales_order = create_order(order, client=client)
+		for order in new_orders:
+			check_lease(SETTINGS_DOCTYPE, "last_order_sync")
+			sales_order = create_order(order, client=client)
 
-		if settings.only_sync_completed_orders:
-			_create_sales_invoices(order, sales_order, client)
+			if settings.only_sync_completed_orders:
+				_create_sales_invoices(order, sales_order, client)
+	finally:
+		release_lease(SETTINGS_DOCTYPE, "last_order_sync")
 
 
 def _get_new_orders(
@@ -158,10 +165,9 @@ def _sync_order_items(order: UnicommerceOrder, client: UnicommerceAPIClient) ->
 
 	items = {so_item["itemSku"] for so_item in order["saleOrderItems"]}
 
-	for item in items:
-		if ecommerce_item.is_synced(integration=MODULE_NAME, integration_item_code=item):
-			continue
-		else:
+	synced_items = ecommerce_item.is_synced_bulk(MODULE_NAME, [(item, None, None) for item in items])
+	for (item, _, _), synced in synced_items.items():
+		if not synced:
 			import_product_from_unicommerce(sku=item, client=client)
 	return items
 
@@ -169,7 +175,7 @@ def _sync_order_items(order: UnicommerceOrder, client: UnicommerceAPIClient) ->
 def _create_order(order: UnicommerceOrder, customer) -> None:
 
 	channel_config = frappe.get_doc("Unicommerce Channel", order["channel"])
-	settings = frappe.get_cached_doc(SETTINGS_DOCTYPE)
+	settings = get_cached_setting(SETTINGS_DOCTYPE)
 
 	is_cancelled = order["status"] == "CANCELLED"
 
@@ -215,7 +221,7 @@ def _get_line_items(
 	line_items, default_warehouse: Optional[str] = None, is_cancelled: bool = False
 ) -> List[Dict[str, Any]]:
 
-	settings = frappe.get_cached_doc(SETTINGS_DOCTYPE)
+	settings = get_cached_setting(SETTINGS_DOCTYPE)
 	wh_map = settings.get_integration_to_erpnext_wh_mapping(all_wh=True)
 	so_items = []
 
@@ -6,6 +6,7 @@ from frappe.utils import get_url, now
 from frappe.utils.nestedset import get_root_of
 from stdnum.ean import is_valid as validate_barcode
 
+from ecommerce_integrations.controllers.setting import get_cached_setting
 from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_item import ecommerce_item
 from ecommerce_integrations.unicommerce.api_client import JsonDict, UnicommerceAPIClient
 from ecommerce_integrations.unicommerce.constants import (
@@ -21,6 +22,7 @@ from ecommerce_integrations.unicommerce.constants import (
 	UNICOMMERCE_SKU_PATTERN,
 )
 from ecommerce_integrations.unicommerce.utils import create_unicommerce_log
+from ecommerce_integrations.utils.instrumentation import instrument_job
 
 ItemCode = NewType("ItemCode", str)
 
@@ -187,13 +189,14 @@ def _get_item_group(category_code):
 	return get_root_of("Item Group")
 
 
+@instrument_job(module_def=MODULE_NAME)
 def upload_new_items(force=False) -> None:
 	"""Upload new items to Unicommerce on hourly basis.
 
 	All the items that have "sync_with_unicommerce" checked but do not have
 	corresponding Ecommerce Item, are pushed to Unicommerce."""
 
-	settings = frappe.get_cached_doc(SETTINGS_DOCTYPE)
+	settings = get_cached_setting(SETTINGS_DOCTYPE)
 
 	if not (settings.is_enabled() and settings.upload_item_to_unicommerce):
 		return
@@ -317,7 +320,7 @@ def validate_item(doc, method=None):
 	ref: http://support.unicommerce.com/index.php/knowledge-base/q-what-is-an-item-master-how-do-we-add-update-an-item-master/"""
 
 	item = doc
-	settings = frappe.get_cached_doc(SETTINGS_DOCTYPE)
+	settings = get_cached_setting(SETTINGS_DOCTYPE)
 
 	if not settings.is_enabled() or not item.sync_with_unicommerce:
 		return
@@ -1,5 +1,6 @@
 import frappe
 
+from ecommerce_integrations.controllers.setting import get_cached_setting
 from ecommerce_integrations.unicommerce.api_client import UnicommerceAPIClient
 from ecommerce_integrations.unicommerce.cancellation_and_returns import (
 	check_and_update_customer_initiated_returns,
@@ -48,7 +49,7 @@ SHIPMENT_FINAL_STATES = ["DELIVERED", "RETURNED"]
 
 def update_sales_order_status():
 
-	settings = frappe.get_cached_doc(SETTINGS_DOCTYPE)
+	settings = get_cached_setting(SETTINGS_DOCTYPE)
 	if not settings.is_enabled():
 		return
 
@@ -110,7 +111,7 @@ def ignore_pick_list_on_sales_order_cancel(doc, method=None):
 
 def update_shipping_package_status():
 	"""Periodically update changed shipping package info in ERPNext."""
-	settings = frappe.get_cached_doc(SETTINGS_DOCTYPE)
+	settings = get_cached_setting(SETTINGS_DOCTYPE)
 	if not settings.is_enabled():
 		return
 
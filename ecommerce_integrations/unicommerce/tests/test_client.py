@@ -109,7 +109,9 @@ class TestUnicommerceClient(TestCaseApiClient):
 		self.assertIsNone(item_data)
 
 		log = frappe.get_last_doc("Ecommerce Integration Log", filters={"integration": "unicommerce"})
-		self.assertTrue("MISSING" in log.response_data, "Logging for missing item not working")
+		self.assertTrue(
+			"MISSING" in log.get_response_data(), "Logging for missing item not working"
+		)
 
 	def test_get_sales_order(self):
 		order_data = self.client.get_sales_order("SO5841")
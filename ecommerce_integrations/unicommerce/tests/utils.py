@@ -5,6 +5,7 @@ import unittest
 
 import frappe
 
+from ecommerce_integrations.controllers.tests.utils import clear_cached_setting
 from ecommerce_integrations.unicommerce.constants import PRODUCT_CATEGORY_FIELD, SETTINGS_DOCTYPE
 from ecommerce_integrations.unicommerce.doctype.unicommerce_settings.unicommerce_settings import (
 	setup_custom_fields,
@@ -49,6 +50,7 @@ class TestCase(unittest.TestCase):
 		settings.flags.ignore_validate = True  # to prevent hitting the API
 		settings.flags.ignore_mandatory = True
 		settings.save()
+		clear_cached_setting(SETTINGS_DOCTYPE)
 		setup_custom_fields()
 		_setup_test_item_categories()
 		frappe.db.set_value("Stock Settings", None, "allow_negative_stock", 1)
@@ -67,6 +69,7 @@ class TestCase(unittest.TestCase):
 		settings.flags.ignore_validate = True  # to prevent hitting the API
 		settings.flags.ignore_mandatory = True
 		settings.save()
+		clear_cached_setting(SETTINGS_DOCTYPE)
 		frappe.db.set_value("Stock Settings", None, "allow_negative_stock", 0)
 
 	def load_fixture(self, name):
@@ -0,0 +1,256 @@
+"""Latency and payload size metrics of outbound API calls.
+
+Every call is tagged with integration, endpoint template (IDs stripped), status code and bytes
+sent/received. Counters are kept in hourly Redis hashes which expire after retention period, so
+the histograms are always rolling over last few hours.
+
+Requests made using `utils.http_client` are recorded by `record_request` listener, Shopify
+calls made by ShopifyAPI library are recorded by `instrument_shopify_connection`.
+
+site_config.json:
+        "ecommerce_api_metrics_retention_hours": 48
+"""
+
+import functools
+import re
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import frappe
+from frappe.utils import add_to_date, cint, flt, now_datetime
+
+from ecommerce_integrations.shopify.constants import MODULE_NAME as SHOPIFY
+from ecommerce_integrations.unicommerce.constants import MODULE_NAME as UNICOMMERCE
+from ecommerce_integrations.utils.cache import get_counters
+
+METRICS_KEY_PREFIX = "ecommerce_api_metrics"
+DEFAULT_RETENTION_HOURS = 48
+
+# upper bounds of histogram buckets, last bucket is unbounded.
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+SIZE_BUCKETS_BYTES = (1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024)
+
+INTEGRATION_HOSTS = (
+	("myshopify.com", SHOPIFY),
+	("unicommerce.com", UNICOMMERCE),
+	("amazon.com", "Amazon"),
+	("amazonaws.com", "Amazon"),
+	("zenoti.com", "Zenoti"),
+)
+
+_ID_SEGMENT = re.compile(
+	r"^(?:\d+|[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}|(?=.*\d)[\w-]{8,})$",
+	re.IGNORECASE,
+)
+_EXTENSION = re.compile(r"\.(json|xml)$")
+
+
+def record_request(request, response, elapsed: float, exception: Optional[Exception]) -> None:
+	"""`integration_request_listeners` hook for requests made using `utils.http_client`."""
+	record_api_call(
+		method=request.method,
+		url=request.url,
+		status_code=response.status_code if response is not None else None,
+		elapsed=elapsed,
+		request_bytes=_get_length(request.body),
+		response_bytes=_get_response_length(response),
+	)
+
+
+def record_api_call(
+	method: str,
+	url: str,
+	status_code: Optional[int],
+	elapsed: float,
+	request_bytes: int = 0,
+	response_bytes: int = 0,
+	integration: Optional[str] = None,
+) -> None:
+	"""Add an API call to the histograms of its endpoint. Failures are logged and ignored."""
+	try:
+		parsed_url = urlparse(url)
+		integration = integration or get_integration(parsed_url.netloc)
+		endpoint = f"{method.upper()} {get_endpoint_template(parsed_url.path)}"
+		prefix = f"{integration}|{endpoint}|"
+
+		elapsed_ms = elapsed * 1000
+		is_error = status_code is None or status_code >= 400
+
+		cache = frappe.cache()
+		key = cache.make_key(_get_metrics_key(now_datetime()))
+		pipeline = cache.pipeline(transaction=False)
+		pipeline.hincrby(key, prefix + "count", 1)
+		pipeline.hincrby(key, prefix + f"status:{status_code or 'failed'}", 1)
+		pipeline.hincrby(key, prefix + f"latency:{_get_bucket(elapsed_ms, LATENCY_BUCKETS_MS)}", 1)
+		pipeline.hincrby(key, prefix + f"size:{_get_bucket(response_bytes, SIZE_BUCKETS_BYTES)}", 1)
+		pipeline.hincrby(key, prefix + "latency_ms", int(elapsed_ms))
+		pipeline.hincrby(key, prefix + "bytes_in", response_bytes)
+		pipeline.hincrby(key, prefix + "bytes_out", request_bytes)
+		if is_error:
+			pipeline.hincrby(key, prefix + "errors", 1)
+		pipeline.expire(key, _get_retention_hours() * 60 * 60)
+		pipeline.execute()
+	except Exception:
+		frappe.logger("ecommerce_integrations").exception("Failed to record API metrics")
+
+
+@frappe.whitelist()
+def get_api_metrics(hours: int = 24, integration: Optional[str] = None) -> List[Dict]:
+	"""Get per-endpoint call metrics for last `hours`, slowest endpoints (by total time) first."""
+	frappe.only_for("System Manager")
+
+	hours = min(cint(hours) or 1, _get_retention_hours())
+	counters: Dict[Tuple[str, str], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+	current_hour = now_datetime()
+	for hour in range(hours):
+		key = _get_metrics_key(add_to_date(current_hour, hours=-hour))
+		for field, value in get_counters(key).items():
+			endpoint_integration, endpoint, metric = field.split("|", 2)
+			if integration and endpoint_integration != integration:
+				continue
+			counters[(endpoint_integration, endpoint)][metric] += value
+
+	metrics = [
+		_summarize(endpoint_integration, endpoint, endpoint_counters)
+		for (endpoint_integration, endpoint), endpoint_counters in counters.items()
+	]
+	return sorted(metrics, key=lambda m: m["total_time_ms"], reverse=True)
+
+
+def instrument_shopify_connection() -> None:
+	"""Record calls made by ShopifyAPI library, it doesn't use `requests`."""
+	from shopify.base import ShopifyConnection
+
+	if getattr(ShopifyConnection, "_records_api_metrics", False):
+		return
+
+	original_open = ShopifyConnection._open
+
+	@functools.wraps(original_open)
+	def _open(self, method, path, headers=None, data=None):
+		start = time.monotonic()
+		response = None
+		try:
+			response = original_open(self, method, path, headers=headers, data=data)
+			return response
+		except Exception as e:
+			response = getattr(e, "response", None)
+			raise
+		finally:
+			record_api_call(
+				method=method,
+				url=path,
+				status_code=getattr(response, "code", None),
+				elapsed=time.monotonic() - start,
+				request_bytes=_get_length(data),
+				response_bytes=_get_length(getattr(response, "body", None)),
+				integration=SHOPIFY,
+			)
+
+	ShopifyConnection._open = _open
+	ShopifyConnection._records_api_metrics = True
+
+
+def get_integration(host: str) -> str:
+	host = host.split(":")[0].lower()
+	for suffix, integration in INTEGRATION_HOSTS:
+		if host == suffix or host.endswith("." + suffix):
+			return integration
+	return host
+
+
+def get_endpoint_template(path: str) -> str:
+	"""Replace IDs in URL path with placeholder.
+
+	e.g. /admin/api/2021-04/orders/4213452.json -> /admin/api/2021-04/orders/{id}.json"""
+	segments = []
+	for segment in path.split("/"):
+		extension = _EXTENSION.search(segment)
+		name = segment[: extension.start()] if extension else segment
+		if name and _ID_SEGMENT.match(name):
+			segment = "{id}" + (extension.group(0) if extension else "")
+		segments.append(segment)
+	return "/".join(segments) or "/"
+
+
+def _summarize(integration: str, endpoint: str, counters: Dict[str, int]) -> Dict:
+	count = counters.get("count", 0)
+	latency_histogram = _get_histogram(counters, "latency", LATENCY_BUCKETS_MS)
+
+	return {
+		"integration": integration,
+		"endpoint": endpoint,
+		"count": count,
+		"errors": counters.get("errors", 0),
+		"total_time_ms": counters.get("latency_ms", 0),
+		"avg_latency_ms": flt(counters.get("latency_ms", 0) / count, 2) if count else 0,
+		"p50_latency_ms": _get_percentile(latency_histogram, count, 0.5),
+		"p95_latency_ms": _get_percentile(latency_histogram, count, 0.95),
+		"bytes_in": counters.get("bytes_in", 0),
+		"bytes_out": counters.get("bytes_out", 0),
+		"status_codes": {
+			metric.split(":", 1)[1]: value
+			for metric, value in counters.items()
+			if metric.startswith("status:")
+		},
+		"latency_histogram_ms": latency_histogram,
+		"size_histogram_bytes": _get_histogram(counters, "size", SIZE_BUCKETS_BYTES),
+	}
+
+
+def _get_histogram(counters: Dict[str, int], metric: str, buckets) -> Dict[str, int]:
+	return {
+		str(bucket): counters.get(f"{metric}:{bucket}", 0) for bucket in (*buckets, "inf")
+	}
+
+
+def _get_percentile(histogram: Dict[str, int], count: int, percentile: float):
+	"""Estimate percentile as upper bound of the bucket containing it."""
+	if not count:
+		return 0
+
+	seen = 0
+	for bucket, bucket_count in histogram.items():
+		seen += bucket_count
+		if seen >= count * percentile:
+			return bucket
+	return "inf"
+
+
+def _get_bucket(value: float, buckets) -> str:
+	for bucket in buckets:
+		if value <= bucket:
+			return str(bucket)
+	return "inf"
+
+
+def _get_metrics_key(time) -> str:
+	return f"{METRICS_KEY_PREFIX}:{time.strftime('%Y%m%d%H')}"
+
+
+def _get_retention_hours() -> int:
+	return cint(frappe.conf.get("ecommerce_api_metrics_retention_hours")) or DEFAULT_RETENTION_HOURS
+
+
+def _get_length(body) -> int:
+	if not body:
+		return 0
+	if isinstance(body, str):
+		return len(body.encode())
+	if isinstance(body, (bytes, bytearray)):
+		return len(body)
+	return 0
+
+
+def _get_response_length(response) -> int:
+	"""Size of response body as received, i.e. compressed size if response is compressed."""
+	if response is None:
+		return 0
+	if response.headers.get("Content-Length"):
+		return cint(response.headers["Content-Length"])
+	if getattr(response, "is_stream", False):
+		return 0
+	return len(response.content or b"")
@@ -0,0 +1,17 @@
+"""Helpers for plain (unpickled) values in Redis cache.
+
+RedisWrapper pickles values of hashes, counters incremented using `hincrby` need to be read
+directly from Redis instead."""
+
+from typing import Dict
+
+import frappe
+from frappe.utils import cint
+from redis import Redis
+
+
+def get_counters(key: str) -> Dict[str, int]:
+	"""Get all counters of a Redis hash, `key` is prefixed same as other RedisWrapper keys."""
+	cache = frappe.cache()
+	counters = Redis.hgetall(cache, cache.make_key(key))
+	return {frappe.safe_decode(field): cint(count) for field, count in counters.items()}
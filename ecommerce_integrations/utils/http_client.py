@@ -0,0 +1,138 @@
+"""Shared HTTP transport for integration API clients.
+
+- Keep-alive connection pool per host, so repeated calls don't pay for TCP + TLS handshake.
+- Default timeouts and retries with exponential backoff, Retry-After header is honoured.
+- Compressed responses (requests sends `Accept-Encoding: gzip, deflate` by default).
+- Single instrumentation hook: functions listed in `integration_request_listeners` hook
+  are called after every request.
+
+site_config.json:
+        "integration_http_pool_size": 10,
+        "integration_http_timeout": 60,
+        "integration_http_retries": 3
+"""
+
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import frappe
+import requests
+from frappe.utils import cint
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 10  # seconds
+DEFAULT_READ_TIMEOUT = 60  # seconds
+DEFAULT_RETRIES = 3
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_sessions: Dict[Tuple[str, str], requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+class IntegrationRetry(Retry):
+	"""Retry idempotent requests on transient errors.
+
+	Non-idempotent requests (e.g. POST) are only retried when rate limited (HTTP 429),
+	since the server didn't process the request."""
+
+	def is_retry(self, method, status_code, has_retry_after=False):
+		if status_code == 429:
+			return True
+		return super().is_retry(method, status_code, has_retry_after)
+
+
+class IntegrationHTTPAdapter(HTTPAdapter):
+	def send(self, request, **kwargs):
+		if kwargs.get("timeout") is None:
+			kwargs["timeout"] = _get_timeout()
+
+		start = time.monotonic()
+		try:
+			response = super().send(request, **kwargs)
+		except Exception as e:
+			_notify_listeners(request, None, time.monotonic() - start, e)
+			raise
+
+		# body of streamed response is read by the caller, listeners shouldn't read it.
+		response.is_stream = bool(kwargs.get("stream"))
+		_notify_listeners(request, response, time.monotonic() - start, None)
+		return response
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+	"""Drop-in replacement for `requests.request` using pooled session of URL's host."""
+	return get_session(url).request(method=method, url=url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+	return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+	return request("POST", url, **kwargs)
+
+
+def get_session(url: str) -> requests.Session:
+	"""Get session with connection pool for host of the URL."""
+	parsed_url = urlparse(url)
+	key = (parsed_url.scheme, parsed_url.netloc)
+
+	session = _sessions.get(key)
+	if session is None:
+		with _sessions_lock:
+			session = _sessions.get(key) or _make_session()
+			_sessions[key] = session
+
+	return session
+
+
+def _make_session() -> requests.Session:
+	pool_size = cint(frappe.conf.get("integration_http_pool_size")) or DEFAULT_POOL_SIZE
+	retries = frappe.conf.get("integration_http_retries")
+
+	adapter = IntegrationHTTPAdapter(
+		pool_connections=1,
+		pool_maxsize=pool_size,
+		max_retries=IntegrationRetry(
+			total=DEFAULT_RETRIES if retries is None else cint(retries),
+			backoff_factor=0.5,
+			status_forcelist=RETRY_STATUS_CODES,
+			respect_retry_after_header=True,
+			raise_on_status=False,
+		),
+	)
+
+	session = requests.Session()
+	session.mount("https://", adapter)
+	session.mount("http://", adapter)
+
+	# sessions are shared by all clients of a host, credentials must not leak via cookies.
+	session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+	return session
+
+
+def _get_timeout() -> Tuple[int, int]:
+	read_timeout = cint(frappe.conf.get("integration_http_timeout")) or DEFAULT_READ_TIMEOUT
+	return DEFAULT_CONNECT_TIMEOUT, read_timeout
+
+
+def _notify_listeners(
+	request: requests.PreparedRequest,
+	response: Optional[requests.Response],
+	elapsed: float,
+	exception: Optional[Exception],
+) -> None:
+	"""Call instrumentation hooks, listeners should never break the request."""
+	for listener in frappe.get_hooks("integration_request_listeners"):
+		try:
+			frappe.get_attr(listener)(
+				request=request, response=response, elapsed=elapsed, exception=exception
+			)
+		except Exception:
+			frappe.log_error(title=f"Integration request listener failed: {listener}")
@@ -0,0 +1,363 @@
+"""Opt-in query instrumentation and profiling for integration jobs and webhook handlers.
+
+Counts SQL queries executed by a job grouped by their normalized shape and attaches a summary to
+Ecommerce Integration Log of the job. Query shapes repeated more often than the threshold are
+flagged, these are usually N+1 patterns that should be replaced with a bulk query.
+
+When profiling is enabled, System Manager can request profiling of next N runs of a job or of all
+jobs of an integration using `request_profile`. cProfile output of those runs is attached to the
+log as private files. Both are no-op unless enabled in site config.
+
+site_config.json:
+        "ecommerce_integrations_instrumentation": 1,
+        "ecommerce_integrations_repeated_query_threshold": 20,
+        "ecommerce_integrations_profiling": 1
+"""
+
+import cProfile
+import functools
+import io
+import json
+import marshal
+import pstats
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+from frappe.utils.file_manager import save_file
+from redis import Redis
+
+from ecommerce_integrations.utils.cache import get_counters
+
+LOG_DOCTYPE = "Ecommerce Integration Log"
+
+DEFAULT_REPEATED_QUERY_THRESHOLD = 20
+TOP_SHAPES_IN_SUMMARY = 10
+
+# Redis hash of job method or integration -> number of runs to profile
+PROFILE_REQUESTS_KEY = "ecommerce_profile_requests"
+TOP_FUNCTIONS_IN_PROFILE = 50
+
+_CLAIM_PROFILE_RUN_SCRIPT = """
+for _, target in ipairs(ARGV) do
+	if tonumber(redis.call("hget", KEYS[1], target) or "0") > 0 then
+		redis.call("hincrby", KEYS[1], target, -1)
+		return target
+	end
+end
+return false
+"""
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bin\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def is_enabled() -> bool:
+	return bool(cint(frappe.conf.get("ecommerce_integrations_instrumentation")))
+
+
+def is_profiling_enabled() -> bool:
+	return bool(cint(frappe.conf.get("ecommerce_integrations_profiling")))
+
+
+def instrument_job(module_def: Optional[str] = None):
+	"""Decorator for background jobs and webhook handlers to count queries executed by them.
+
+	Summary is attached to the log of current request (`frappe.flags.request_id`) or last log
+	created in the job. If the job didn't create any log and has repeated query shapes, a new log
+	is created for `module_def`."""
+
+	def decorator(fn):
+		method = f"{fn.__module__}.{fn.__qualname__}"
+
+		@functools.wraps(fn)
+		def wrapper(*args, **kwargs):
+			profiler = _start_profiler(module_def, method) if is_profiling_enabled() else None
+			if not profiler:
+				return _run_with_query_stats(fn, module_def, method, *args, **kwargs)
+
+			try:
+				result = _run_with_query_stats(fn, module_def, method, *args, **kwargs)
+			except Exception:
+				_save_profile(profiler, module_def, method, job_failed=True)
+				raise
+
+			_save_profile(profiler, module_def, method)
+			return result
+
+		wrapper.instrumented = True
+		return wrapper
+
+	return decorator
+
+
+def _run_with_query_stats(fn, module_def, method, *args, **kwargs):
+	if not is_enabled() or frappe.flags.query_stats is not None:
+		return fn(*args, **kwargs)
+
+	stats = QueryStats()
+	frappe.flags.query_stats = stats
+	frappe.flags.last_integration_log = None
+	try:
+		with count_queries(stats):
+			result = fn(*args, **kwargs)
+	except Exception:
+		frappe.flags.query_stats = None
+		_attach_summary(stats.get_summary(), module_def, method, job_failed=True)
+		raise
+
+	frappe.flags.query_stats = None
+	_attach_summary(stats.get_summary(), module_def, method)
+	return result
+
+
+@frappe.whitelist()
+def request_profile(target: str, runs: int = 1) -> None:
+	"""Profile next `runs` executions of a job.
+
+	target: integration (Module Def) or full path of a method decorated with `instrument_job`,
+	        e.g. values of `EVENT_MAPPER` and `SYNC_METHODS`. Zero runs cancels the request."""
+	frappe.only_for("System Manager")
+
+	if not is_profiling_enabled():
+		frappe.throw(_("Profiling is not enabled in site config."))
+
+	if not (frappe.db.exists("Module Def", target) or _is_instrumented_method(target)):
+		frappe.throw(_("{0} is not an integration or an instrumented job.").format(target))
+
+	cache = frappe.cache()
+	key = cache.make_key(PROFILE_REQUESTS_KEY)
+	# RedisWrapper.hset pickles values, counters need to be plain integers.
+	if cint(runs) > 0:
+		Redis.hset(cache, key, target, cint(runs))
+	else:
+		Redis.hdel(cache, key, target)
+
+
+@frappe.whitelist()
+def get_profile_requests() -> Dict[str, int]:
+	"""Get remaining number of runs to profile by job method or integration."""
+	frappe.only_for("System Manager")
+
+	return get_counters(PROFILE_REQUESTS_KEY)
+
+
+@contextmanager
+def count_queries(stats: Optional["QueryStats"] = None):
+	"""Count queries executed in the block, yields `QueryStats`."""
+	stats = stats or QueryStats()
+	patch = _patch_sql(stats)
+	try:
+		yield stats
+	finally:
+		_restore_sql(patch)
+
+
+class QueryStats:
+	def __init__(self):
+		self.count_by_shape: Dict[str, int] = defaultdict(int)
+		self.time_by_shape: Dict[str, float] = defaultdict(float)
+
+	def record(self, query: str, duration: float) -> None:
+		shape = normalize_query(query)
+		self.count_by_shape[shape] += 1
+		self.time_by_shape[shape] += duration
+
+	def get_summary(self) -> Dict:
+		threshold = (
+			cint(frappe.conf.get("ecommerce_integrations_repeated_query_threshold"))
+			or DEFAULT_REPEATED_QUERY_THRESHOLD
+		)
+		shapes = sorted(self.count_by_shape, key=self.count_by_shape.get, reverse=True)
+
+		def shape_stats(shape):
+			return {
+				"query": shape,
+				"count": self.count_by_shape[shape],
+				"db_time_ms": flt(self.time_by_shape[shape] * 1000, 2),
+			}
+
+		return {
+			"query_count": sum(self.count_by_shape.values()),
+			"db_time_ms": flt(sum(self.time_by_shape.values()) * 1000, 2),
+			"repeated_query_threshold": threshold,
+			"repeated_queries": [
+				shape_stats(shape) for shape in shapes if self.count_by_shape[shape] > threshold
+			],
+			"top_queries": [shape_stats(shape) for shape in shapes[:TOP_SHAPES_IN_SUMMARY]],
+		}
+
+
+def normalize_query(query) -> str:
+	"""Reduce query to its shape by removing literal values."""
+	query = str(query)
+	query = _STRING_LITERAL.sub("?", query)
+	query = _PLACEHOLDER.sub("?", query)
+	query = _NUMBER.sub("?", query)
+	query = _IN_LIST.sub("in (...)", query)
+	return _WHITESPACE.sub(" ", query).strip()
+
+
+def _patch_sql(stats: QueryStats):
+	db = frappe.db
+	original_sql = db.sql
+	patched_sql = db.__dict__.get("sql")
+
+	@functools.wraps(original_sql)
+	def sql(query, *args, **kwargs):
+		start = time.perf_counter()
+		try:
+			return original_sql(query, *args, **kwargs)
+		finally:
+			stats.record(query, time.perf_counter() - start)
+
+	# instance attribute shadows `Database.sql`, so all helpers like get_value are counted too.
+	db.sql = sql
+	return db, patched_sql
+
+
+def _restore_sql(patch) -> None:
+	db, patched_sql = patch
+	if patched_sql is None:
+		db.__dict__.pop("sql", None)
+	else:
+		db.sql = patched_sql
+
+
+def _attach_summary(
+	summary: Dict, module_def: Optional[str], method: str, job_failed: bool = False
+) -> None:
+	"""Write summary in the job's transaction, which is committed by the job runner.
+
+	Partial writes of a failed job are rolled back first, only the summary is committed."""
+	serialized_summary = json.dumps(summary, indent=1)
+
+	try:
+		if job_failed:
+			frappe.db.rollback()
+
+		log_name = _get_job_log()
+		if log_name:
+			frappe.db.set_value(
+				LOG_DOCTYPE, log_name, "performance_summary", serialized_summary, update_modified=False
+			)
+		elif summary["repeated_queries"]:
+			_create_summary_log(module_def, method, summary, serialized_summary)
+		else:
+			return
+
+		if job_failed:
+			frappe.db.commit()
+	except Exception:
+		# instrumentation should never break the job
+		frappe.log_error(title="Failed to attach performance summary")
+
+
+def _create_summary_log(module_def, method, summary, serialized_summary) -> None:
+	log_name = _create_job_log(
+		module_def, method, _get_repeated_queries_message(summary["repeated_queries"])
+	)
+	frappe.db.set_value(
+		LOG_DOCTYPE, log_name, "performance_summary", serialized_summary, update_modified=False
+	)
+
+
+def _get_repeated_queries_message(repeated_queries: List[Dict]) -> str:
+	return "Repeated queries detected: " + ", ".join(
+		f"{q['count']}x {q['query'][:60]}" for q in repeated_queries[:3]
+	)
+
+
+def _get_job_log() -> Optional[str]:
+	"""Log of current request or last log created by the job."""
+	log_name = frappe.flags.request_id or frappe.flags.last_integration_log
+	if log_name and frappe.db.exists(LOG_DOCTYPE, log_name):
+		return log_name
+
+
+def _create_job_log(module_def: Optional[str], method: str, message: str) -> str:
+	from ecommerce_integrations.ecommerce_integrations.doctype.ecommerce_integration_log.ecommerce_integration_log import (
+		create_log,
+	)
+
+	log = create_log(
+		module_def=module_def, status="Success", method=method, message=message, make_new=True,
+	)
+	return log.name
+
+
+def _is_instrumented_method(method: str) -> bool:
+	if not method.startswith("ecommerce_integrations."):
+		return False
+
+	try:
+		return bool(getattr(frappe.get_attr(method), "instrumented", False))
+	except Exception:
+		return False
+
+
+def _start_profiler(module_def: Optional[str], method: str) -> Optional[cProfile.Profile]:
+	# nested jobs are part of outer profile
+	if frappe.flags.job_profiler or not _claim_profile_run(module_def, method):
+		return None
+
+	profiler = cProfile.Profile()
+	frappe.flags.job_profiler = profiler
+	frappe.flags.last_integration_log = None
+	profiler.enable()
+	return profiler
+
+
+def _claim_profile_run(module_def: Optional[str], method: str) -> bool:
+	targets = [method] + ([module_def] if module_def else [])
+	try:
+		cache = frappe.cache()
+		return bool(
+			cache.eval(
+				_CLAIM_PROFILE_RUN_SCRIPT, 1, cache.make_key(PROFILE_REQUESTS_KEY), *targets
+			)
+		)
+	except Exception:
+		frappe.log_error(title="Failed to check profile requests")
+		return False
+
+
+def _save_profile(
+	profiler: cProfile.Profile, module_def: Optional[str], method: str, job_failed: bool = False
+) -> None:
+	"""Attach profile to job's log, same transaction handling as `_attach_summary`."""
+	profiler.disable()
+	frappe.flags.job_profiler = None
+
+	try:
+		if job_failed:
+			frappe.db.rollback()
+
+		log_name = _get_job_log() or _create_job_log(module_def, method, "Profile captured")
+		file_name = f"profile-{method.rsplit('.', 1)[-1]}-{log_name}"
+
+		# same format as `cProfile.Profile.dump_stats`, can be loaded using `pstats.Stats(file)`
+		profiler.create_stats()
+		save_file(
+			f"{file_name}.prof", marshal.dumps(profiler.stats), LOG_DOCTYPE, log_name, is_private=1
+		)
+
+		summary = io.StringIO()
+		pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(
+			TOP_FUNCTIONS_IN_PROFILE
+		)
+		save_file(f"{file_name}.txt", summary.getvalue(), LOG_DOCTYPE, log_name, is_private=1)
+
+		if job_failed:
+			frappe.db.commit()
+	except Exception:
+		# profiling should never break the job
+		frappe.log_error(title="Failed to save profile")
@@ -0,0 +1,54 @@
+import unittest
+
+import frappe
+import responses
+
+from ecommerce_integrations.utils import api_metrics, http_client
+
+
+class TestAPIMetrics(unittest.TestCase):
+	def test_endpoint_template(self):
+		self.assertEqual(
+			api_metrics.get_endpoint_template("/admin/api/2021-04/orders/4213452.json"),
+			"/admin/api/2021-04/orders/{id}.json",
+		)
+		self.assertEqual(
+			api_metrics.get_endpoint_template("/orders/v0/orders/171-1234567-1234567/orderItems"),
+			"/orders/v0/orders/{id}/orderItems",
+		)
+		self.assertEqual(
+			api_metrics.get_endpoint_template("/services/rest/v1/oms/saleorder/get"),
+			"/services/rest/v1/oms/saleorder/get",
+		)
+
+	def test_integration(self):
+		self.assertEqual(api_metrics.get_integration("demostore.unicommerce.com"), "unicommerce")
+		self.assertEqual(api_metrics.get_integration("test.myshopify.com:443"), "shopify")
+		self.assertEqual(api_metrics.get_integration("example.com"), "example.com")
+
+	@responses.activate
+	def test_record_request(self):
+		url = "https://metrics-test.unicommerce.com/services/rest/v1/oms/saleorder/get"
+		responses.add(responses.POST, url, json={"successful": True}, status=200)
+		responses.add(responses.POST, url, json={"successful": False}, status=400)
+
+		def get_endpoint_metrics():
+			for metrics in api_metrics.get_api_metrics(hours=1, integration="unicommerce"):
+				if metrics["endpoint"] == "POST /services/rest/v1/oms/saleorder/get":
+					return metrics
+			return {"count": 0, "errors": 0, "bytes_out": 0}
+
+		before = get_endpoint_metrics()
+		http_client.post(url, json={"saleOrderCode": "SO-1"})
+		http_client.post(url, json={"saleOrderCode": "SO-2"})
+		after = get_endpoint_metrics()
+
+		self.assertEqual(after["count"] - before["count"], 2)
+		self.assertEqual(after["errors"] - before["errors"], 1)
+		self.assertGreater(after["bytes_out"], before["bytes_out"])
+		self.assertGreaterEqual(after["status_codes"]["400"], 1)
+
+	def test_only_system_manager(self):
+		frappe.set_user("Guest")
+		self.addCleanup(frappe.set_user, "Administrator")
+		self.assertRaises(frappe.PermissionError, api_metrics.get_api_metrics)
@@ -0,0 +1,22 @@
+import unittest
+
+import frappe
+
+from ecommerce_integrations.utils.cache import get_counters
+
+TEST_KEY = "ecommerce_test_counters"
+
+
+class TestCache(unittest.TestCase):
+	def setUp(self):
+		frappe.cache().delete_value(TEST_KEY)
+
+	def test_get_counters(self):
+		cache = frappe.cache()
+		cache.hincrby(cache.make_key(TEST_KEY), "created", 2)
+		cache.hincrby(cache.make_key(TEST_KEY), "updated", 1)
+
+		self.assertEqual(get_counters(TEST_KEY), {"created": 2, "updated": 1})
+
+	def test_missing_key(self):
+		self.assertEqual(get_counters(TEST_KEY), {})
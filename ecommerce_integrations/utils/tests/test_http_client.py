@@ -0,0 +1,29 @@
+import unittest
+
+import responses
+
+from ecommerce_integrations.utils import http_client
+
+
+class TestHTTPClient(unittest.TestCase):
+	def test_session_per_host(self):
+		session = http_client.get_session("https://example.com/api/v1/orders")
+		self.assertIs(session, http_client.get_session("https://example.com/api/v1/items?limit=5"))
+		self.assertIsNot(session, http_client.get_session("https://example.org/api/v1/orders"))
+
+	def test_retry_policy(self):
+		retry = http_client.IntegrationRetry(
+			total=3, status_forcelist=http_client.RETRY_STATUS_CODES, respect_retry_after_header=True
+		)
+		self.assertTrue(retry.is_retry("GET", 503))
+		self.assertTrue(retry.is_retry("POST", 429, has_retry_after=True))
+		self.assertFalse(retry.is_retry("POST", 503), "Non-idempotent request retried")
+		self.assertFalse(retry.is_retry("GET", 400))
+
+	@responses.activate
+	def test_request(self):
+		responses.add(responses.GET, "https://example.com/ping", json={"pong": True}, status=200)
+
+		response = http_client.get("https://example.com/ping")
+		self.assertEqual(response.json(), {"pong": True})
+		self.assertEqual(len(responses.calls), 1)
@@ -0,0 +1,118 @@
+import unittest
+
+import frappe
+
+from ecommerce_integrations.utils.instrumentation import (
+	LOG_DOCTYPE,
+	QueryStats,
+	get_profile_requests,
+	instrument_job,
+	normalize_query,
+	request_profile,
+)
+
+
+class TestInstrumentation(unittest.TestCase):
+	def test_normalize_query(self):
+		self.assertEqual(
+			normalize_query("select name from `tabItem`  where item_code = 'ABC' and idx > 10"),
+			"select name from `tabItem` where item_code = ? and idx > ?",
+		)
+		self.assertEqual(
+			normalize_query("select name from `tabItem` where name in (%s, %s, %s)"),
+			normalize_query("select name from `tabItem` where name in ('a')"),
+		)
+
+	def test_repeated_queries(self):
+		stats = QueryStats()
+		for i in range(5):
+			stats.record(f"select name from `tabItem` where name = 'item-{i}'", 0.001)
+		stats.record("select 1", 0.001)
+
+		frappe.conf.ecommerce_integrations_repeated_query_threshold = 3
+		self.addCleanup(frappe.conf.pop, "ecommerce_integrations_repeated_query_threshold")
+
+		summary = stats.get_summary()
+		self.assertEqual(summary["query_count"], 6)
+		self.assertEqual(len(summary["repeated_queries"]), 1)
+		self.assertEqual(summary["repeated_queries"][0]["count"], 5)
+
+	def test_instrument_job(self):
+		frappe.conf.ecommerce_integrations_instrumentation = 1
+		self.addCleanup(frappe.conf.pop, "ecommerce_integrations_instrumentation")
+
+		@instrument_job(module_def="shopify")
+		def job():
+			self.assertIsNotNone(frappe.flags.query_stats)
+			frappe.db.sql("select 1")
+			return frappe.flags.query_stats
+
+		stats = job()
+		self.assertEqual(stats.count_by_shape["select ?"], 1)
+		self.assertNotIn("sql", frappe.db.__dict__, "frappe.db.sql not restored")
+		self.assertIsNone(frappe.flags.query_stats)
+
+	def test_failed_job_not_committed(self):
+		frappe.conf.ecommerce_integrations_instrumentation = 1
+		self.addCleanup(frappe.conf.pop, "ecommerce_integrations_instrumentation")
+
+		@instrument_job(module_def="shopify")
+		def job():
+			frappe.get_doc({"doctype": "ToDo", "description": "_Test Failed Instrumented Job"}).insert()
+			raise frappe.ValidationError("Failed job")
+
+		self.assertRaises(frappe.ValidationError, job)
+
+		frappe.db.rollback()
+		self.assertFalse(frappe.db.exists("ToDo", {"description": "_Test Failed Instrumented Job"}))
+
+	def test_profile_job(self):
+		frappe.conf.ecommerce_integrations_profiling = 1
+		self.addCleanup(frappe.conf.pop, "ecommerce_integrations_profiling")
+
+		@instrument_job(module_def="shopify")
+		def job():
+			return frappe.flags.job_profiler
+
+		request_profile("shopify", runs=1)
+		self.assertIsNotNone(job(), "Job not profiled")
+		self.assertEqual(get_profile_requests().get("shopify"), 0)
+		self.assertIsNone(job(), "Profiled more runs than requested")
+
+		log = frappe.flags.last_integration_log
+		files = frappe.get_all(
+			"File",
+			filters={"attached_to_doctype": LOG_DOCTYPE, "attached_to_name": log, "is_private": 1},
+			pluck="file_name",
+		)
+		self.assertEqual(len(files), 2, msg=str(files))
+
+	def test_profile_failed_job(self):
+		frappe.conf.ecommerce_integrations_profiling = 1
+		self.addCleanup(frappe.conf.pop, "ecommerce_integrations_profiling")
+
+		@instrument_job(module_def="shopify")
+		def job():
+			frappe.get_doc({"doctype": "ToDo", "description": "_Test Failed Profiled Job"}).insert()
+			raise frappe.ValidationError("Failed job")
+
+		request_profile("shopify", runs=1)
+		self.assertRaises(frappe.ValidationError, job)
+		self.assertIsNone(frappe.flags.job_profiler)
+
+		frappe.db.rollback()
+		self.assertFalse(frappe.db.exists("ToDo", {"description": "_Test Failed Profiled Job"}))
+
+	def test_request_profile_validation(self):
+		frappe.conf.ecommerce_integrations_profiling = 1
+		self.addCleanup(frappe.conf.pop, "ecommerce_integrations_profiling")
+
+		self.assertRaises(frappe.ValidationError, request_profile, "frappe.get_doc")
+		request_profile("ecommerce_integrations.shopify.order.sync_sales_order", runs=2)
+		self.assertEqual(
+			get_profile_requests()["ecommerce_integrations.shopify.order.sync_sales_order"], 2
+		)
+		request_profile("ecommerce_integrations.shopify.order.sync_sales_order", runs=0)
+		self.assertNotIn(
+			"ecommerce_integrations.shopify.order.sync_sales_order", get_profile_requests()
+		)
@@ -2,12 +2,13 @@
 # For license information, please see LICENSE
 
 import frappe
-import requests
 from frappe import _
 from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
 from frappe.model.document import Document
 from frappe.utils import add_to_date, cint, date_diff, get_datetime
 
+from ecommerce_integrations.utils import http_client
+from ecommerce_integrations.utils.instrumentation import instrument_job
 from ecommerce_integrations.zenoti.purchase_transactions import process_purchase_orders
 from ecommerce_integrations.zenoti.sales_transactions import process_sales_invoices
 from ecommerce_integrations.zenoti.stock_reconciliation import process_stock_reconciliation
@@ -19,7 +20,7 @@ class ZenotiSettings(Document):
 		url = api_url + "centers"
 		headers = {}
 		headers["Authorization"] = "apikey " + self.api_key
-		response = requests.request("GET", url=url, headers=headers)
+		response = http_client.request("GET", url=url, headers=headers)
 		if response.status_code != 200:
 			frappe.throw("Please verify the API Key")
 		check_for_opening_stock_reconciliation()
@@ -63,6 +64,7 @@ def check_for_opening_stock_reconciliation():
 		)
 
 
+@instrument_job(module_def="Zenoti")
 def sync_invoices(center_id=None, start_date=None, end_date=None):
 	if cint(frappe.db.get_single_value("Zenoti Settings", "enable_zenoti")):
 		if center_id or cint(frappe.db.get_single_value("Zenoti Settings", "enable_auto_syncing")):
@@ -84,6 +86,7 @@ def sync_invoices(center_id=None, start_date=None, end_date=None):
 						make_error_log(error_logs)
 
 
+@instrument_job(module_def="Zenoti")
 def sync_stocks(center=None, date=None):
 	if cint(frappe.db.get_single_value("Zenoti Settings", "enable_zenoti")):
 		if center or cint(frappe.db.get_single_value("Zenoti Settings", "enable_auto_syncing")):
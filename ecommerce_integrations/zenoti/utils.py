@@ -2,11 +2,12 @@ import json
 import math
 
 import frappe
-import requests
 from erpnext.controllers.accounts_controller import add_taxes_from_tax_template
 from frappe import _
 from frappe.utils import cint, flt
 
+from ecommerce_integrations.utils import http_client
+
 api_url = "https://api.zenoti.com/v1/"
 
 item_type = {
@@ -20,7 +21,7 @@ item_type = {
 
 def make_api_call(url):
 	headers = get_headers()
-	response = requests.request("GET", url=url, headers=headers)
+	response = http_client.request("GET", url=url, headers=headers)
 	res_headers = dict(response.headers)
 	if res_headers.get("RateLimit-Reset"):
 		frappe.flags.zenoti_rate_limit_reset_time = cint(res_headers.get("RateLimit-Reset"))
@@ -30,7 +31,7 @@ def make_api_call(url):
 			import time
 
 			time.sleep(frappe.flags.zenoti_rate_limit_reset_time + 1)
-			response = requests.request("GET", url=url, headers=headers)
+			response = http_client.request("GET", url=url, headers=headers)
 
 	if response.status_code != 200:
 		content = json.loads(response._content.decode("utf-8"))